@@ -6,6 +6,8 @@ import numpy as np
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from tkcalendar import DateEntry  # Necesitarás instalar este paquete: pip install tkcalendar
+import remuestreo_horario
+import almacen_columnar
 
 def preparar_datos_estacion(ruta_original, ruta_salida=None, convertir_a_horario=True, verbose=True, rellenar_faltantes=True):
     """
@@ -41,7 +43,7 @@ def preparar_datos_estacion(ruta_original, ruta_salida=None, convertir_a_horario
         print("Detectado delimitador: coma (,)")
     
     # Cargar dataset original con el delimitador detectado
-    df = pd.read_csv(ruta_original, delimiter=delimitador)
+    df = almacen_columnar.cargar_tabla(ruta_original, dtype_flotante=np.float64, delimiter=delimitador)
     print(f"Registros originales: {len(df)}")
     
     # Mostrar columnas disponibles
@@ -227,81 +229,8 @@ def preparar_datos_estacion(ruta_original, ruta_salida=None, convertir_a_horario
         # Primero asegurarse de que el DataFrame esté ordenado por fecha
         nuevo_df = nuevo_df.sort_values('fecha')
         
-        # Crear un DataFrame vacío para los resultados
-        df_procesado = pd.DataFrame(columns=nuevo_df.columns)
-        
-        # Obtener la fecha mínima y máxima
-        fecha_min = nuevo_df['fecha'].min().floor('D')
-        fecha_max = nuevo_df['fecha'].max().ceil('D')
-        
-        # Crear rango de horas
-        horas_exactas = pd.date_range(start=fecha_min, end=fecha_max, freq='1H')
-        
-        # Para cada hora exacta, buscar el registro más cercano
-        for hora_exacta in horas_exactas:
-            # Obtener solo registros del mismo día
-            mismo_dia = nuevo_df['fecha'].dt.date == hora_exacta.date()
-            
-            # Calcular la diferencia en minutos entre cada registro y la hora exacta
-            if mismo_dia.any():  # Solo proceder si hay registros del mismo día
-                diferencias = abs((nuevo_df.loc[mismo_dia, 'fecha'] - hora_exacta).dt.total_seconds() / 60)
-                
-                # Encontrar el índice del registro más cercano
-                idx_min = diferencias.argmin()  # Usar argmin en lugar de idxmin
-                idx_cercano = diferencias.index[idx_min]
-                registro_cercano = nuevo_df.loc[idx_cercano].copy()
-                
-                # Para comprobar: mostrar la fecha original y la diferencia en minutos
-                fecha_original = registro_cercano['fecha']
-                diferencia_min = diferencias.min() / 60  # Convertir a horas para más claridad
-                
-                if verbose and diferencia_min > 0.25:  # Si la diferencia es mayor a 15 minutos
-                    print(f"ADVERTENCIA: Para {hora_exacta}, registro más cercano: {fecha_original}, diferencia: {diferencia_min:.2f} horas")
-                
-                # Modificar la fecha al formato de hora exacta
-                registro_cercano['fecha'] = hora_exacta
-                
-                # Agregar al DataFrame de resultados
-                df_procesado = pd.concat([df_procesado, pd.DataFrame([registro_cercano])], ignore_index=True)
-        
-        # Cálculo específico para radiación solar en J/m²
-        if 'radiacion_solar_wm2' in nuevo_df.columns:
-            print("Calculando radiación solar horaria correctamente...")
-            
-            # Para cada hora exacta, calcular el promedio de todos los registros de la hora ANTERIOR
-            for idx, hora in enumerate(df_procesado['fecha']):
-                # Obtener la hora anterior
-                hora_anterior_inicio = hora - pd.Timedelta(hours=1)
-                
-                # Filtrar los registros que caen en la hora anterior
-                registros_hora_anterior = nuevo_df[(nuevo_df['fecha'] >= hora_anterior_inicio) & 
-                                                (nuevo_df['fecha'] < hora)]
-                
-                # Si hay registros en esa hora, calcular el promedio
-                if not registros_hora_anterior.empty:
-                    # Calcular el promedio de radiación solar en W/m²
-                    radiacion_promedio_wm2 = registros_hora_anterior['radiacion_solar_wm2'].mean()
-                    
-                    # Convertir a J/m² (multiplicar por 3600 segundos)
-                    radiacion_joules = radiacion_promedio_wm2 * 3600
-                    
-                    # Asignar al DataFrame final
-                    df_procesado.loc[idx, 'radiacion_solar_J_m2'] = radiacion_joules
-                    
-                    if verbose and idx < 5:  # Mostrar algunos ejemplos
-                        print(f"Hora: {hora}")
-                        print(f"  Registros usados: {len(registros_hora_anterior)}")
-                        print(f"  Promedio W/m²: {radiacion_promedio_wm2:.2f}")
-                        print(f"  Total J/m²: {radiacion_joules:.2f}")
-                else:
-                    print(f"ADVERTENCIA: No hay registros para calcular radiación solar en {hora}")
-                    # Mantener el valor original o asignar 0
-                    df_procesado.loc[idx, 'radiacion_solar_J_m2'] = 0
-            
-            print(f"Datos convertidos a formato horario: {len(df_procesado)} registros")
-        else:
-            df_procesado = nuevo_df
-            print(f"Se mantiene la frecuencia original: {len(df_procesado)} registros")
+        # Registro más cercano a cada hora (merge_asof) y radiación promedio de la hora anterior (resample)
+        df_procesado = remuestreo_horario.convertir_a_horario(nuevo_df, verbose=verbose)
     else:
         df_procesado = nuevo_df
         print(f"Se mantiene la frecuencia original: {len(df_procesado)} registros")
@@ -741,7 +670,7 @@ class EstacionMeteorologicaGUI:
                     self.log(f"\nAplicando filtro de fechas: {fecha_inicio} a {fecha_fin}")
                     
                     # Cargar el archivo procesado
-                    df = pd.read_csv(archivo_procesado)
+                    df = almacen_columnar.cargar_tabla(archivo_procesado, dtype_flotante=np.float64)
                     df['fecha'] = pd.to_datetime(df['fecha'])
                     
                     # Filtrar por fechas
@@ -12,6 +12,7 @@ if script_dir not in sys.path:
 # Importar funciones necesarias
 from meteo_main import integrar_datasets
 from predictor_model import PrediccionMeteo
+from entorno_tensorflow import inicializar_tensorflow
 
 def tarea_actualizacion():
     try:
@@ -28,10 +29,7 @@ def tarea_actualizacion():
         dataset_nuevos = predictor.cargar_datos(ruta_nuevos)
         
         # 4. Actualizar categorías antes de integrar
-        nuevas_categorias = set()
-        for _, row in dataset_nuevos.iterrows():
-            categoria = predictor.categorizar_clima(row)
-            nuevas_categorias.add(categoria)
+        nuevas_categorias = set(predictor.categorizar_clima_vectorizado(dataset_nuevos).unique())
         
         # 5. Agregar nuevas categorías al encoder
         if hasattr(predictor, 'categorias') and predictor.categorias is not None:
@@ -45,7 +43,8 @@ def tarea_actualizacion():
         dataset_completo = integrar_datasets(
             "dataset_historico.csv", 
             ruta_nuevos,
-            "dataset_completo_actualizado.csv"
+            "dataset_completo_actualizado.csv",
+            incremental=True  # Solo se integran los datos nuevos sobre el histórico particionado
         )
         
         # 7. Actualizar modelo con nuevos datos
@@ -71,6 +70,8 @@ def iniciar_actualizacion_diaria():
         time.sleep(60)  # Verificar cada minuto
 
 if __name__ == "__main__":
+    # Configurar TensorFlow una sola vez al arrancar el proceso, no en cada actualización
+    inicializar_tensorflow()
     iniciar_actualizacion_diaria()
 ######## By: Bryan Rojas and Nathalia Gutierrez ########
 # 2024-01-01
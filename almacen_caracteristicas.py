@@ -0,0 +1,317 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Almacén persistente de las características de enhance_features, indexado por fecha.
+# Las características solo miran hacia atrás (tendencia de 3 h y media móvil de 6 h), así que
+# cuando llegan registros nuevos al final del histórico basta con calcular esos registros
+# usando las últimas horas guardadas como contexto. Que df extienda el histórico se comprueba
+# comparando todas las entradas guardadas con el principio de df, bloque a bloque: un registro
+# antiguo editado o rellenado (p. ej. por la integración incremental) invalida el histórico.
+# Los registros se guardan por bloques, uno por segmento en disco, y solo se concatenan si se pide
+# el histórico completo; obtener(df, ultimas=k) devuelve las k últimas filas leyendo solo los
+# bloques finales. Al anexar, los dos últimos segmentos se unen mientras el penúltimo no sea mayor
+# que el último (como un contador binario), así que quedan O(log n) segmentos y cada registro se
+# reescribe O(log n) veces. Un manifiesto JSON enumera los segmentos y describe sus columnas.
+# Cada segmento es un .npz de arreglos simples (fechas y números tal cual, texto como códigos int32
+# con su tabla de categorías); nunca se deserializan objetos (allow_pickle=False).
+
+VERSION_CARACTERISTICAS = 2
+HORAS_CONTEXTO = 5  # La media móvil de 6 h necesita las 5 horas anteriores (la tendencia, 3)
+ARCHIVO_MANIFIESTO = 'manifiesto.json'
+
+
+def rellenar_faltantes(df):
+    """Relleno de NaN aplicado al final de enhance_features"""
+    return df.ffill().bfill()
+
+
+def _indice_admisible(df):
+    """El almacén solo trabaja con series de índice temporal creciente, sin duplicados"""
+    return (isinstance(df.index, pd.DatetimeIndex) and len(df) > 0
+            and df.index.is_monotonic_increasing and df.index.is_unique
+            and df.columns.is_unique)
+
+
+def _tabla_a_arreglos(df, prefijo, arreglos):
+    """Añade a `arreglos` el índice y las columnas de df; devuelve su descripción para el manifiesto"""
+    arreglos[f'{prefijo}_indice'] = df.index.to_numpy()
+    columnas = []
+    for i, nombre in enumerate(df.columns):
+        serie = df.iloc[:, i]
+        clave = f'{prefijo}_{i}'
+        columna = {'nombre': nombre, 'dtype': str(serie.dtype)}
+        if isinstance(serie.dtype, np.dtype) and serie.dtype.kind in 'biufmM':
+            arreglos[clave] = serie.to_numpy()
+            columna['tipo'] = 'numerico'
+        elif pd.api.types.is_numeric_dtype(serie.dtype) or pd.api.types.is_bool_dtype(serie.dtype):
+            # Enteros y booleanos de pandas con <NA>: valores y máscara de nulos por separado
+            arreglos[clave] = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+            arreglos[f'{clave}_nulos'] = serie.isna().to_numpy()
+            columna['tipo'] = 'nulable'
+        else:
+            codigos, unicos = pd.factorize(serie)
+            arreglos[clave] = codigos.astype(np.int32)
+            arreglos[f'{clave}_categorias'] = np.array([str(valor) for valor in unicos], dtype=str)
+            columna['tipo'] = 'texto'
+        columnas.append(columna)
+    return {'indice': df.index.name, 'columnas': columnas}
+
+
+def _tabla_de_arreglos(arreglos, prefijo, descripcion):
+    """DataFrame guardado con _tabla_a_arreglos"""
+    indice = pd.DatetimeIndex(arreglos[f'{prefijo}_indice'], name=descripcion['indice'])
+    datos = {}
+    for i, columna in enumerate(descripcion['columnas']):
+        clave = f'{prefijo}_{i}'
+        valores = arreglos[clave]
+        if columna['tipo'] == 'texto':
+            # El código -1 toma el último elemento de la tabla (NaN)
+            tabla = np.array(list(arreglos[f'{clave}_categorias']) + [np.nan], dtype=object)
+            serie = pd.Series(tabla[valores], index=indice).astype(columna['dtype'])
+        elif columna['tipo'] == 'nulable':
+            serie = pd.Series(valores, index=indice).astype(columna['dtype']).mask(arreglos[f'{clave}_nulos'])
+        else:
+            serie = pd.Series(valores, index=indice)
+        datos[i] = serie
+    df = pd.DataFrame(datos, index=indice)
+    df.columns = pd.Index([columna['nombre'] for columna in descripcion['columnas']])
+    return df
+
+
+def _ultimas(bloques, filas):
+    """Últimas `filas` filas de una lista de bloques, concatenando solo los bloques finales"""
+    partes = []
+    reunidas = 0
+    for bloque in reversed(bloques):
+        if reunidas >= filas:
+            break
+        partes.append(bloque)
+        reunidas += len(bloque)
+    if not partes:
+        return None
+    return (partes[0] if len(partes) == 1 else pd.concat(partes[::-1])).iloc[-filas:]
+
+
+class AlmacenCaracteristicas:
+    """Caché incremental de características: recalcula solo los registros añadidos al final"""
+
+    def __init__(self, calcular, directorio='cache_caracteristicas'):
+        self.calcular = calcular  # df -> características sin rellenar NaN
+        self.directorio = directorio
+        self._limpiar()
+        self._cargado = False
+
+    def _limpiar(self):
+        self._entradas = []  # Bloques de entrada, uno por segmento
+        self._caracteristicas = []
+        self._completo = None  # (entradas, características) concatenadas, hasta el próximo cambio
+        self.segmentos = []
+        self.filas = 0
+        self._numero = 0  # Número del próximo archivo de segmento
+
+    @property
+    def entradas(self):
+        return self._unir()[0]
+
+    @property
+    def caracteristicas(self):
+        return self._unir()[1]
+
+    def obtener(self, df, ultimas=None):
+        """Devuelve las características de df (solo las `ultimas` filas si se indica); si df extiende
+        el histórico guardado solo calcula lo nuevo"""
+        try:
+            self._cargar()
+            nuevos = self._registros_nuevos(df)
+            if nuevos is not None:
+                bloque = self._calcular_bloque(nuevos) if len(nuevos) else None
+                if len(nuevos) == 0 or bloque is not None:
+                    if bloque is not None:
+                        self._anexar(nuevos, bloque)
+                    return self._resultado(ultimas)
+
+            resultado = rellenar_faltantes(self.calcular(df))
+            # No se reemplaza un histórico más largo por un fragmento (p. ej. datos nuevos sueltos)
+            if _indice_admisible(df) and len(df) >= self.filas:
+                self._reemplazar(df, resultado)
+        except Exception as e:
+            print(f"Advertencia en almacén de características, se recalcula todo: {e}")
+            resultado = rellenar_faltantes(self.calcular(df))
+        return resultado if ultimas is None else resultado.iloc[-ultimas:]
+
+    def invalidar(self):
+        """Elimina el histórico guardado en memoria y en disco"""
+        self._borrar_archivos(self.segmentos)
+        self._limpiar()
+        self._cargado = True
+        ruta = os.path.join(self.directorio, ARCHIVO_MANIFIESTO)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+    def _resultado(self, ultimas):
+        """Copia de las características guardadas (todas o las `ultimas` filas)"""
+        if ultimas is None:
+            return self.caracteristicas.copy()
+        return _ultimas(self._caracteristicas, ultimas).copy()
+
+    def _unir(self):
+        if self.filas == 0:
+            return None, None
+        if self._completo is None:
+            unir = lambda bloques: bloques[0] if len(bloques) == 1 else pd.concat(bloques)
+            self._completo = (unir(self._entradas), unir(self._caracteristicas))
+        return self._completo
+
+    def _registros_nuevos(self, df):
+        """Registros de df posteriores al histórico, o None si df no es una extensión de él"""
+        if self.filas == 0 or not isinstance(df.index, pd.DatetimeIndex) or not df.columns.is_unique:
+            return None
+        n = self.filas
+        if len(df) < n or list(df.columns) != list(self._entradas[-1].columns):
+            return None
+        if df.index[0] != self._entradas[0].index[0] or df.index[n - 1] != self._entradas[-1].index[-1]:
+            return None
+        # Todas las entradas guardadas deben coincidir con el principio de df; comparar los arreglos
+        # cuesta poco frente a recalcular las características
+        inicio = 0
+        for bloque in self._entradas:
+            if not df.iloc[inicio:inicio + len(bloque)].equals(bloque):
+                return None
+            inicio += len(bloque)
+        nuevos = df.iloc[n:]
+        if len(nuevos) and not (nuevos.index.is_monotonic_increasing and nuevos.index.is_unique
+                                and nuevos.index[0] > df.index[n - 1]):
+            return None
+        # Con NaN en el último registro el bfill final podría modificar registros ya guardados
+        if self._caracteristicas[-1].iloc[-1].isna().any():
+            return None
+        return nuevos
+
+    def _calcular_bloque(self, nuevos):
+        """Características de los registros nuevos, con el contexto y el relleno del histórico"""
+        contexto = _ultimas(self._entradas, HORAS_CONTEXTO)
+        bloque = self.calcular(pd.concat([contexto, nuevos])).iloc[len(contexto):]
+
+        anterior = self._caracteristicas[-1]
+        columnas = anterior.columns
+        if not bloque.columns.is_unique or not set(bloque.columns) <= set(columnas):
+            return None
+        # pd.get_dummies solo crea columnas para los periodos presentes en el bloque
+        faltantes = columnas.difference(bloque.columns)
+        if any(anterior[c].dtype != bool for c in faltantes):
+            return None
+        bloque = bloque.reindex(columns=columnas)
+        for columna in faltantes:
+            bloque[columna] = False
+
+        # El ffill continúa desde el último registro guardado, igual que sobre la serie completa
+        bloque = pd.concat([anterior.iloc[-1:], bloque]).ffill().iloc[1:]
+        tipos = anterior.dtypes
+        distintos = {c: tipos[c] for c in columnas if bloque[c].dtype != tipos[c]}
+        return bloque.astype(distintos) if distintos else bloque
+
+    def _cargar(self):
+        """Carga el histórico desde disco la primera vez que se usa"""
+        if self._cargado:
+            return
+        self._cargado = True
+        ruta = os.path.join(self.directorio, ARCHIVO_MANIFIESTO)
+        if not os.path.exists(ruta):
+            return
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+            if manifiesto.get('version') != VERSION_CARACTERISTICAS or not manifiesto.get('segmentos'):
+                print("Almacén de características desactualizado, se reconstruirá")
+                self._borrar_archivos(manifiesto.get('segmentos') or [])
+                return
+            for segmento in manifiesto['segmentos']:
+                with np.load(os.path.join(self.directorio, segmento['archivo']), allow_pickle=False) as arreglos:
+                    entradas = _tabla_de_arreglos(arreglos, 'entradas', segmento['entradas'])
+                    caracteristicas = _tabla_de_arreglos(arreglos, 'caracteristicas', segmento['caracteristicas'])
+                self._entradas.append(entradas)
+                self._caracteristicas.append(caracteristicas)
+                self.filas += len(entradas)
+            self.segmentos = manifiesto['segmentos']
+            self._numero = max(s['numero'] for s in self.segmentos) + 1
+            print(f"Almacén de características cargado: {self.filas} registros en {len(self.segmentos)} segmentos")
+        except Exception as e:
+            print(f"Error al cargar el almacén de características: {e}")
+            self._limpiar()
+
+    def _reemplazar(self, df, resultado):
+        """Sustituye el histórico completo por uno nuevo en un único segmento"""
+        self._borrar_archivos(self.segmentos)
+        self._limpiar()
+        self._entradas.append(df.copy())
+        self._caracteristicas.append(resultado.copy())
+        self.filas = len(df)
+        self._guardar_segmento(self._entradas[0], self._caracteristicas[0])
+
+    def _anexar(self, nuevos, bloque):
+        """Añade los registros nuevos como un bloque (y un segmento en disco) más"""
+        self._entradas.append(nuevos.copy())
+        self._caracteristicas.append(bloque)
+        self.filas += len(nuevos)
+        self._completo = None
+        self._guardar_segmento(self._entradas[-1], bloque)
+        self._fusionar()
+
+    def _fusionar(self):
+        """Une los dos últimos segmentos mientras el penúltimo no tenga más filas que el último"""
+        while (len(self.segmentos) >= 2 and len(self.segmentos) == len(self._entradas)
+               and self.segmentos[-2]['filas'] <= self.segmentos[-1]['filas']):
+            anteriores = self.segmentos[-2:]
+            entradas = pd.concat(self._entradas[-2:])
+            caracteristicas = pd.concat(self._caracteristicas[-2:])
+            del self._entradas[-2:], self._caracteristicas[-2:], self.segmentos[-2:]
+            self._entradas.append(entradas)
+            self._caracteristicas.append(caracteristicas)
+            # El manifiesto nuevo ya no referencia los segmentos unidos cuando se borran
+            if not self._guardar_segmento(entradas, caracteristicas):
+                break
+            self._borrar_archivos(anteriores)
+
+    def _guardar_segmento(self, entradas, caracteristicas):
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            numero = self._numero
+            self._numero += 1
+            archivo = f'segmento_{numero:05d}.npz'
+            arreglos = {}
+            descripcion_entradas = _tabla_a_arreglos(entradas, 'entradas', arreglos)
+            descripcion_caracteristicas = _tabla_a_arreglos(caracteristicas, 'caracteristicas', arreglos)
+            np.savez(os.path.join(self.directorio, archivo), **arreglos)
+            self.segmentos.append({
+                'numero': numero,
+                'archivo': archivo,
+                'filas': len(entradas),
+                'desde': str(entradas.index[0]),
+                'hasta': str(entradas.index[-1]),
+                'entradas': descripcion_entradas,
+                'caracteristicas': descripcion_caracteristicas
+            })
+            manifiesto = {
+                'version': VERSION_CARACTERISTICAS,
+                'columnas_entrada': [str(c) for c in entradas.columns],
+                'filas': self.filas,
+                'segmentos': self.segmentos
+            }
+            # Escritura atómica del manifiesto: el segmento ya está en disco antes de referenciarlo
+            ruta = os.path.join(self.directorio, ARCHIVO_MANIFIESTO)
+            with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(manifiesto, f, indent=2)
+            os.replace(ruta + '.tmp', ruta)
+            return True
+        except Exception as e:
+            print(f"Advertencia: no se pudo guardar el almacén de características: {e}")
+            return False
+
+    def _borrar_archivos(self, segmentos):
+        for segmento in segmentos:
+            ruta = os.path.join(self.directorio, segmento['archivo'])
+            if os.path.exists(ruta):
+                os.remove(ruta)
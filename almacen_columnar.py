@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Copia binaria columnar de los CSV históricos para cargas rápidas y con tipos explícitos.
+# La primera vez que se carga un CSV se convierte a un directorio con un .npy por columna
+# (fechas como int64 en nanosegundos desde 1970, medidas en float32 o float64, texto como códigos
+# int32 con su tabla de categorías en el meta.json) y un meta.json con el tamaño y la fecha de
+# modificación del CSV. Mientras el CSV no cambie, las cargas siguientes leen los .npy mapeados en
+# memoria, sin analizar texto ni fechas y sin deserializar objetos (nunca se usa allow_pickle).
+# Todas las copias van a un único directorio de caché de la aplicación, relativo al directorio de
+# trabajo como cache_series y cache_caracteristicas, con un subdirectorio por CSV y opciones.
+# Uso: df = cargar_tabla('dataset_completo_actualizado.csv')  # igual que pd.read_csv + fecha convertida
+
+VERSION_COLUMNAR = 2
+DIRECTORIO_CACHE = 'cache_columnar'
+COLUMNAS_FECHA = ('fecha', 'fecha_hora')
+
+
+def _clave_cache(ruta, dtype_flotante, opciones_csv):
+    """Nombre del directorio de caché: depende del archivo, del tipo flotante y de las opciones de lectura"""
+    firma = json.dumps([os.path.abspath(ruta), np.dtype(dtype_flotante).name, sorted(opciones_csv.items())],
+                       default=str)
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    return f"{nombre}_{hashlib.sha1(firma.encode('utf-8')).hexdigest()[:10]}"
+
+
+def ruta_cache(ruta, dtype_flotante=np.float32, **opciones_csv):
+    """Directorio donde se guarda (o se guardaría) la copia columnar de ruta"""
+    return os.path.join(DIRECTORIO_CACHE, _clave_cache(ruta, dtype_flotante, opciones_csv))
+
+
+def _origen(ruta):
+    estado = os.stat(ruta)
+    return {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns}
+
+
+def _leer_meta(directorio):
+    try:
+        with open(os.path.join(directorio, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def convertir_csv(ruta, dtype_flotante=np.float32, **opciones_csv):
+    """Lee el CSV una vez y escribe su copia columnar; devuelve el directorio creado"""
+    origen = _origen(ruta)
+    df = pd.read_csv(ruta, **opciones_csv)
+    destino = ruta_cache(ruta, dtype_flotante, **opciones_csv)
+    temporal = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    columnas = []
+    for i, nombre in enumerate(df.columns):
+        serie = df[nombre]
+        archivo = f"{i:03d}.npy"
+        tipo = 'texto'
+        categorias = None
+        if nombre in COLUMNAS_FECHA:
+            try:
+                fechas = pd.to_datetime(serie)
+                valores = fechas.to_numpy(dtype='datetime64[ns]').view(np.int64)  # NaT -> mínimo int64
+                tipo = 'fecha'
+            except (ValueError, TypeError):
+                pass
+        if tipo == 'texto':
+            if pd.api.types.is_bool_dtype(serie):
+                valores, tipo = serie.to_numpy(dtype=bool), 'booleano'
+            elif pd.api.types.is_integer_dtype(serie):
+                valores, tipo = serie.to_numpy(dtype=np.int64), 'entero'
+            elif pd.api.types.is_numeric_dtype(serie):
+                valores, tipo = serie.to_numpy(dtype=dtype_flotante), 'flotante'
+            else:
+                # Texto: códigos int32 (-1 para valores vacíos) y la tabla de categorías en el meta.json
+                codigos, unicos = pd.factorize(serie)
+                valores = codigos.astype(np.int32)
+                categorias = [str(valor) for valor in unicos]
+        np.save(os.path.join(temporal, archivo), valores, allow_pickle=False)
+        columna = {'nombre': str(nombre), 'tipo': tipo, 'archivo': archivo}
+        if categorias is not None:
+            columna['categorias'] = categorias
+        columnas.append(columna)
+
+    meta = {'version': VERSION_COLUMNAR, 'origen': os.path.abspath(ruta), 'filas': len(df),
+            'columnas': columnas, **origen}
+    with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    # Sustitución del directorio completo: un lector nunca ve una copia a medio escribir
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+    return destino
+
+
+def cargar_tabla(ruta, dtype_flotante=np.float32, **opciones_csv):
+    """DataFrame de ruta desde su copia columnar, convirtiendo el CSV si no existe o cambió.
+    Las columnas 'fecha'/'fecha_hora' llegan como datetime64 y las numéricas como dtype_flotante.
+    opciones_csv se pasan a pd.read_csv (p. ej. delimiter=';')."""
+    directorio = ruta_cache(ruta, dtype_flotante, **opciones_csv)
+    meta = _leer_meta(directorio)
+    if (meta is None or meta.get('version') != VERSION_COLUMNAR
+            or {k: meta.get(k) for k in ('tamano', 'mtime_ns')} != _origen(ruta)):
+        try:
+            directorio = convertir_csv(ruta, dtype_flotante, **opciones_csv)
+            meta = _leer_meta(directorio)
+        except OSError as e:
+            # Directorio de solo lectura u otro problema de disco: se lee el CSV directamente
+            print(f"Advertencia: no se pudo crear la copia columnar de {ruta}: {e}")
+            df = pd.read_csv(ruta, **opciones_csv)
+            for nombre in COLUMNAS_FECHA:
+                if nombre in df.columns:
+                    try:
+                        df[nombre] = pd.to_datetime(df[nombre])
+                    except (ValueError, TypeError):
+                        pass
+            return df
+
+    datos = {}
+    for columna in meta['columnas']:
+        ruta_columna = os.path.join(directorio, columna['archivo'])
+        if columna['tipo'] == 'texto':
+            # El código -1 toma el último elemento de la tabla (NaN)
+            tabla = np.array(columna['categorias'] + [np.nan], dtype=object)
+            datos[columna['nombre']] = tabla[np.load(ruta_columna)]
+        elif columna['tipo'] == 'fecha':
+            datos[columna['nombre']] = np.load(ruta_columna, mmap_mode='r').view('datetime64[ns]')
+        else:
+            datos[columna['nombre']] = np.load(ruta_columna, mmap_mode='r')
+    # El DataFrame copia los datos mapeados: se puede modificar sin tocar la caché
+    return pd.DataFrame(datos, copy=True)
@@ -0,0 +1,1280 @@
+import argparse
+import os
+import shutil
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks de rendimiento para el sistema de predicción de microclima.
+# Uso: python benchmark_rendimiento.py <nombre> [--ruta RUTA] [--filas N] [--repeticiones R]
+
+RUTA_DATASET = 'dataset_completo_actualizado.csv'
+RUTA_PREDICTOR_ORIGINAL = os.path.join('Backup 14-05-2025', 'predictor_model.py')  # Código anterior a las optimizaciones
+
+
+def medir(funcion, repeticiones=1):
+    """Ejecuta una función varias veces y devuelve (mejor tiempo en segundos, último resultado)"""
+    mejor = float('inf')
+    resultado = None
+    for _ in range(max(1, repeticiones)):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def cargar_dataset(ruta=RUTA_DATASET, filas=None):
+    """Carga el dataset histórico con índice temporal"""
+    df = pd.read_csv(ruta, nrows=filas)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df.set_index('fecha')
+
+
+def benchmark_categorizacion(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Compara categorizar_clima fila a fila contra categorizar_clima_vectorizado"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    df = cargar_dataset(ruta, filas)
+    print(f"\n=== Benchmark de categorización ({len(df)} registros) ===")
+
+    t_filas, categorias_filas = medir(lambda: df.apply(predictor.categorizar_clima, axis=1), repeticiones)
+    print(f"Fila a fila (apply):   {t_filas:.3f} s")
+
+    # Limpiar la caché de sorteos para medir también la primera llamada
+    predictor._cache_variabilidad_dia = {}
+    t_vector, categorias_vector = medir(lambda: predictor.categorizar_clima_vectorizado(df), repeticiones)
+    print(f"Vectorizado:           {t_vector:.3f} s")
+
+    diferencias = int((categorias_filas.values != categorias_vector.values).sum())
+    print(f"Aceleración: x{t_filas / max(t_vector, 1e-9):.1f}")
+    print(f"Etiquetas diferentes: {diferencias}")
+    return {'fila_a_fila': t_filas, 'vectorizado': t_vector, 'diferencias': diferencias}
+
+
+def medir_memoria(funcion):
+    """Ejecuta una función y devuelve (pico de memoria en MB, resultado)"""
+    tracemalloc.start()
+    try:
+        resultado = funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return pico / (1024 ** 2), resultado
+
+
+def _ventanas_por_bucle(df_norm, variables_predictoras, etiquetas, num_categorias, ventana_tiempo=12):
+    """Construcción de ventanas original (bucle por fila con iloc), usada como referencia"""
+    X_final, y_final = [], []
+    for i in range(len(df_norm) - ventana_tiempo - 72 + 1):
+        X_final.append(df_norm[variables_predictoras].iloc[i:i + ventana_tiempo].values)
+        y_seq = etiquetas[i + ventana_tiempo:i + ventana_tiempo + 72]
+        y_seq_onehot = np.zeros((72, num_categorias))
+        for t, cat in enumerate(y_seq):
+            if 0 <= cat < num_categorias:
+                y_seq_onehot[t, int(cat)] = 1
+        y_final.append(y_seq_onehot)
+    return np.array(X_final), np.array(y_final)
+
+
+def benchmark_ventanas(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Compara la construcción de ventanas de preparar_datos contra el bucle original"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    predictor.cache_series = None  # Se mide la preparación, no la caché de series
+    df = predictor.enhance_features(cargar_dataset(ruta, filas))
+    predictor._entrenar_normalizadores(df)
+    print(f"\n=== Benchmark de ventanas deslizantes ({len(df)} registros) ===")
+
+    t_nuevo, (X, y) = medir(lambda: predictor.preparar_datos(df), repeticiones)
+    pico_nuevo, _ = medir_memoria(lambda: predictor.preparar_datos(df))
+
+    # Referencia: misma normalización y etiquetas, ventanas construidas con el bucle original
+    variables = predictor.variables_predictoras
+    df_norm = df[variables].copy()
+    for variable in variables:
+        if variable in predictor.scalers:
+            df_norm[variable] = predictor.scalers[variable].transform(df_norm[[variable]].values).ravel()
+    etiquetas = predictor.label_encoder.transform(predictor.categorizar_clima_vectorizado(df))
+    t_bucle, (X_ref, y_ref) = medir(
+        lambda: _ventanas_por_bucle(df_norm, variables, etiquetas, predictor.num_categorias), repeticiones)
+    pico_bucle, _ = medir_memoria(
+        lambda: _ventanas_por_bucle(df_norm, variables, etiquetas, predictor.num_categorias))
+
+    print(f"Bucle original:  {t_bucle:.3f} s, pico {pico_bucle:.1f} MB")
+    print(f"preparar_datos:  {t_nuevo:.3f} s, pico {pico_nuevo:.1f} MB")
+    print(f"Aceleración: x{t_bucle / max(t_nuevo, 1e-9):.1f}")
+    print(f"X equivalente: {np.allclose(X, X_ref, atol=1e-5)}, y equivalente: {np.array_equal(y, y_ref)}")
+    return {'bucle': t_bucle, 'vectorizado': t_nuevo, 'pico_bucle_mb': pico_bucle, 'pico_vectorizado_mb': pico_nuevo}
+
+
+def benchmark_pipeline(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Compara la memoria de X/y materializados (one-hot) contra el pipeline tf.data sobre la serie"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    predictor.cache_series = None  # Se mide la preparación, no la caché de series
+    df = predictor.enhance_features(cargar_dataset(ruta, filas))
+    predictor._entrenar_normalizadores(df)
+    print(f"\n=== Benchmark del pipeline de entrenamiento ({len(df)} registros) ===")
+
+    X, y = predictor.preparar_datos(df)
+    # fit() convierte la vista X en un array contiguo; y ya es el one-hot completo
+    mb_arrays = (X.size * X.itemsize + y.nbytes) / (1024 ** 2)
+    del X, y
+
+    matriz, etiquetas = predictor.preparar_serie(df)
+    mb_serie = (matriz.nbytes + etiquetas.nbytes) / (1024 ** 2)
+    dataset = predictor.crear_dataset_ventanas(matriz, etiquetas, batch_size=predictor.BATCH_SIZE)
+
+    def recorrer_epoca():
+        lotes = 0
+        for _ in dataset:
+            lotes += 1
+        return lotes
+
+    t_epoca, lotes = medir(recorrer_epoca, repeticiones)
+    print(f"X/y materializados (one-hot): {mb_arrays:.1f} MB")
+    print(f"Serie normalizada + etiquetas: {mb_serie:.1f} MB")
+    print(f"Recorrido de una época con tf.data: {t_epoca:.3f} s ({lotes} lotes)")
+    return {'mb_arrays': mb_arrays, 'mb_serie': mb_serie, 'epoca_tf_data': t_epoca}
+
+
+def benchmark_caracteristicas(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Compara enhance_features completo contra el almacén incremental al llegar una hora nueva,
+    con un histórico corto y uno largo (pidiendo todo el histórico o solo la ventana de predicción)"""
+    import tempfile
+    from almacen_caracteristicas import AlmacenCaracteristicas, rellenar_faltantes
+    from predictor_model import PrediccionMeteo, VENTANA_TIEMPO, MARGEN_SERIE
+
+    predictor = PrediccionMeteo()
+    df = cargar_dataset(ruta, filas)
+    ventana = VENTANA_TIEMPO + MARGEN_SERIE
+    horas = max(repeticiones, 3)
+    print(f"\n=== Benchmark del almacén de características (hasta {len(df)} registros) ===")
+
+    resultados = {}
+    for total in [len(df) // 8, len(df)]:
+        parte = df.iloc[:total]
+        t_completo, referencia = medir(
+            lambda: rellenar_faltantes(predictor._calcular_caracteristicas(parte)), repeticiones)
+        with tempfile.TemporaryDirectory() as directorio:
+            almacen = AlmacenCaracteristicas(predictor._calcular_caracteristicas, directorio)
+            almacen.obtener(parte.iloc[:-2 * horas])
+            # Cada medición añade una hora nueva al histórico guardado
+            t_todo = min(medir(lambda: almacen.obtener(parte.iloc[:total - 2 * horas + k + 1]))[0]
+                         for k in range(horas))
+            t_ventana = float('inf')
+            for k in range(horas, 2 * horas):
+                t, resultado = medir(lambda: almacen.obtener(parte.iloc[:total - 2 * horas + k + 1], ultimas=ventana))
+                t_ventana = min(t_ventana, t)
+            segmentos = len(almacen.segmentos)
+
+        numericas = referencia.select_dtypes('number').columns
+        diferencia = float(np.nanmax(np.abs(resultado[numericas].to_numpy(float)
+                                            - referencia[numericas].iloc[-ventana:].to_numpy(float))))
+        print(f"{total} registros:")
+        print(f"  enhance_features completo:          {t_completo * 1000:.1f} ms")
+        print(f"  Almacén, una hora nueva (todo):     {t_todo * 1000:.1f} ms")
+        print(f"  Almacén, una hora nueva ({ventana} filas): {t_ventana * 1000:.1f} ms "
+              f"(x{t_completo / max(t_ventana, 1e-9):.0f}); {segmentos} segmentos")
+        print(f"  Diferencia máxima: {diferencia:.2e}")
+        resultados[total] = {'completo': t_completo, 'incremental': t_todo, 'ventana': t_ventana,
+                             'diferencia_maxima': diferencia}
+    return resultados
+
+
+def _predictor_con_modelo(df):
+    """PrediccionMeteo con el modelo guardado o, si no existe, con un modelo ultraligero sin entrenar"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    try:
+        predictor.cargar_modelo_guardado()
+    except Exception:
+        print("No hay modelo guardado: se usa un modelo ultraligero sin entrenar (solo mide tiempos)")
+        predictor.almacen_caracteristicas = None
+        df_mejorado = predictor.enhance_features(df)
+        predictor._entrenar_normalizadores(df_mejorado)
+        predictor.preparar_categorias(df_mejorado)
+        matriz, _ = predictor.preparar_serie(df_mejorado.iloc[-200:])
+        predictor.model = predictor.crear_modelo_ultraligero((12, matriz.shape[1]), predictor.num_categorias)
+    return predictor
+
+
+def benchmark_servidor(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Latencia y rendimiento del servidor de predicción frente al arranque en frío"""
+    import statistics
+    import subprocess
+    import sys
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from servidor_prediccion import ServicioPrediccion, crear_servidor, solicitar_prediccion
+
+    df = cargar_dataset(ruta, filas)
+    print("\n=== Benchmark del servidor de predicción ===")
+
+    # Arranque en frío: lo que paga cada script o panel que crea su propio PrediccionMeteo listo para inferir
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'from entorno_tensorflow import inicializar_tensorflow; '
+                    'inicializar_tensorflow(); from predictor_model import PrediccionMeteo; PrediccionMeteo()'],
+                   capture_output=True, check=False)
+    t_frio = time.perf_counter() - inicio
+
+    servicio = ServicioPrediccion(_predictor_con_modelo(df))
+    servidor = crear_servidor(servicio, puerto=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://{servidor.server_address[0]}:{servidor.server_address[1]}"
+    carga = df.iloc[-120:]
+    try:
+        solicitar_prediccion(carga, url)  # Calentamiento
+        latencias = []
+        for _ in range(max(20, repeticiones)):
+            t, _ = medir(lambda: solicitar_prediccion(carga, url))
+            latencias.append(t)
+
+        # Solicitudes concurrentes: el servicio las agrupa en lotes
+        concurrentes = 16
+        lotes_previos = servicio.lotes
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrentes) as ejecutor:
+            list(ejecutor.map(lambda _: solicitar_prediccion(carga, url), range(concurrentes * 4)))
+        t_concurrente = time.perf_counter() - inicio
+        lotes = servicio.lotes - lotes_previos
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        servicio.detener()
+
+    latencias.sort()
+    p50 = statistics.median(latencias)
+    p95 = latencias[min(len(latencias) - 1, int(0.95 * len(latencias)))]
+    rendimiento = concurrentes * 4 / t_concurrente
+    print(f"Arranque en frío (import + PrediccionMeteo): {t_frio:.2f} s")
+    print(f"Latencia en caliente: p50 {p50 * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+    print(f"Concurrencia {concurrentes}: {rendimiento:.1f} predicciones/s en {lotes} lotes "
+          f"({concurrentes * 4 / max(lotes, 1):.1f} solicitudes por lote)")
+    return {'arranque_frio': t_frio, 'p50': p50, 'p95': p95, 'predicciones_por_s': rendimiento}
+
+
+def benchmark_ensemble(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Latencia de una predicción: modelo único, ensemble modelo por modelo y ensemble fusionado"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    predictor.num_categorias = 30
+    input_shape = (12, 17)
+    predictor.ensemble_models = predictor.crear_ensemble_modelos(input_shape, predictor.num_categorias)
+    modelo_unico = predictor.ensemble_models[0]
+    x = np.random.default_rng(0).random((1,) + input_shape, dtype=np.float32)
+    print(f"\n=== Benchmark del ensemble ({len(predictor.ensemble_models)} modelos, una ventana) ===")
+
+    muestras = max(20, repeticiones)
+    # Calentamiento (trazado de grafos) antes de medir
+    modelo_unico.predict(x, verbose=0)
+    referencia = predictor._prediccion_ensemble_por_modelo(x)
+    fusionado = predictor.prediccion_ensemble(x)
+
+    t_unico, _ = medir(lambda: modelo_unico.predict(x, verbose=0), muestras)
+    t_secuencial, _ = medir(lambda: predictor._prediccion_ensemble_por_modelo(x), muestras)
+    t_fusionado, _ = medir(lambda: predictor.prediccion_ensemble(x), muestras)
+
+    print(f"Modelo único (predict):    {t_unico * 1000:.1f} ms")
+    print(f"Ensemble modelo por modelo: {t_secuencial * 1000:.1f} ms")
+    print(f"Ensemble fusionado:         {t_fusionado * 1000:.1f} ms")
+    print(f"Probabilidades equivalentes: {np.allclose(referencia[0], fusionado[0], atol=1e-6)}, "
+          f"confianza equivalente: {np.allclose(referencia[1], fusionado[1], atol=1e-6)}")
+    return {'unico': t_unico, 'secuencial': t_secuencial, 'fusionado': t_fusionado}
+
+
+RUTAS_ESTACION = 'Data/*/Datos para analisis.csv'  # Exportaciones de 5 minutos del ESP32
+
+
+def _datos_estacion(ruta):
+    """Registros de 5 minutos con las columnas que deja preparar_datos_estacion antes del paso horario"""
+    df = pd.read_csv(ruta)
+    columnas = {'fecha_hora': 'fecha', 'temp_dht_raw': 'temperatura_C', 'hum_dht_raw': 'humedad_relativa',
+                'lluvia_mm': 'precipitacion_mm', 'cobertura_nubes_octas': 'cobertura_nubes_octas',
+                'vel_viento_kmh': 'velocidad_viento_kmh', 'radiacion_solar_wm2': 'radiacion_solar_wm2'}
+    df = df[list(columnas)].rename(columns=columnas)
+    for columna in df.columns.drop('fecha'):
+        df[columna] = pd.to_numeric(df[columna], errors='coerce')
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df['radiacion_solar_J_m2'] = df['radiacion_solar_wm2'] * 300
+    return df.sort_values('fecha')
+
+
+def _horario_por_bucle(nuevo_df):
+    """Paso horario original de preparar_datos_estacion: una máscara y un concat por hora"""
+    df_procesado = pd.DataFrame(columns=nuevo_df.columns)
+    horas_exactas = pd.date_range(start=nuevo_df['fecha'].min().floor('D'), end=nuevo_df['fecha'].max().ceil('D'), freq='1h')
+    for hora_exacta in horas_exactas:
+        mismo_dia = nuevo_df['fecha'].dt.date == hora_exacta.date()
+        if mismo_dia.any():
+            diferencias = abs((nuevo_df.loc[mismo_dia, 'fecha'] - hora_exacta).dt.total_seconds() / 60)
+            registro_cercano = nuevo_df.loc[diferencias.index[diferencias.argmin()]].copy()
+            registro_cercano['fecha'] = hora_exacta
+            df_procesado = pd.concat([df_procesado, pd.DataFrame([registro_cercano])], ignore_index=True)
+    for idx, hora in enumerate(df_procesado['fecha']):
+        registros = nuevo_df[(nuevo_df['fecha'] >= hora - pd.Timedelta(hours=1)) & (nuevo_df['fecha'] < hora)]
+        df_procesado.loc[idx, 'radiacion_solar_J_m2'] = registros['radiacion_solar_wm2'].mean() * 3600 if not registros.empty else 0
+    return df_procesado
+
+
+def benchmark_remuestreo(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Conversión a datos horarios de las exportaciones de la estación: bucle por hora vs merge_asof/resample"""
+    import contextlib
+    import glob
+    import io
+    import remuestreo_horario
+
+    print("\n=== Benchmark de conversión a datos horarios ===")
+    resultados = {}
+    for ruta_estacion in sorted(glob.glob(RUTAS_ESTACION)):
+        nuevo_df = _datos_estacion(ruta_estacion)
+        if filas:
+            nuevo_df = nuevo_df.iloc[:filas]
+        with contextlib.redirect_stdout(io.StringIO()):
+            t_bucle, referencia = medir(lambda: _horario_por_bucle(nuevo_df), 1)
+            t_vectorizado, resultado = medir(
+                lambda: remuestreo_horario.convertir_a_horario(nuevo_df, verbose=False), repeticiones)
+        iguales = (referencia['fecha'].astype(resultado['fecha'].dtype).equals(resultado['fecha']) and
+                   np.allclose(referencia.drop(columns='fecha').to_numpy(dtype=float),
+                               resultado.drop(columns='fecha').to_numpy(dtype=float), equal_nan=True))
+        dias = (nuevo_df['fecha'].max() - nuevo_df['fecha'].min()).days
+        print(f"{ruta_estacion}: {len(nuevo_df)} registros ({dias} días) -> {len(resultado)} horas")
+        print(f"  Bucle por hora: {t_bucle:.3f} s | merge_asof/resample: {t_vectorizado:.3f} s "
+              f"(x{t_bucle / t_vectorizado:.0f}) | resultados iguales: {iguales}")
+        resultados[ruta_estacion] = {'bucle': t_bucle, 'vectorizado': t_vectorizado, 'iguales': iguales}
+    return resultados
+
+
+def _puente_por_bucle(fechas, iniciales, finales):
+    """Puente original de integrar_datasets: un valor por fecha y variable en Python"""
+    import puente_temporal as pt
+    df_puente = pd.DataFrame(index=fechas)
+    for col, valor_inicial in iniciales.items():
+        valores = []
+        for idx, fecha in enumerate(fechas):
+            progreso = idx / (len(fechas) - 1) if len(fechas) > 1 else 0.5
+            valor_base = valor_inicial + (finales[col] - valor_inicial) / (1 + np.exp(-10 * (progreso - 0.5)))
+            factores = pt.FACTORES_ESTACIONALES[fecha.month - 1]
+            if col == 'temperatura_C':
+                valor = valor_base + pt.PATRON_HORARIO_TEMPERATURA[fecha.hour] + factores[0]
+            elif col == 'precipitacion_mm':
+                valor = max(0, valor_base * factores[1] + (np.random.exponential(0.5) if np.random.random() < 0.2 else 0))
+            elif col == 'humedad_relativa':
+                valor = min(max(valor_base * factores[2] + (-5 if 8 <= fecha.hour <= 17 else 5), 30), 100)
+            elif col == 'cobertura_nubes_octas':
+                valor = min(max(valor_base * factores[3], 0), 8)
+            elif col == 'radiacion_solar_J_m2':
+                valor = 900000 * pt.PATRON_HORARIO_RADIACION[fecha.hour] * max(0, 1 - (4 / 10))
+            else:
+                valor = max(0, valor_base * (1.2 if 10 <= fecha.hour <= 16 else 0.8) + np.random.normal(0, 0.5))
+            valores.append(valor)
+        df_puente[col] = valores
+    return df_puente
+
+
+def benchmark_puente(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Puente de datos para huecos de 1 a 20 años: bucle por fecha vs arreglos por mes y hora"""
+    import puente_temporal
+
+    df = cargar_dataset(ruta, filas)
+    columnas = ['temperatura_C', 'humedad_relativa', 'precipitacion_mm', 'cobertura_nubes_octas',
+                'velocidad_viento_kmh', 'radiacion_solar_J_m2']
+    iniciales = {col: df[col].iloc[-48:].mean() for col in columnas}
+    finales = {col: df[col].iloc[:48].mean() for col in columnas}
+    print("\n=== Benchmark del puente temporal (cada 6 horas) ===")
+
+    resultados = {}
+    for anios in (1, 5, 20):
+        fechas = pd.date_range(start=df.index.max(), periods=anios * 365 * 4, freq=puente_temporal.FRECUENCIA_PUENTE)
+        t_vectorizado, puente = medir(lambda: puente_temporal.generar_puente(fechas, iniciales, finales), repeticiones)
+        reproducible = puente.equals(puente_temporal.generar_puente(fechas, iniciales, finales))
+        linea = f"Hueco de {anios:>2} años ({len(fechas)} puntos): vectorizado {t_vectorizado * 1000:.1f} ms"
+        resultados[anios] = {'vectorizado': t_vectorizado, 'reproducible': reproducible}
+        if anios == 1:
+            t_bucle, referencia = medir(lambda: _puente_por_bucle(fechas, iniciales, finales))
+            # Las variables sin componente aleatoria deben coincidir exactamente
+            deterministas = ['temperatura_C', 'humedad_relativa', 'cobertura_nubes_octas', 'radiacion_solar_J_m2']
+            iguales = np.allclose(referencia[deterministas], puente[deterministas])
+            linea += f", bucle {t_bucle * 1000:.1f} ms (x{t_bucle / t_vectorizado:.0f}), variables deterministas iguales: {iguales}"
+            resultados[anios].update({'bucle': t_bucle, 'iguales': iguales})
+        print(linea + f", reproducible: {reproducible}")
+    return resultados
+
+
+def benchmark_integracion(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Integración nocturna de un día de datos: reescritura completa vs histórico particionado"""
+    import contextlib
+    import io
+    import tempfile
+    import historico_incremental as hi
+
+    df = cargar_dataset(ruta, filas)[hi.COLUMNAS_INTEGRACION[1:]]
+    # Algunos faltantes para que el relleno tenga trabajo, como en los datos de la estación
+    crudo = df.mask(np.random.default_rng(0).random(df.shape) < 0.05)
+    historico, nuevos = crudo.iloc[:-24], crudo.iloc[-24:]
+    print(f"\n=== Benchmark de integración ({len(historico)} registros + {len(nuevos)} nuevos) ===")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_csv = os.path.join(directorio, 'dataset_completo_actualizado.csv')
+        combinado = hi.combinar_con_prioridad(historico)
+        hi.HistoricoParticionado(ruta_csv).reconstruir(combinado, hi.rellenar_integracion(combinado))
+        respaldo = os.path.join(directorio, 'respaldo')
+        shutil.copytree(os.path.dirname(ruta_csv), respaldo)
+
+        def completa():
+            combinado = hi.combinar_con_prioridad(historico, nuevos)
+            hi.rellenar_integracion(combinado).reset_index().to_csv(os.path.join(directorio, 'completo.csv'), index=False)
+
+        def restaurar():
+            # Cada repetición parte del mismo histórico sin los datos nuevos
+            shutil.rmtree(os.path.join(directorio, 'dataset_completo_actualizado_particiones'))
+            shutil.copytree(os.path.join(respaldo, 'dataset_completo_actualizado_particiones'),
+                            os.path.join(directorio, 'dataset_completo_actualizado_particiones'))
+            shutil.copy(os.path.join(respaldo, 'dataset_completo_actualizado.csv'), ruta_csv)
+
+        def incremental():
+            almacen = hi.HistoricoParticionado(ruta_csv)
+            almacen.disponible()
+            with contextlib.redirect_stdout(io.StringIO()):
+                return almacen.integrar(nuevos)
+
+        t_completa, _ = medir(completa, repeticiones)
+        t_incremental = float('inf')
+        for _ in range(max(1, repeticiones)):
+            restaurar()
+            t, resultado = medir(incremental)
+            t_incremental = min(t_incremental, t)
+        referencia = hi.rellenar_integracion(hi.combinar_con_prioridad(historico, nuevos))
+        print(f"Reescritura completa: {t_completa:.3f} s")
+        print(f"Incremental: {t_incremental:.3f} s")
+        igual = resultado.equals(referencia.loc[resultado.index[0]:])
+        print(f"Meses reescritos ({len(resultado)} registros) iguales a la integración completa: {igual}")
+    return {'completa': t_completa, 'incremental': t_incremental}
+
+
+def benchmark_carga(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Carga del histórico: CSV por chunks + pd.to_datetime vs copia columnar (primera carga y siguientes)"""
+    import tempfile
+    import almacen_columnar
+
+    print("\n=== Benchmark de carga del histórico ===")
+    with tempfile.TemporaryDirectory() as directorio:
+        copia = os.path.join(directorio, os.path.basename(ruta))
+        if filas:
+            pd.read_csv(ruta, nrows=filas).to_csv(copia, index=False)
+        else:
+            shutil.copy(ruta, copia)
+
+        def por_chunks():
+            # Ruta anterior de cargar_datos: chunks de CHUNK_SIZE filas, concat y fecha sin tipo
+            df = pd.concat(list(pd.read_csv(copia, chunksize=1000)), ignore_index=True)
+            df['fecha'] = pd.to_datetime(df['fecha'])
+            return df
+
+        def primera_carga():
+            shutil.rmtree(almacen_columnar.ruta_cache(copia), ignore_errors=True)
+            return almacen_columnar.cargar_tabla(copia)
+
+        t_csv, referencia = medir(por_chunks, repeticiones)
+        t_conversion, _ = medir(primera_carga, repeticiones)
+        t_columnar, df = medir(lambda: almacen_columnar.cargar_tabla(copia), max(5, repeticiones))
+        shutil.rmtree(almacen_columnar.ruta_cache(copia), ignore_errors=True)
+        memoria_csv = referencia.memory_usage(deep=True).sum() / 1024 ** 2
+        memoria_columnar = df.memory_usage(deep=True).sum() / 1024 ** 2
+        iguales = (referencia['fecha'].astype(df['fecha'].dtype).equals(df['fecha']) and
+                   np.allclose(referencia.drop(columns='fecha'), df.drop(columns='fecha'), equal_nan=True))
+
+    print(f"{len(df)} registros")
+    print(f"CSV por chunks + to_datetime: {t_csv:.3f} s ({memoria_csv:.1f} MB)")
+    print(f"Columnar, primera carga (conversión): {t_conversion:.3f} s")
+    print(f"Columnar, cargas siguientes: {t_columnar:.4f} s ({memoria_columnar:.1f} MB, x{t_csv / t_columnar:.0f})")
+    print(f"Mismos datos (float32): {iguales}")
+    return {'csv': t_csv, 'conversion': t_conversion, 'columnar': t_columnar}
+
+
+def benchmark_series(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """preparar_serie sin caché vs serie mapeada desde cache_series, y memoria de los folds de evaluación"""
+    import tempfile
+    from cache_series import CacheSeries
+    from predictor_model import PrediccionMeteo
+    from sklearn.model_selection import TimeSeriesSplit
+    import ventanas_temporales
+
+    predictor = PrediccionMeteo()
+    df = predictor.enhance_features(cargar_dataset(ruta, filas))
+    predictor._entrenar_normalizadores(df)
+    predictor.preparar_categorias(df)
+    print(f"\n=== Benchmark de la caché de series de entrenamiento ({len(df)} registros) ===")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        predictor.cache_series = None
+        t_calculo, (referencia, etiquetas_ref) = medir(lambda: predictor.preparar_serie(df), repeticiones)
+        predictor.cache_series = CacheSeries(directorio)
+        t_escritura, _ = medir(lambda: predictor.preparar_serie(df))
+        t_mapeo, (matriz, etiquetas) = medir(lambda: predictor.preparar_serie(df), max(3, repeticiones))
+        pico_mapeo, _ = medir_memoria(lambda: predictor.preparar_serie(df))
+        iguales = np.array_equal(referencia, matriz) and np.array_equal(etiquetas_ref, etiquetas)
+
+        # Folds de generar_reporte_evaluacion: X[train_index] copiaba las ventanas de cada fold
+        X = ventanas_temporales.ventanas_entrada(matriz, 12)
+        folds = list(TimeSeriesSplit(n_splits=5).split(np.arange(len(X))))
+        mb_copias = sum(len(tr) + len(te) for tr, te in folds) * X.shape[1] * X.shape[2] * 4 / 1024 ** 2
+        del X, matriz, etiquetas
+
+    print(f"preparar_serie sin caché: {t_calculo:.3f} s")
+    print(f"Primera vez con caché (cálculo + escritura): {t_escritura:.3f} s")
+    print(f"Serie mapeada desde la caché: {t_mapeo:.3f} s (x{t_calculo / max(t_mapeo, 1e-9):.0f}), "
+          f"pico {pico_mapeo:.1f} MB de memoria propia")
+    print(f"Copias de ventanas evitadas en la evaluación (5 folds): {mb_copias:.1f} MB")
+    print(f"Misma serie: {iguales}")
+    return {'calculo': t_calculo, 'escritura': t_escritura, 'mapeo': t_mapeo, 'mb_folds': mb_copias}
+
+
+def benchmark_entrenamiento_ensemble(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Tiempo de pared del ensemble entrenado modelo por modelo vs un proceso por modelo"""
+    import tempfile
+    from cache_series import CacheSeries
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    df = predictor.enhance_features(cargar_dataset(ruta, filas or 3000))
+    predictor._entrenar_normalizadores(df)
+    predictor.preparar_categorias(df)
+    epochs = max(2, repeticiones)
+    nucleos = predictor.perfil['recursos']['nucleos_utilizables']
+
+    def entrenar(paralelo):
+        return predictor.entrenar_ensemble_serie(df, epochs=epochs, batch_size=64, paralelo=paralelo)
+
+    directorio_actual = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio:
+        # Los modelos se guardan en modelos/ del directorio de trabajo: no se tocan los del proyecto
+        os.makedirs(os.path.join(directorio, 'modelos'))
+        os.chdir(directorio)
+        try:
+            # La serie se prepara antes de medir: los procesos la mapean desde su entrada de cache_series
+            predictor.cache_series = CacheSeries(os.path.join(directorio, 'cache_series'))
+            matriz, _ = predictor.preparar_serie(df)
+            print(f"\n=== Benchmark de entrenamiento del ensemble ({len(matriz)} registros, {epochs} épocas, "
+                  f"{nucleos} núcleos) ===")
+            t_secuencial, _ = medir(lambda: entrenar(False))
+            t_paralelo, historiales = medir(lambda: entrenar(True))
+        finally:
+            os.chdir(directorio_actual)
+
+    print(f"Modelo por modelo:   {t_secuencial:.1f} s")
+    print(f"Un proceso por modelo: {t_paralelo:.1f} s (x{t_secuencial / max(t_paralelo, 1e-9):.2f})")
+    print(f"Épocas por modelo: {[len(h.history['loss']) for h in historiales]}")
+    return {'secuencial': t_secuencial, 'paralelo': t_paralelo}
+
+
+def benchmark_busqueda(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Búsqueda aleatoria original (5 configuraciones x 15 épocas) vs reducción sucesiva con 5 y 50 configuraciones"""
+    import tempfile
+    import busqueda_hiperparametros
+    import ventanas_temporales
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    predictor.cache_series = None
+    df = predictor.enhance_features(cargar_dataset(ruta, filas or 1500))
+    predictor._entrenar_normalizadores(df)
+    predictor.preparar_categorias(df)
+    matriz, etiquetas = predictor.preparar_serie(df)
+    nucleos = predictor.perfil['recursos']['nucleos_utilizables']
+    print(f"\n=== Benchmark de búsqueda de hiperparámetros ({len(matriz)} registros, {nucleos} núcleos) ===")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        np.save(os.path.join(directorio, 'matriz.npy'), matriz)
+        np.save(os.path.join(directorio, 'etiquetas.npy'), etiquetas)
+
+        def aleatoria():
+            # Búsqueda original: un modelo nuevo (trazado y compilado) por configuración, 15 épocas
+            # con validación en cada una y parada temprana
+            from entorno_tensorflow import keras
+            from ensemble_paralelo import dataset_desde_memmap
+            X = ventanas_temporales.ventanas_entrada(matriz, busqueda_hiperparametros.VENTANA_TIEMPO)
+            y = ventanas_temporales.ventanas_objetivo(etiquetas, busqueda_hiperparametros.VENTANA_TIEMPO)
+            inicios_train, inicios_val = ventanas_temporales.dividir_inicios(len(X), 0.2)
+            mejor = None
+            for config in busqueda_hiperparametros.muestrear_configuraciones(5):
+                modelo = busqueda_hiperparametros.crear_modelo_prueba(
+                    (X.shape[1], X.shape[2]), predictor.num_categorias, config)
+                historia = modelo.fit(
+                    dataset_desde_memmap(X, y, config['batch_size'], barajar=True, indices=inicios_train),
+                    validation_data=dataset_desde_memmap(X, y, config['batch_size'], indices=inicios_val),
+                    epochs=15, verbose=0,
+                    callbacks=[keras.callbacks.EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)])
+                val_loss = min(historia.history['val_loss'])
+                mejor = val_loss if mejor is None else min(mejor, val_loss)
+            return {'val_loss': mejor}
+
+        def sucesiva(num_configuraciones):
+            return busqueda_hiperparametros.buscar(
+                matriz, etiquetas, predictor.num_categorias, num_configuraciones=num_configuraciones,
+                nucleos=nucleos, directorio_serie=directorio,
+                ruta_registro=os.path.join(directorio, f'registro_{num_configuraciones}.jsonl'),
+                directorio_pruebas=os.path.join(directorio, 'pruebas'))[0]
+
+        t_aleatoria, mejor_aleatoria = medir(aleatoria)
+        t_sucesiva_5, mejor_sucesiva_5 = medir(lambda: sucesiva(5))
+        t_sucesiva, mejor_sucesiva = medir(lambda: sucesiva(50))
+        t_reanudada, _ = medir(lambda: sucesiva(50))  # Todo está en el registro: no se entrena nada
+
+    print(f"Aleatoria, 5 configuraciones:           {t_aleatoria:.1f} s, mejor val_loss {mejor_aleatoria['val_loss']:.4f}")
+    print(f"Reducción sucesiva, 5 configuraciones:  {t_sucesiva_5:.1f} s, mejor val_loss {mejor_sucesiva_5['val_loss']:.4f}")
+    print(f"Reducción sucesiva, 50 configuraciones: {t_sucesiva:.1f} s, mejor val_loss {mejor_sucesiva['val_loss']:.4f}")
+    print(f"Reanudación con el registro completo:   {t_reanudada:.2f} s")
+    return {'aleatoria': t_aleatoria, 'sucesiva_5': t_sucesiva_5, 'sucesiva': t_sucesiva, 'reanudada': t_reanudada}
+
+
+def metodo_original(nombre, ruta=RUTA_PREDICTOR_ORIGINAL):
+    """Método de PrediccionMeteo tal como está en la copia de respaldo (código original, sin cambios),
+    como función que recibe el predictor como primer argumento"""
+    import ast
+    import textwrap
+    from datetime import datetime, timedelta
+
+    with open(ruta, 'r', encoding='utf-8') as f:
+        fuente = f.read()
+    for nodo in ast.walk(ast.parse(fuente)):
+        if isinstance(nodo, ast.FunctionDef) and nodo.name == nombre:
+            espacio = {'np': np, 'pd': pd, 'datetime': datetime, 'timedelta': timedelta}
+            exec(textwrap.dedent(ast.get_source_segment(fuente, nodo)), espacio)
+            return espacio[nombre]
+    raise ValueError(f"{nombre} no está en {ruta}")
+
+
+def benchmark_posprocesado(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Corrección física de pronósticos de 72 horas: asegurar_consistencia_fisica original (copia de
+    respaldo) vs columnas"""
+    from predictor_model import PrediccionMeteo
+
+    predictor = PrediccionMeteo()
+    num_pronosticos = filas or 50
+    categorias = ['Frio + Nublado', 'Templado + Parcialmente Nublado', 'Calido + Alta Radiacion + Soleado',
+                  'Calido + Soleado', 'Templado + Alta Radiacion', 'Calido + Nublado + Llovizna']
+    rng = np.random.default_rng(0)
+    pronosticos = []
+    for _ in range(num_pronosticos):
+        fechas = pd.date_range(pd.Timestamp('2025-01-01') + pd.Timedelta(hours=int(rng.integers(0, 8000))),
+                               periods=72, freq='h')
+        pronosticos.append([{
+            'fecha': fecha.strftime('%Y-%m-%d %H:%M'),
+            'categoria': categorias[rng.integers(len(categorias))],
+            'confianza': float(rng.uniform(0.45, 0.9)),
+            'temperatura': np.round(rng.normal(15.5, 3.5), 1),  # np.float64, como en construir_predicciones
+            'detalles': None
+        } for fecha in fechas])
+    print(f"\n=== Benchmark de post-procesamiento ({num_pronosticos} pronósticos de 72 horas) ===")
+
+    original = metodo_original('asegurar_consistencia_fisica')
+
+    def por_registros():
+        return [original(predictor, [dict(p) for p in pronostico]) for pronostico in pronosticos]
+
+    def por_columnas():
+        return [predictor.asegurar_consistencia_fisica(pronostico) for pronostico in pronosticos]
+
+    t_registros, referencia = medir(por_registros, repeticiones)
+    t_columnas, resultado = medir(por_columnas, repeticiones)
+    diferencias = sum((a['categoria'], a['temperatura']) != (b['categoria'], b['temperatura'])
+                      for ref, res in zip(referencia, resultado) for a, b in zip(ref, res))
+    print(f"Por registros: {t_registros:.3f} s")
+    print(f"Por columnas:  {t_columnas:.3f} s (x{t_registros / max(t_columnas, 1e-9):.1f})")
+    print(f"Predicciones diferentes: {diferencias}")
+    return {'registros': t_registros, 'columnas': t_columnas, 'diferencias': diferencias}
+
+
+def benchmark_pronostico_compacto(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Pronósticos como listas de diccionarios con detalles vs Pronostico compacto con detalles diferidos"""
+    from sklearn.preprocessing import LabelEncoder
+    from predictor_model import PrediccionMeteo
+    from pronostico_compacto import como_dataframe
+
+    predictor = PrediccionMeteo()
+    categorias = ['Frio + Nublado', 'Templado + Parcialmente Nublado', 'Calido + Alta Radiacion + Soleado',
+                  'Calido + Soleado', 'Templado + Alta Radiacion', 'Calido + Nublado + Llovizna']
+    predictor.label_encoder = LabelEncoder().fit(categorias)
+    predictor.num_categorias = len(categorias)
+    num_pronosticos = filas or 100
+    rng = np.random.default_rng(0)
+    entradas = [(rng.normal(0, 2, (72, len(categorias))).astype(np.float32), rng.uniform(0.3, 0.9, 72),
+                 pd.Timestamp('2025-01-01') + pd.Timedelta(hours=int(rng.integers(0, 8000))))
+                for _ in range(num_pronosticos)]
+    print(f"\n=== Benchmark de pronóstico compacto ({num_pronosticos} pronósticos de 72 horas) ===")
+
+    def compactos():
+        return [predictor.construir_predicciones(probs, confianza, fecha) for probs, confianza, fecha in entradas]
+
+    def diccionarios():
+        # Estructura anterior: todos los textos y detalles generados al construir
+        return [pronostico.a_registros() for pronostico in compactos()]
+
+    t_dicts, listas = medir(diccionarios, repeticiones)
+    t_compacto, pronosticos = medir(compactos, repeticiones)
+    pico_dicts, _ = medir_memoria(diccionarios)
+    pico_compacto, _ = medir_memoria(compactos)
+    t_df_dicts, _ = medir(lambda: [como_dataframe(lista) for lista in listas], repeticiones)
+    t_df_compacto, _ = medir(lambda: [como_dataframe(pronostico) for pronostico in pronosticos], repeticiones)
+
+    print(f"Diccionarios: {t_dicts:.3f} s, pico {pico_dicts:.1f} MB, a DataFrame {t_df_dicts:.3f} s")
+    print(f"Compacto:     {t_compacto:.3f} s, pico {pico_compacto:.1f} MB, a DataFrame {t_df_compacto:.3f} s")
+    return {'diccionarios': t_dicts, 'compacto': t_compacto, 'pico_diccionarios': pico_dicts,
+            'pico_compacto': pico_compacto, 'dataframe_diccionarios': t_df_dicts, 'dataframe_compacto': t_df_compacto}
+
+
+def _temperaturas_por_llamadas(inicio, horas=72):
+    """predecir_temperatura original: una llamada por hora, np.random sembrado dos veces en cada una"""
+    from datetime import timedelta
+    from proyeccion_temperatura import TENDENCIA_HORA
+
+    previas = []
+    for hora_futura in range(horas):
+        fecha_futura = inicio + timedelta(hours=hora_futura)
+        ajuste_estacional = -0.8 if fecha_futura.month in [12, 1, 2] else -0.5 if fecha_futura.month in [6, 7, 8] else 0
+        variacion_dia = np.sin(fecha_futura.weekday() * np.pi/3) * 0.8
+        seed = int(f"{fecha_futura.year}{fecha_futura.month:02d}{fecha_futura.day:02d}")
+        np.random.seed(seed)
+        temperatura = (14.0 + TENDENCIA_HORA[fecha_futura.hour] + ajuste_estacional + variacion_dia
+                       + np.random.normal(0, 0.6))
+        np.random.seed(seed + hora_futura)
+        temperatura = max(min(temperatura + np.random.normal(0, 0.2), 19.0), 10.0)
+        if hora_futura > 0:
+            max_cambio = 1.2 if 7 <= fecha_futura.hour <= 10 else 0.7
+            if abs(temperatura - previas[-1]) > max_cambio:
+                temperatura = previas[-1] + (max_cambio if temperatura > previas[-1] else -max_cambio)
+        previas.append(temperatura)
+    return np.array([round(t, 1) for t in previas])
+
+
+def benchmark_temperatura(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Temperatura de 72 horas: llamadas por hora con np.random global vs proyección vectorizada"""
+    from proyeccion_temperatura import proyectar_temperaturas
+
+    num_inicios = filas or 1000
+    inicios = pd.date_range('2020-01-01 05:00', periods=num_inicios, freq='17h')
+    print(f"\n=== Benchmark de proyección de temperatura ({num_inicios} inicios x 72 horas) ===")
+
+    t_llamadas, referencia = medir(lambda: np.array([_temperaturas_por_llamadas(inicio) for inicio in inicios]),
+                                   repeticiones)
+    t_uno_a_uno, _ = medir(lambda: [proyectar_temperaturas(inicio) for inicio in inicios], repeticiones)
+    t_lote, resultado = medir(lambda: proyectar_temperaturas(inicios.values), repeticiones)
+    diferencias = int((referencia != resultado).sum())
+    print(f"Llamadas por hora:       {t_llamadas:.3f} s")
+    print(f"Proyección por inicio:   {t_uno_a_uno:.3f} s (x{t_llamadas / max(t_uno_a_uno, 1e-9):.1f})")
+    print(f"Proyección en un lote:   {t_lote:.3f} s (x{t_llamadas / max(t_lote, 1e-9):.1f})")
+    print(f"Temperaturas diferentes: {diferencias}")
+    return {'llamadas': t_llamadas, 'por_inicio': t_uno_a_uno, 'lote': t_lote, 'diferencias': diferencias}
+
+
+def benchmark_lote(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Backtest: predecir_proximo_periodo sobre el histórico recortado en cada ancla vs predecir_lote"""
+    import contextlib
+    import io
+
+    df = cargar_dataset(ruta, filas or 8760)
+    predictor = _predictor_con_modelo(df)
+    anclas = df.index[200::97]
+    muestra = anclas[::max(1, len(anclas) // 20)]  # El recorrido ancla por ancla solo sobre una muestra
+    print(f"\n=== Benchmark de pronóstico por lotes ({len(df)} registros, {len(anclas)} anclas) ===")
+
+    def por_ancla():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [predictor.predecir_proximo_periodo(df.loc[:ancla]) for ancla in muestra]
+
+    def en_lote(seleccion):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return predictor.predecir_lote(df, seleccion)
+
+    en_lote(muestra[:1])  # Características y serie en caché, modelo ya trazado
+    t_por_ancla, _ = medir(por_ancla, repeticiones)
+    t_muestra, _ = medir(lambda: en_lote(muestra), repeticiones)
+    t_lote, lote = medir(lambda: en_lote(anclas), repeticiones)
+    por_pronostico = t_por_ancla / len(muestra)
+    print(f"Recorte por ancla:  {por_pronostico * 1000:.1f} ms por pronóstico ({len(muestra)} anclas, {t_por_ancla:.2f} s)")
+    print(f"Lote de la muestra: {t_muestra:.2f} s (x{t_por_ancla / max(t_muestra, 1e-9):.1f})")
+    print(f"Lote completo:      {t_lote / len(anclas) * 1000:.1f} ms por pronóstico "
+          f"({len(anclas)} anclas, {t_lote:.2f} s; x{por_pronostico * len(anclas) / max(t_lote, 1e-9):.1f} estimado)")
+    print(f"Bloque resultante:  {lote.shape}")
+    return {'por_ancla': por_pronostico, 'muestra': t_muestra, 'lote': t_lote, 'anclas': len(anclas)}
+
+
+def _metricas_sklearn(reales, predichas, num_categorias):
+    """Métricas de validar_modelo antes de evaluacion_temporal: confusion_matrix, bucle por clase y
+    precision_recall_fscore_support, repetidos para cada horizonte"""
+    from sklearn.metrics import confusion_matrix, precision_recall_fscore_support
+
+    reales_flat, predichas_flat = reales.ravel(), predichas.ravel()
+    precision, recall, f1, _ = precision_recall_fscore_support(reales_flat, predichas_flat, average='weighted',
+                                                               zero_division=0)
+    cm = confusion_matrix(reales_flat, predichas_flat)
+    exactitud_por_clase = {}
+    for i in range(num_categorias):
+        mask_true = reales_flat == i
+        if mask_true.sum() > 0:
+            exactitud_por_clase[i] = (predichas_flat[mask_true] == i).sum() / mask_true.sum()
+    f1_horizonte = [precision_recall_fscore_support(reales[:, h], predichas[:, h], average='weighted',
+                                                    zero_division=0)[2] for h in range(reales.shape[1])]
+    return f1, np.array(f1_horizonte), cm, exactitud_por_clase
+
+
+def benchmark_metricas(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Métricas de evaluación: sklearn por clase y por horizonte vs matrices de confusión con np.bincount"""
+    import evaluacion_temporal
+
+    num_ventanas, num_categorias = filas or 20000, 60
+    rng = np.random.default_rng(0)
+    reales = rng.integers(0, num_categorias, (num_ventanas, 72))
+    predichas = np.where(rng.random(reales.shape) < 0.4, reales, rng.integers(0, num_categorias, reales.shape))
+    print(f"\n=== Benchmark de métricas de evaluación ({num_ventanas} ventanas x 72 horas, {num_categorias} categorías) ===")
+
+    def con_bincount():
+        matrices = evaluacion_temporal.matrices_por_horizonte(reales, predichas, num_categorias)
+        return evaluacion_temporal.metricas_confusion(matrices.sum(axis=0)), evaluacion_temporal.metricas_confusion(matrices)
+
+    t_sklearn, (f1, f1_horizonte, _, _) = medir(lambda: _metricas_sklearn(reales, predichas, num_categorias), repeticiones)
+    t_bincount, (globales, por_horizonte) = medir(con_bincount, repeticiones)
+    diferencia = max(abs(f1 - globales['f1']), np.abs(f1_horizonte - por_horizonte['f1']).max())
+    print(f"sklearn:  {t_sklearn:.3f} s")
+    print(f"bincount: {t_bincount:.3f} s (x{t_sklearn / max(t_bincount, 1e-9):.1f})")
+    print(f"Diferencia máxima de F1: {diferencia:.2e}")
+    return {'sklearn': t_sklearn, 'bincount': t_bincount, 'diferencia': float(diferencia)}
+
+
+def _volcado_estacion(dias, minutos=5):
+    """Volcado CSV sintético de la estación (formato de 10 columnas, con encabezados)"""
+    fechas = pd.date_range('2024-01-01', periods=dias * 24 * 60 // minutos, freq=f'{minutos}min')
+    rng = np.random.default_rng(0)
+    tabla = pd.DataFrame({
+        'fecha_hora': fechas.strftime('%Y-%m-%d %H:%M:%S'),
+        'temp_dht_cal': rng.normal(14, 3, len(fechas)).round(2),
+        'hum_dht_raw': rng.uniform(40, 100, len(fechas)).round(1),
+        'lluvia_mm': rng.exponential(0.1, len(fechas)).round(2),
+        'cobertura_nubes_octas': rng.integers(0, 9, len(fechas)),
+        'vel_viento_kmh': rng.uniform(0, 30, len(fechas)).round(1),
+        'direccion_viento': rng.choice(['N', 'NE', 'E', 'SE', 'S', 'SO', 'O', 'NO'], len(fechas)),
+        'radiacion_solar_J_m2': rng.uniform(0, 3000, len(fechas)).round(1),
+        'radiacion_solar_wm2': rng.uniform(0, 1000, len(fechas)).round(1),
+        'condicion_climatica': rng.choice(['Soleado', 'Nublado', 'Lluvia'], len(fechas))
+    })
+    return tabla.to_csv(index=False)
+
+
+def _parsear_por_celdas(texto):
+    """process_csv_data + parse_csv_to_data antes de parser_estacion: dos pasadas por líneas y float()
+    celda por celda hacia listas"""
+    import re
+    from parser_estacion import COLUMNAS_DATOS, COLUMNAS_NUMERICAS, indices_columnas
+
+    lineas = [linea.strip() for linea in texto.split('\n') if linea.strip()]
+    procesadas = [lineas[0]]
+    for linea in lineas[1:]:
+        if not re.match(r'^\d{4}[-/]', linea) and any(p in linea.lower() for p in ["ayuda", "info", "reset"]):
+            continue
+        procesadas.append(linea)
+    lineas = [linea.strip() for linea in '\n'.join(procesadas).split('\n') if linea.strip()]
+    indices = indices_columnas([h.strip() for h in lineas[0].split(',')])
+    datos = {columna: [] for columna in COLUMNAS_DATOS}
+    for linea in lineas[1:]:
+        if any(p in linea.lower() for p in ["ayuda", "comando", "logout", "reset"]):
+            continue
+        valores = [v.strip() for v in linea.split(',')]
+        if len(valores) < 3:
+            continue
+        for columna, i in indices.items():
+            if columna in datos:
+                valor = valores[i] if i < len(valores) else None
+                if columna in COLUMNAS_NUMERICAS:
+                    try:
+                        valor = float(valor)
+                    except (TypeError, ValueError):
+                        valor = None
+                datos[columna].append(valor)
+    return datos
+
+
+def benchmark_parser_estacion(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Volcado de DATOS de varias semanas cada 5 minutos: celda por celda vs ParserEstacion por fragmentos"""
+    from parser_estacion import ParserEstacion
+
+    dias = filas or 60
+    texto = _volcado_estacion(dias)
+    crudo = texto.encode()
+    print(f"\n=== Benchmark del parser de la estación ({dias} días, {len(crudo) / 1e6:.1f} MB) ===")
+
+    def por_fragmentos(tamano=4096):
+        parser = ParserEstacion()
+        for inicio in range(0, len(crudo), tamano):
+            parser.alimentar(crudo[inicio:inicio + tamano])
+        parser.terminar()
+        return parser
+
+    t_celdas, datos = medir(lambda: _parsear_por_celdas(texto), repeticiones)
+    t_parser, parser = medir(por_fragmentos, repeticiones)
+    t_listas, listas = medir(parser.a_listas, repeticiones)
+    print(f"Celda por celda:              {t_celdas:.3f} s")
+    print(f"ParserEstacion (4 KB):        {t_parser:.3f} s (x{t_celdas / max(t_parser, 1e-9):.1f})")
+    print(f"a_listas():                   {t_listas:.3f} s")
+    iguales = listas == datos
+    print(f"Resultados iguales: {iguales} ({parser.registros} registros)")
+    return {'celda_a_celda': t_celdas, 'parser': t_parser, 'a_listas': t_listas, 'iguales': iguales}
+
+
+def _dia_por_strptime(datos, dia):
+    """Consulta de un día antes de LecturasEstacion: strptime de todas las fechas y comparación de
+    año, mes y día (lo que repetían update_charts y calculate_water_volume en cada llamada)"""
+    from datetime import datetime
+
+    fechas = []
+    for d in datos['fecha']:
+        try:
+            fechas.append(datetime.strptime(d, "%Y/%m/%d %H:%M:%S" if '/' in d else "%Y-%m-%d %H:%M:%S"))
+        except (TypeError, ValueError):
+            fechas.append(None)
+    return [(f, datos['precipitacion_mm'][i]) for i, f in enumerate(fechas)
+            if f is not None and (f.year, f.month, f.day) == (dia.year, dia.month, dia.day)]
+
+
+def benchmark_lecturas(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Lecturas de la estación: diccionario de listas (strptime en cada consulta) vs LecturasEstacion"""
+    from lecturas_estacion import LecturasEstacion
+    from parser_estacion import ParserEstacion
+
+    dias = filas or 365
+    parser = ParserEstacion()
+    parser.alimentar(_volcado_estacion(dias))
+    parser.terminar()
+    listas = parser.a_listas()
+    dia = pd.Timestamp('2024-01-01') + pd.Timedelta(days=dias // 2)
+    print(f"\n=== Benchmark del almacén de lecturas ({parser.registros} registros, {dias} días cada 5 minutos) ===")
+
+    t_construir, lecturas = medir(lambda: LecturasEstacion.desde_columnas(parser.arreglos()), repeticiones)
+    memoria_listas, _ = medir_memoria(parser.a_listas)
+    memoria_lecturas, _ = medir_memoria(lambda: LecturasEstacion.desde_columnas(parser.arreglos()))
+    t_listas, registros_listas = medir(lambda: _dia_por_strptime(listas, dia), repeticiones)
+    t_lecturas, seleccion = medir(lambda: lecturas.dia(dia), repeticiones)
+    t_fechas, _ = medir(lambda: lecturas.fechas(), repeticiones)
+    print(f"Construir LecturasEstacion (fechas interpretadas una vez): {t_construir:.3f} s")
+    print(f"Memoria: listas {memoria_listas:.1f} MB, columnas {memoria_lecturas:.1f} MB")
+    print(f"Un día, listas + strptime: {t_listas * 1000:.1f} ms")
+    print(f"Un día, searchsorted:      {t_lecturas * 1000:.3f} ms (x{t_listas / max(t_lecturas, 1e-9):.0f})")
+    print(f"Fechas para gráficos:      {t_fechas * 1000:.3f} ms")
+    iguales = len(registros_listas) == seleccion.stop - seleccion.start
+    print(f"Mismos registros del día: {iguales} ({len(registros_listas)})")
+    return {'construir': t_construir, 'dia_listas': t_listas, 'dia_lecturas': t_lecturas, 'iguales': iguales}
+
+
+def _maximo_dia_por_registros(registros):
+    """Lectura máxima del día como en calculate_water_volume antes de ResumenLluvia"""
+    maximo, fecha_maximo = 0, None
+    for fecha, lluvia in registros:
+        if lluvia is not None and lluvia > maximo:
+            maximo, fecha_maximo = lluvia, fecha
+    if fecha_maximo is None:
+        fecha_maximo, maximo = registros[-1][0], registros[-1][1] or 0
+    return maximo, fecha_maximo
+
+
+def benchmark_dias_lluvia(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Cambio de día en la pestaña de agua: recorrer todas las fechas vs la tabla de días de ResumenLluvia"""
+    from lecturas_estacion import LecturasEstacion
+    from parser_estacion import ParserEstacion
+
+    dias = filas or 365
+    parser = ParserEstacion()
+    parser.alimentar(_volcado_estacion(dias))
+    parser.terminar()
+    listas = parser.a_listas()
+    lecturas = LecturasEstacion.desde_columnas(parser.arreglos())
+    consultados = [pd.Timestamp('2024-01-01') + pd.Timedelta(days=int(d)) for d in np.linspace(0, dias - 1, 10)]
+    print(f"\n=== Benchmark de consultas por día ({lecturas.resumen_lluvia().registros} registros, {dias} días; "
+          f"{len(consultados)} días consultados) ===")
+
+    def por_recorrido():
+        return [_maximo_dia_por_registros(_dia_por_strptime(listas, dia))[0] for dia in consultados]
+
+    def por_resumen():
+        lecturas._resumen = None  # Incluye construir la tabla de días
+        resumen = lecturas.resumen_lluvia()
+        return [resumen.detalle(dia)['precipitacion_mm'] for dia in consultados]
+
+    t_recorrido, maximos_recorrido = medir(por_recorrido, repeticiones)
+    t_resumen, maximos_resumen = medir(por_resumen, repeticiones)
+    resumen = lecturas.resumen_lluvia()
+    t_cambio, _ = medir(lambda: [resumen.detalle(dia) for dia in consultados], repeticiones)
+    print(f"Recorrido con strptime:       {t_recorrido:.3f} s")
+    print(f"Tabla de días (construcción): {t_resumen * 1000:.1f} ms (x{t_recorrido / max(t_resumen, 1e-9):.0f})")
+    print(f"Cambio de día ya resumido:    {t_cambio / len(consultados) * 1e6:.1f} µs por día")
+    diferencia = float(np.max(np.abs(np.array(maximos_recorrido) - np.array(maximos_resumen))))
+    print(f"Diferencia máxima de lluvia acumulada: {diferencia:.2e} mm")
+    return {'recorrido': t_recorrido, 'resumen': t_resumen, 'cambio_dia': t_cambio / len(consultados),
+            'diferencia': diferencia}
+
+
+
+def _figuras_estacion():
+    """Las cuatro figuras de la pestaña de gráficos (sin Tk): [(figura, lienzo, ejes)]"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figuras = []
+    for filas, tamano in [(2, (9, 7)), (1, (9, 6)), (2, (9, 7)), (2, (9, 7))]:
+        figura = Figure(figsize=tamano, dpi=80)
+        lienzo = FigureCanvasAgg(figura)
+        figuras.append((figura, lienzo, list(figura.subplots(filas, 1, squeeze=False)[:, 0])))
+    return figuras
+
+
+def _graficos_por_limpieza(figuras, lecturas, grados):
+    """update_charts antes de graficos_estacion: limpiar los siete ejes, dibujar todos los registros
+    (barras para la lluvia) y redibujar las cuatro figuras"""
+    (_, _, (temp, hum)), (_, _, (lluvia,)), (_, _, (vel, direccion)), (_, _, (rad, lux)) = figuras
+    fechas = lecturas.fechas()
+    for eje, columna in [(temp, 'temperatura_C'), (hum, 'humedad_relativa'), (vel, 'velocidad_viento_kmh'),
+                         (rad, 'radiacion_solar_wm2'), (lux, 'luminosidad_lux')]:
+        eje.clear()
+        eje.plot(fechas, lecturas.valores(columna), '-', marker='o', markersize=2)
+    lluvia.clear()
+    lluvia.bar(fechas, lecturas.valores('precipitacion_mm'), width=0.01)
+    direccion.clear()
+    tabla = np.array([grados.get(texto, np.nan) for texto in lecturas.categorias['direccion_viento']] + [np.nan])
+    valores = tabla[lecturas.valores('direccion_viento')]
+    validos = ~np.isnan(valores)
+    direccion.scatter(fechas[validos], valores[validos], s=15)
+    for figura, lienzo, _ in figuras:
+        figura.tight_layout()
+        lienzo.draw()
+
+
+def benchmark_graficos(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Gráficos de la estación: limpiar y redibujar todo vs series persistentes diezmadas con blit,
+    con un historial corto y uno largo"""
+    from graficos_estacion import CATEGORIAS, MAXIMO, PanelSeries
+    from lecturas_estacion import LecturasEstacion
+    from parser_estacion import ParserEstacion
+
+    dias = filas or 90
+    parser = ParserEstacion()
+    parser.alimentar(_volcado_estacion(dias))
+    parser.terminar()
+    columnas = parser.arreglos()
+    grados = {'N': 0, 'NE': 45, 'E': 90, 'SE': 135, 'S': 180, 'SO': 225, 'O': 270, 'NO': 315}
+    print(f"\n=== Benchmark de gráficos de la estación (hasta {len(columnas['fecha'])} registros, {dias} días) ===")
+
+    def paneles():
+        figuras = _figuras_estacion()
+        lista = []
+        for (figura, lienzo, ejes), columnas_ejes in zip(figuras, [
+                ['temperatura_C', 'humedad_relativa'], ['precipitacion_mm'],
+                ['velocidad_viento_kmh', 'direccion_viento'], ['radiacion_solar_wm2', 'luminosidad_lux']]):
+            panel = PanelSeries(figura, lienzo)
+            for eje, columna in zip(ejes, columnas_ejes):
+                if columna == 'precipitacion_mm':
+                    panel.linea(eje, columna, '-', modo=MAXIMO, linewidth=2)
+                    panel.fijar_y(eje, 0)
+                elif columna == 'direccion_viento':
+                    panel.linea(eje, columna, 'o', modo=CATEGORIAS, grados=grados, markersize=4)
+                    panel.fijar_y(eje, -20, 335)
+                else:
+                    panel.linea(eje, columna, '-', marker='o', markersize=2)
+            lista.append(panel)
+        return lista
+
+    resultados = {}
+    for total in [len(columnas['fecha']) // 10, len(columnas['fecha'])]:
+        lecturas = LecturasEstacion.desde_columnas({c: v[:total - 1] for c, v in columnas.items()})
+        siguiente = {c: v[total - 1:total] for c, v in columnas.items()}
+        figuras = _figuras_estacion()
+        t_limpieza, _ = medir(lambda: _graficos_por_limpieza(figuras, lecturas, grados), repeticiones)
+        lista = paneles()
+        t_completo, _ = medir(lambda: [panel.actualizar(lecturas) for panel in lista], 1)
+        # Una lectura nueva (lo que llega en cada actualización automática)
+        lecturas.agregar(siguiente)
+        t_nueva, redibujados = medir(lambda: [panel.actualizar(lecturas) for panel in lista], 1)
+        puntos = sum(len(linea.get_xdata()) for panel in lista for _, linea, _, _ in panel.series)
+        print(f"{total} registros:")
+        print(f"  Limpiar y redibujar todo:         {t_limpieza * 1000:.0f} ms")
+        print(f"  Series persistentes (primera vez): {t_completo * 1000:.0f} ms")
+        print(f"  Una lectura nueva (blit):          {t_nueva * 1000:.0f} ms (x{t_limpieza / max(t_nueva, 1e-9):.0f}); "
+              f"{puntos} puntos dibujados")
+        resultados[total] = {'limpieza': t_limpieza, 'completo': t_completo, 'nueva': t_nueva, 'puntos': puntos}
+    return resultados
+
+# Módulos que se ejecutan directamente o que importan las interfaces gráficas
+PUNTOS_ENTRADA = ['meteo_main', 'estacion_meteorologica', 'ProcesarDatosGUI', 'visualizaciones',
+                  'predictor_model', 'actualizacion_programada', 'servidor_prediccion']
+
+
+def _tiempos_importacion(modulo):
+    """Ejecuta `python -X importtime -c "import modulo"` y devuelve (segundos, error, {paquete: (propio, acumulado)})"""
+    import subprocess
+    import sys
+
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                             capture_output=True, text=True, check=False)
+    t_total = time.perf_counter() - inicio
+
+    tiempos = {}
+    error = None
+    for linea in proceso.stderr.splitlines():
+        if linea.startswith('import time:'):
+            partes = linea[len('import time:'):].split('|')
+            if len(partes) == 3 and partes[0].strip().isdigit():
+                paquete = partes[2].strip()
+                tiempos[paquete] = (int(partes[0]) / 1e6, int(partes[1]) / 1e6)
+        elif linea.strip():
+            error = linea.strip()  # La última línea fuera del informe es el error, si lo hubo
+    if proceso.returncode == 0:
+        error = None
+    return t_total, error, tiempos
+
+
+def benchmark_arranque(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Tiempo de importación de cada punto de entrada (python -X importtime) y si carga TensorFlow"""
+    print("\n=== Benchmark de arranque (python -X importtime) ===")
+    resultados = {}
+    for modulo in PUNTOS_ENTRADA:
+        t_total, (_, error, tiempos) = medir(lambda: _tiempos_importacion(modulo), repeticiones)
+        if error:
+            print(f"{modulo:<26} no se pudo importar: {error}")
+            resultados[modulo] = {'error': error}
+            continue
+        acumulado = tiempos.get(modulo, (0.0, 0.0))[1]
+        usa_tensorflow = 'tensorflow' in tiempos
+        # Paquetes de primer nivel (sin submódulos) que más tiempo propio acumulan
+        raices = {}
+        for paquete, (propio, _) in tiempos.items():
+            raiz = paquete.split('.')[0]
+            raices[raiz] = raices.get(raiz, 0.0) + propio
+        mayores = sorted(raices.items(), key=lambda par: par[1], reverse=True)[:3]
+        print(f"{modulo:<26} proceso {t_total:.2f} s, importación {acumulado:.2f} s, "
+              f"TensorFlow: {'sí' if usa_tensorflow else 'no'} | "
+              + ", ".join(f"{raiz} {t:.2f} s" for raiz, t in mayores))
+        resultados[modulo] = {'proceso': t_total, 'importacion': acumulado,
+                              'tensorflow': usa_tensorflow, 'mayores': mayores}
+    return resultados
+
+
+# Script que mide, en un proceso nuevo, un paso de entrenamiento y una inferencia con unos hilos dados
+_MEDICION_HILOS = """
+import json, sys, time
+import numpy as np
+from entorno_tensorflow import inicializar_tensorflow
+inicializar_tensorflow(hilos_intra_op=int(sys.argv[1]), hilos_inter_op=int(sys.argv[2]), mostrar_info=False)
+from predictor_model import PrediccionMeteo
+p = PrediccionMeteo()
+modelo = p.crear_modelo_ultraligero((12, 17), 30)
+rng = np.random.default_rng(0)
+x = rng.random((256, 12, 17), dtype=np.float32)
+y = rng.integers(0, 30, (256, 72))
+modelo.train_on_batch(x, y)
+modelo.predict_on_batch(x)
+entrenamiento = inferencia = float('inf')
+for _ in range(int(sys.argv[3])):
+    inicio = time.perf_counter(); modelo.train_on_batch(x, y)
+    entrenamiento = min(entrenamiento, time.perf_counter() - inicio)
+    inicio = time.perf_counter(); modelo.predict_on_batch(x)
+    inferencia = min(inferencia, time.perf_counter() - inicio)
+print(json.dumps({'entrenamiento': entrenamiento, 'inferencia': inferencia}))
+"""
+
+
+def benchmark_hilos(ruta=RUTA_DATASET, filas=None, repeticiones=1):
+    """Prueba combinaciones de hilos de TensorFlow y BLAS y guarda la más rápida en perfil_rendimiento.json"""
+    import json
+    import subprocess
+    import sys
+    from threadpoolctl import threadpool_limits
+    from perfil_rendimiento import ARCHIVO_CONFIGURACION, guardar_configuracion, obtener_perfil, resumen_perfil
+
+    perfil = obtener_perfil()
+    recursos = perfil['recursos']
+    print("\n=== Benchmark de hilos ===")
+    print(f"Perfil actual: {resumen_perfil(perfil)}")
+    maximo = max(recursos['nucleos_utilizables'], min(recursos['nucleos_logicos'], recursos['afinidad']))
+    candidatos = sorted({h for h in (1, 2, 4, recursos['nucleos_utilizables'] // 2,
+                                     recursos['nucleos_utilizables'], maximo) if 1 <= h <= maximo})
+    muestras = max(5, repeticiones)
+
+    # TensorFlow fija sus hilos al iniciarse: cada combinación se mide en un proceso aparte
+    tiempos_tf = {}
+    for intra in candidatos:
+        for inter in sorted({1, 2} & set(range(1, maximo + 1))):
+            proceso = subprocess.run([sys.executable, '-c', _MEDICION_HILOS, str(intra), str(inter), str(muestras)],
+                                     capture_output=True, text=True, check=False)
+            if proceso.returncode != 0:
+                print(f"intra {intra:>3}, inter {inter}: error ({proceso.stderr.strip().splitlines()[-1:]})")
+                continue
+            medida = json.loads(proceso.stdout.strip().splitlines()[-1])
+            tiempos_tf[(intra, inter)] = medida
+            print(f"intra {intra:>3}, inter {inter}: paso de entrenamiento {medida['entrenamiento'] * 1000:.1f} ms, "
+                  f"inferencia {medida['inferencia'] * 1000:.1f} ms")
+
+    # BLAS sí se puede limitar en caliente: producto de matrices como las de escalado y ventanas
+    rng = np.random.default_rng(0)
+    a = rng.random((1024, 1024))
+    tiempos_blas = {}
+    for hilos in candidatos:
+        with threadpool_limits(hilos):
+            tiempos_blas[hilos], _ = medir(lambda: a @ a, muestras)
+        print(f"BLAS {hilos:>3} hilos: {tiempos_blas[hilos] * 1000:.1f} ms")
+
+    if not tiempos_tf:
+        print("No se pudo medir ninguna combinación de TensorFlow")
+        return {'tensorflow': tiempos_tf, 'blas': tiempos_blas}
+    intra, inter = min(tiempos_tf, key=lambda k: tiempos_tf[k]['entrenamiento'] + tiempos_tf[k]['inferencia'])
+    hilos_blas = min(tiempos_blas, key=tiempos_blas.get)
+    mejor = {'hilos_intra_op': intra, 'hilos_inter_op': inter, 'hilos_blas': hilos_blas}
+    guardar_configuracion(mejor)
+    print(f"Mejor configuración: {mejor} (guardada en {ARCHIVO_CONFIGURACION})")
+    return {'tensorflow': tiempos_tf, 'blas': tiempos_blas, 'mejor': mejor}
+
+
+BENCHMARKS = {
+    'categorizacion': benchmark_categorizacion,
+    'ventanas': benchmark_ventanas,
+    'pipeline': benchmark_pipeline,
+    'caracteristicas': benchmark_caracteristicas,
+    'servidor': benchmark_servidor,
+    'ensemble': benchmark_ensemble,
+    'arranque': benchmark_arranque,
+    'hilos': benchmark_hilos,
+    'remuestreo': benchmark_remuestreo,
+    'puente': benchmark_puente,
+    'integracion': benchmark_integracion,
+    'carga': benchmark_carga,
+    'series': benchmark_series,
+    'entrenamiento_ensemble': benchmark_entrenamiento_ensemble,
+    'busqueda': benchmark_busqueda,
+    'posprocesado': benchmark_posprocesado,
+    'pronostico_compacto': benchmark_pronostico_compacto,
+    'temperatura': benchmark_temperatura,
+    'lote': benchmark_lote,
+    'metricas': benchmark_metricas,
+    'parser_estacion': benchmark_parser_estacion,
+    'lecturas': benchmark_lecturas,
+    'dias_lluvia': benchmark_dias_lluvia,
+    'graficos': benchmark_graficos,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de rendimiento del sistema de microclima")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS.keys()) + ['todos'])
+    parser.add_argument('--ruta', default=RUTA_DATASET, help="Dataset histórico a utilizar")
+    parser.add_argument('--filas', type=int, default=None, help="Limitar el número de registros")
+    parser.add_argument('--repeticiones', type=int, default=1, help="Repeticiones por medición (se reporta la mejor)")
+    args = parser.parse_args()
+
+    seleccion = BENCHMARKS.keys() if args.benchmark == 'todos' else [args.benchmark]
+    for nombre in seleccion:
+        BENCHMARKS[nombre](ruta=args.ruta, filas=args.filas, repeticiones=args.repeticiones)
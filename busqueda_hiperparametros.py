@@ -0,0 +1,305 @@
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import ventanas_temporales
+from ensemble_paralelo import dataset_desde_memmap, planificar_procesos
+
+# Búsqueda de hiperparámetros por reducción sucesiva (successive halving).
+# Se muestrean muchas configuraciones, todas entrenan un tramo corto (un tercio de época) y solo el
+# mejor tercio (eta = 3) sigue a la siguiente ronda con el triple de entrenamiento, continuando el
+# mismo modelo, hasta llegar a epocas_max. Cada ronda termina con una evaluación sobre la validación.
+# Las pruebas se reparten entre procesos que leen la serie preparada mapeada en memoria (cache_series
+# o un .npy temporal). Trazar y compilar un modelo nuevo cuesta unos 4 s, más que un tramo de
+# entrenamiento, así que cada proceso crea un solo modelo compilado por arquitectura (unidades LSTM) y
+# lo reutiliza en todas las pruebas: la tasa de dropout (DropoutAjustable) y la de aprendizaje son
+# variables que se asignan, y al empezar una prueba se restauran los pesos iniciales de la arquitectura
+# y el optimizador se pone a cero. Todas las pruebas de una arquitectura parten así de la misma
+# inicialización, de modo que sus diferencias se deben a los hiperparámetros. Cada resultado se anota
+# en un registro JSON Lines y el estado de cada prueba (pesos y optimizador, .npz) se guarda al terminar
+# su ronda: la ronda siguiente continúa desde él y, al repetir la búsqueda sobre la misma serie, se
+# reutiliza lo ya entrenado, así que una búsqueda interrumpida se reanuda donde quedó.
+
+ARCHIVO_REGISTRO = 'busqueda_hiperparametros.jsonl'
+DIRECTORIO_PRUEBAS = 'busqueda_hiperparametros'
+SEMILLA_BUSQUEDA = 2024  # Las mismas configuraciones en cada ejecución, para poder reanudar
+VERSION_BUSQUEDA = 2  # Forma parte de la clave de la serie en el registro y en los archivos de estado
+VENTANA_TIEMPO = 12
+TRAMOS_POR_EPOCA = 3  # Unidad de presupuesto de las rondas
+
+# Espacio de búsqueda (el de la búsqueda aleatoria original)
+UNIDADES_LSTM = [64, 96, 128]
+RANGO_DROPOUT = (0.2, 0.4)
+TASAS_APRENDIZAJE = [0.0003, 0.0005, 0.001]
+TAMANOS_LOTE = [32, 64, 96]
+
+_hilos_proceso = 1
+_modelos_compartidos = {}  # (input_shape, num_categorias, unidades_lstm) -> (modelo compilado, pesos iniciales)
+
+
+def muestrear_configuraciones(num_configuraciones, semilla=SEMILLA_BUSQUEDA):
+    """Configuraciones aleatorias reproducibles del espacio de búsqueda"""
+    rng = np.random.default_rng(semilla)
+    return [{
+        'unidades_lstm': int(rng.choice(UNIDADES_LSTM)),
+        'tasa_dropout': round(float(rng.uniform(*RANGO_DROPOUT)), 4),
+        'tasa_aprendizaje': float(rng.choice(TASAS_APRENDIZAJE)),
+        'batch_size': int(rng.choice(TAMANOS_LOTE))
+    } for _ in range(num_configuraciones)]
+
+
+def id_configuracion(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def planificar_rondas(num_configuraciones, tramos_max, eta=3):
+    """[(configuraciones, tramos acumulados)] de cada ronda; la última llega a tramos_max"""
+    rondas = []
+    r = 0
+    while True:
+        n = max(1, math.ceil(num_configuraciones / eta ** r))
+        tramos = min(tramos_max, eta ** r)
+        if n == 1 or tramos == tramos_max:
+            rondas.append((n, tramos_max))
+            return rondas
+        rondas.append((n, tramos))
+        r += 1
+
+
+def crear_modelo_prueba(input_shape, num_categorias, config):
+    """Modelo simple de las pruebas rápidas (BiLSTM + densa). El dropout de entrada de la LSTM se
+    aplica con una máscara constante en el tiempo antes de ella, para que su tasa sea una variable."""
+    from entorno_tensorflow import keras
+    from componentes_keras import DropoutAjustable
+
+    model = keras.Sequential([
+        keras.layers.Input(shape=input_shape),
+        DropoutAjustable(),
+        DropoutAjustable(temporal=True),
+        keras.layers.Bidirectional(keras.layers.LSTM(
+            config['unidades_lstm'],
+            return_sequences=False
+        )),
+        keras.layers.Dense(128, activation='relu'),
+        DropoutAjustable(),
+        keras.layers.Dense(72 * num_categorias),
+        keras.layers.Reshape((72, num_categorias)),
+        keras.layers.Activation('softmax')
+    ])
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=config['tasa_aprendizaje']),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    model.optimizer.build(model.trainable_variables)
+    _aplicar_config(model, config)
+    return model
+
+
+def _aplicar_config(modelo, config):
+    """Asigna las tasas de dropout y de aprendizaje de config al modelo compilado"""
+    for capa in modelo.layers:
+        if hasattr(capa, 'asignar_tasa'):
+            capa.asignar_tasa(config['tasa_dropout'])
+    modelo.optimizer.learning_rate = config['tasa_aprendizaje']
+
+
+def _modelo_compartido(input_shape, num_categorias, config):
+    """(modelo compilado, pesos iniciales) de la arquitectura de config, creado una vez por proceso"""
+    clave = (tuple(input_shape), int(num_categorias), int(config['unidades_lstm']))
+    if clave not in _modelos_compartidos:
+        modelo = crear_modelo_prueba(input_shape, num_categorias, config)
+        _modelos_compartidos[clave] = (modelo, modelo.get_weights())
+    return _modelos_compartidos[clave]
+
+
+def _reiniciar(modelo, pesos_iniciales):
+    """Pesos iniciales de la arquitectura y optimizador a cero"""
+    modelo.set_weights(pesos_iniciales)
+    for variable in modelo.optimizer.variables:
+        variable.assign(np.zeros(variable.shape, dtype=variable.dtype))
+
+
+def _guardar_estado(modelo, ruta):
+    """Pesos y variables del optimizador de una prueba, en un .npz escrito de forma atómica"""
+    valores = modelo.get_weights() + [np.asarray(v) for v in modelo.optimizer.variables]
+    with open(ruta + '.tmp', 'wb') as f:
+        np.savez(f, *valores)
+    os.replace(ruta + '.tmp', ruta)
+
+
+def _restaurar_estado(modelo, ruta):
+    with np.load(ruta) as datos:
+        valores = [datos[f'arr_{i}'] for i in range(len(datos.files))]
+    num_pesos = len(modelo.weights)
+    if len(valores) != num_pesos + len(modelo.optimizer.variables):
+        raise ValueError(f"El estado {ruta} no corresponde a la arquitectura de la prueba")
+    modelo.set_weights(valores[:num_pesos])
+    for variable, valor in zip(modelo.optimizer.variables, valores[num_pesos:]):
+        variable.assign(valor)
+
+
+class RegistroPruebas:
+    """Registro JSON Lines de las pruebas terminadas (una línea por configuración y ronda)"""
+
+    def __init__(self, ruta=ARCHIVO_REGISTRO):
+        self.ruta = ruta
+        self.resultados = {}
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        continue  # Línea incompleta de una ejecución interrumpida
+                    self.resultados[(entrada['serie'], entrada['id'], entrada['tramos'])] = entrada
+
+    def buscar(self, serie, id_config, tramos):
+        return self.resultados.get((serie, id_config, tramos))
+
+    def anotar(self, entrada):
+        self.resultados[(entrada['serie'], entrada['id'], entrada['tramos'])] = entrada
+        with open(self.ruta, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entrada) + '\n')
+
+
+def _inicializar_proceso(hilos):
+    """Se ejecuta al arrancar cada proceso, antes de importar TensorFlow"""
+    global _hilos_proceso
+    _hilos_proceso = hilos
+    from perfil_rendimiento import limitar_hilos_blas
+    limitar_hilos_blas(hilos)
+
+
+def _ejecutar_prueba(config, tramo_inicial, tramos, directorio_serie, num_categorias, ruta_modelo,
+                     fraccion_validacion=0.2):
+    """Entrena una configuración de tramo_inicial a tramos y la evalúa sobre la validación"""
+    from entorno_tensorflow import inicializar_tensorflow
+
+    inicializar_tensorflow(hilos_intra_op=_hilos_proceso, hilos_inter_op=1, mostrar_info=False)
+    matriz = np.load(os.path.join(directorio_serie, 'matriz.npy'), mmap_mode='r')
+    etiquetas = np.load(os.path.join(directorio_serie, 'etiquetas.npy'), mmap_mode='r')
+    # Vistas de ventanas sobre la serie mapeada: cada lote copia solo sus propias ventanas
+    X = ventanas_temporales.ventanas_entrada(matriz, VENTANA_TIEMPO)
+    y = ventanas_temporales.ventanas_objetivo(etiquetas, VENTANA_TIEMPO)
+    inicios_train, inicios_val = ventanas_temporales.dividir_inicios(len(X), fraccion_validacion)
+    dataset_train = dataset_desde_memmap(X, y, config['batch_size'], barajar=True, indices=inicios_train).repeat()
+    dataset_val = dataset_desde_memmap(X, y, config['batch_size'], indices=inicios_val)
+    pasos_tramo = max(1, math.ceil(len(inicios_train) / config['batch_size'] / TRAMOS_POR_EPOCA))
+
+    # Modelo compartido de la arquitectura: estado nuevo o el guardado al terminar la ronda anterior
+    modelo, pesos_iniciales = _modelo_compartido((VENTANA_TIEMPO, matriz.shape[1]), num_categorias, config)
+    if tramo_inicial > 0 and not os.path.exists(ruta_modelo):
+        print(f"  Sin estado guardado para {config}, se entrena desde el principio")
+        tramo_inicial = 0
+    if tramo_inicial == 0:
+        _reiniciar(modelo, pesos_iniciales)
+    else:
+        _restaurar_estado(modelo, ruta_modelo)
+    _aplicar_config(modelo, config)
+    modelo.fit(
+        dataset_train,
+        initial_epoch=tramo_inicial,
+        epochs=tramos,
+        steps_per_epoch=pasos_tramo,
+        verbose=0
+    )
+    val_loss, val_acc = modelo.evaluate(dataset_val, verbose=0)
+    _guardar_estado(modelo, ruta_modelo)
+    return {'val_loss': float(val_loss), 'val_accuracy': float(val_acc)}
+
+
+def _olvidar_modelo(ruta_modelo):
+    """Descarta el estado de una prueba eliminada de la búsqueda"""
+    if os.path.exists(ruta_modelo):
+        os.remove(ruta_modelo)
+
+
+def huella_serie(matriz, etiquetas, num_categorias):
+    """Hash de una serie que no viene de cache_series"""
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(matriz, dtype=np.float32).tobytes())
+    h.update(np.ascontiguousarray(etiquetas).tobytes())
+    h.update(str(num_categorias).encode('utf-8'))
+    return h.hexdigest()[:20]
+
+
+def buscar(matriz, etiquetas, num_categorias, num_configuraciones=5, epocas_max=15, eta=3, procesos=None,
+           nucleos=None, clave_serie=None, directorio_serie=None, ruta_registro=ARCHIVO_REGISTRO,
+           directorio_pruebas=DIRECTORIO_PRUEBAS, semilla=SEMILLA_BUSQUEDA):
+    """Reducción sucesiva sobre num_configuraciones configuraciones. Devuelve las entradas del
+    registro de la última ronda ordenadas de mejor a peor (por val_loss).
+    clave_serie/directorio_serie: entrada de cache_series donde ya están matriz.npy y etiquetas.npy."""
+    serie = f"{clave_serie or huella_serie(matriz, etiquetas, num_categorias)}-{num_categorias}-v{VERSION_BUSQUEDA}"
+    configs = {id_configuracion(c): c for c in muestrear_configuraciones(num_configuraciones, semilla)}
+    rondas = planificar_rondas(len(configs), epocas_max * TRAMOS_POR_EPOCA, eta)
+    registro = RegistroPruebas(ruta_registro)
+    os.makedirs(directorio_pruebas, exist_ok=True)
+
+    nucleos = nucleos or os.cpu_count() or 1
+    procesos, hilos = planificar_procesos(len(configs), nucleos, procesos)
+    print(f"Búsqueda de hiperparámetros: {len(configs)} configuraciones, rondas (configuraciones, épocas): "
+          f"{[(n, round(t / TRAMOS_POR_EPOCA, 2)) for n, t in rondas]}, {procesos} procesos de {hilos} hilos")
+
+    temporal = None
+    if directorio_serie is None:
+        temporal = directorio_serie = tempfile.mkdtemp(prefix='busqueda_')
+        np.save(os.path.join(temporal, 'matriz.npy'), np.ascontiguousarray(matriz, dtype=np.float32))
+        np.save(os.path.join(temporal, 'etiquetas.npy'), np.ascontiguousarray(etiquetas))
+
+    pool = None
+    if procesos > 1:
+        # spawn: TensorFlow no admite fork una vez iniciado su runtime
+        pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_inicializar_proceso, initargs=(hilos,))
+    try:
+        candidatos = list(configs)
+        tramos_previos = 0
+        for numero, (n, tramos) in enumerate(rondas, 1):
+            print(f"\nRonda {numero}/{len(rondas)}: {len(candidatos)} configuraciones hasta "
+                  f"{tramos / TRAMOS_POR_EPOCA:.2f} épocas")
+            pendientes = {}
+            for id_config in candidatos:
+                if registro.buscar(serie, id_config, tramos) is not None:
+                    continue  # Ya entrenada en una ejecución anterior
+                ruta_modelo = os.path.join(directorio_pruebas, f"{serie}_{id_config}.npz")
+                argumentos = (configs[id_config], tramos_previos, tramos, directorio_serie, num_categorias, ruta_modelo)
+                if pool is None:
+                    _anotar(registro, serie, id_config, configs[id_config], tramos, _ejecutar_prueba(*argumentos))
+                else:
+                    pendientes[pool.submit(_ejecutar_prueba, *argumentos)] = id_config
+            while pendientes:
+                terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    id_config = pendientes.pop(futuro)
+                    _anotar(registro, serie, id_config, configs[id_config], tramos, futuro.result())
+
+            resultados = sorted((registro.buscar(serie, i, tramos) for i in candidatos), key=lambda e: e['val_loss'])
+            siguiente = rondas[numero][0] if numero < len(rondas) else len(resultados)
+            candidatos = [e['id'] for e in resultados[:siguiente]]
+            # Los modelos descartados no vuelven a entrenarse
+            for entrada in resultados[siguiente:]:
+                _olvidar_modelo(os.path.join(directorio_pruebas, f"{serie}_{entrada['id']}.npz"))
+            tramos_previos = tramos
+        return resultados
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # Con procesos == 1 los modelos compartidos viven en este proceso (la GUI): se liberan al terminar
+        _modelos_compartidos.clear()
+        if temporal is not None:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+
+def _anotar(registro, serie, id_config, config, tramos, metricas):
+    print(f"  {config} -> val_loss={metricas['val_loss']:.4f}, val_accuracy={metricas['val_accuracy']:.4f} "
+          f"({tramos / TRAMOS_POR_EPOCA:.2f} épocas)")
+    registro.anotar({'serie': serie, 'id': id_config, 'tramos': tramos,
+                     'epocas': round(tramos / TRAMOS_POR_EPOCA, 2), 'config': config, **metricas})
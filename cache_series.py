@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Caché en disco de la serie de entrenamiento ya normalizada (matriz float32 y etiquetas enteras).
+# La clave combina el contenido del DataFrame, el estado de los normalizadores y del codificador de
+# categorías y la ventana temporal. Cada entrada son dos .npy que se abren mapeados en memoria y en
+# solo lectura: los modelos del ensemble, las pruebas de hiperparámetros, los folds de evaluación y
+# otros procesos que abran la misma clave comparten una sola copia física (la caché de páginas del SO).
+
+VERSION_SERIES = 1
+DIRECTORIO_SERIES = 'cache_series'
+MIN_REGISTROS = 2000  # Series más cortas (p. ej. la entrada de una predicción) no compensan el disco
+MAX_ENTRADAS = 16  # Al superarlo se borran las entradas usadas hace más tiempo
+
+
+def huella_dataframe(df):
+    """Hash del contenido de df (valores, índice, nombres y tipos de columna)"""
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode('utf-8'))
+    return h.hexdigest()
+
+
+def clave_serie(df, scalers, label_encoder, categorias, ventana_tiempo):
+    """Clave de la serie preparada a partir de df con ese estado de normalización y categorías"""
+    estado = joblib.hash([VERSION_SERIES, scalers, getattr(label_encoder, 'classes_', None),
+                          categorias, int(ventana_tiempo)])
+    return hashlib.sha1(f"{huella_dataframe(df)}-{estado}".encode('utf-8')).hexdigest()[:20]
+
+
+class CacheSeries:
+    """Series de entrenamiento normalizadas en disco, compartidas mediante memmap de solo lectura"""
+
+    def __init__(self, directorio=DIRECTORIO_SERIES, max_entradas=MAX_ENTRADAS):
+        self.directorio = directorio
+        self.max_entradas = max_entradas
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, clave)
+
+    def abrir(self, clave):
+        """(matriz, etiquetas, meta) mapeados en solo lectura, o None si la clave no está guardada"""
+        ruta = self.ruta(clave)
+        try:
+            with open(os.path.join(ruta, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != VERSION_SERIES:
+                return None
+            matriz = np.load(os.path.join(ruta, 'matriz.npy'), mmap_mode='r')
+            etiquetas = np.load(os.path.join(ruta, 'etiquetas.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        os.utime(os.path.join(ruta, 'meta.json'))  # Marca de uso para descartar las más antiguas
+        return matriz, etiquetas, meta
+
+    def guardar(self, clave, matriz, etiquetas, meta):
+        """Escribe la entrada (si otro proceso ya la escribió se conserva esa) y la devuelve abierta"""
+        destino = self.ruta(clave)
+        if not os.path.exists(destino):
+            temporal = f"{destino}.tmp-{os.getpid()}"
+            shutil.rmtree(temporal, ignore_errors=True)
+            os.makedirs(temporal)
+            np.save(os.path.join(temporal, 'matriz.npy'), np.ascontiguousarray(matriz, dtype=np.float32))
+            np.save(os.path.join(temporal, 'etiquetas.npy'), np.ascontiguousarray(etiquetas, dtype=np.int64))
+            with open(os.path.join(temporal, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION_SERIES, 'creado': time.time(), **meta}, f, indent=2)
+            try:
+                os.replace(temporal, destino)
+            except OSError:
+                # Otro proceso escribió la misma clave entre tanto: su contenido es idéntico
+                shutil.rmtree(temporal, ignore_errors=True)
+            self._descartar_antiguas()
+        return self.abrir(clave)
+
+    def _descartar_antiguas(self):
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            meta = os.path.join(self.directorio, nombre, 'meta.json')
+            if '.tmp-' not in nombre and os.path.exists(meta):
+                entradas.append((os.path.getmtime(meta), nombre))
+        for _, nombre in sorted(entradas)[:-self.max_entradas or None]:
+            shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+
+    def limpiar(self):
+        """Borra todas las series guardadas"""
+        shutil.rmtree(self.directorio, ignore_errors=True)
@@ -0,0 +1,325 @@
+import numpy as np
+from sklearn.metrics import precision_recall_fscore_support
+
+from entorno_tensorflow import tf, keras
+
+# Generadores de datos y callbacks de Keras usados por PrediccionMeteo.
+# Heredan de clases de TensorFlow, así que este módulo solo se importa (a través de
+# ClaseDiferida) cuando se usan, para no cargar TensorFlow al importar predictor_model.
+
+
+
+class DataGenerator(tf.keras.utils.Sequence):
+    def __init__(self, df, scalers, label_encoder, num_categorias, batch_size=32, ventana_tiempo=12):
+        self.df = df
+        self.batch_size = batch_size
+        self.ventana_tiempo = ventana_tiempo
+        self.scalers = scalers
+        self.label_encoder = label_encoder
+        self.num_categorias = num_categorias
+        self.variables_numericas = ['temperatura_C', 'humedad_relativa', 
+                                'precipitacion_mm', 'cobertura_nubes_octas', 
+                                'velocidad_viento_kmh', 'radiacion_solar_J_m2']
+        self.indices = np.arange(len(df) - ventana_tiempo - 72 + 1)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
+
+    def __getitem__(self, idx):
+        start_idx = idx * self.batch_size
+        end_idx = min((idx + 1) * self.batch_size, len(self.indices))
+        batch_indices = self.indices[start_idx:end_idx]
+
+        X_batch = []
+        y_batch = []
+
+        for i in batch_indices:
+            # Preparar ventana de entrada
+            ventana = self.df.iloc[i:i+self.ventana_tiempo][self.variables_numericas].values
+            # Normalizar datos
+            ventana_norm = np.zeros_like(ventana)
+            for j, var in enumerate(self.variables_numericas):
+                ventana_norm[:, j] = self.scalers[var].transform(ventana[:, j].reshape(-1, 1)).ravel()
+            X_batch.append(ventana_norm)
+
+            # Preparar etiquetas
+            y_seq = self.df['categoria_numerica'].iloc[i+self.ventana_tiempo:i+self.ventana_tiempo+72].values
+            y_seq_onehot = np.zeros((72, self.num_categorias))
+            for t, cat in enumerate(y_seq):
+                y_seq_onehot[t, cat] = 1
+            y_batch.append(y_seq_onehot)
+
+        return np.array(X_batch), np.array(y_batch)
+
+    def on_epoch_end(self):
+        np.random.shuffle(self.indices)
+
+
+class EnhancedDataGenerator(tf.keras.utils.Sequence):
+    """Generador de datos mejorado con técnicas de aumento y balance de clases"""
+    
+    def __init__(self, X, y, batch_size=64, shuffle=True, augment=True, class_weights=None):
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augment = augment
+        self.class_weights = class_weights
+        self.indices = np.arange(len(self.X))
+        self.on_epoch_end()
+        
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+        
+    def __getitem__(self, idx):
+        # Obtener índices para este lote
+        batch_indices = self.indices[idx * self.batch_size:(idx + 1) * self.batch_size]
+        
+        # Extraer datos del lote
+        X_batch = self.X[batch_indices]
+        y_batch = self.y[batch_indices]
+        
+        # Aplicar aumento de datos si está activado
+        if self.augment:
+            X_batch, y_batch = self._augment_batch(X_batch, y_batch)
+        
+        return X_batch, y_batch
+    
+    def _augment_batch(self, X_batch, y_batch):
+        """Técnicas avanzadas de aumento de datos para series temporales"""
+        X_augmented = X_batch.copy()
+        y_augmented = y_batch.copy()
+        
+        for i in range(len(X_batch)):
+            if np.random.random() < 0.5:  # Aplicar con 50% de probabilidad
+                # Técnica 1: Añadir ruido gaussiano calibrado
+                noise_level = np.random.uniform(0.005, 0.02)
+                noise = np.random.normal(0, noise_level, X_batch[i].shape)
+                X_augmented[i] = X_batch[i] + noise
+                
+            if np.random.random() < 0.3:  # Aplicar con 30% de probabilidad
+                # Técnica 2: Warping temporal (compresión/expansión leve)
+                scale_factor = np.random.uniform(0.95, 1.05)
+                rows = X_batch[i].shape[0]
+                for col in range(X_batch[i].shape[1]):
+                    # Aplicar transformación preservando los extremos
+                    signal = X_batch[i][:, col]
+                    warped = np.interp(
+                        np.linspace(0, 1, rows),
+                        np.linspace(0, 1, rows) ** scale_factor,
+                        signal
+                    )
+                    X_augmented[i][:, col] = warped
+            
+            if np.random.random() < 0.2:  # Aplicar con 20% de probabilidad
+                # Técnica 3: Magnitud escalada
+                for col in range(X_batch[i].shape[1]):
+                    scale = np.random.uniform(0.9, 1.1)
+                    X_augmented[i][:, col] = X_batch[i][:, col] * scale
+        
+        return X_augmented, y_augmented
+        
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+            
+    def get_config(self):
+        return {
+            'batch_size': self.batch_size,
+            'shuffle': self.shuffle,
+            'augment': self.augment,
+            'class_weights': self.class_weights
+        }
+
+
+class OptimizedDataGenerator(tf.keras.utils.Sequence):
+    """Generador de datos optimizado para entrenamiento por lotes"""
+    
+    def __init__(self, X, y, batch_size=64, shuffle=True, augment=False):
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.augment = augment
+        self.indices = np.arange(len(self.X))
+        self.on_epoch_end()
+        
+    def __len__(self):
+        return int(np.ceil(len(self.X) / self.batch_size))
+        
+    def __getitem__(self, idx):
+        # Obtener índices para este lote
+        batch_indices = self.indices[idx * self.batch_size:(idx + 1) * self.batch_size]
+        
+        # Extraer datos del lote
+        X_batch = self.X[batch_indices]
+        y_batch = self.y[batch_indices]
+        
+        # Aplicar aumento de datos si está activado
+        if self.augment:
+            X_batch = self._augment_batch(X_batch)
+        
+        return X_batch, y_batch
+    
+    def _augment_batch(self, X_batch):
+        augmented_batch = X_batch.copy()
+        
+        # Añadir ruido gaussiano
+        noise = np.random.normal(0, 0.01, X_batch.shape)
+        augmented_batch += noise
+        
+        # Escalar aleatoriamente
+        scale_factor = np.random.uniform(0.95, 1.05)
+        augmented_batch *= scale_factor
+        
+        return augmented_batch
+        
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+            
+    def get_config(self):
+        return {
+            'batch_size': self.batch_size,
+            'shuffle': self.shuffle,
+            'augment': self.augment
+        }
+    
+    def save_state(self, filepath):
+        try:
+            state = {
+                'indices': self.indices,
+                'config': self.get_config()
+            }
+            np.save(filepath, state)
+            return True
+        except Exception as e:
+            print(f"Error al guardar estado: {str(e)}")
+            return False
+    
+    def load_state(self, filepath):
+        try:
+            state = np.load(filepath, allow_pickle=True).item()
+            self.indices = state['indices']
+            config = state['config']
+            self.batch_size = config['batch_size']
+            self.shuffle = config['shuffle']
+            self.augment = config['augment']
+            return True
+        except Exception as e:
+            print(f"Error al cargar estado: {str(e)}")
+            return False
+
+
+
+class WarmUpLearningRateScheduler(tf.keras.callbacks.Callback):
+    """Callback para ajuste gradual de learning rate adaptado para microclimas"""
+    def __init__(self, warmup_epochs=5, initial_lr=0.0001, max_lr=0.001):
+        super().__init__()
+        self.warmup_epochs = warmup_epochs
+        self.initial_lr = initial_lr
+        self.max_lr = max_lr
+        
+    def on_epoch_begin(self, epoch, logs=None):
+        if epoch < self.warmup_epochs:
+            # Incremento lineal de la tasa de aprendizaje
+            lr = self.initial_lr + (self.max_lr - self.initial_lr) * (epoch / self.warmup_epochs)
+            keras.backend.set_value(self.model.optimizer.lr, lr)
+            print(f"\nEpoch {epoch+1}: Learning rate ajustado a {lr:.6f}")
+            
+    def on_epoch_end(self, epoch, logs=None):
+        # Imprimir tasa actual para seguimiento
+        current_lr = keras.backend.get_value(self.model.optimizer.lr)
+        print(f"\nEpoch {epoch+1} completada. Learning rate actual: {current_lr:.6f}")
+
+
+class MetricsCallback(tf.keras.callbacks.Callback):
+    """Callback para métricas avanzadas durante el entrenamiento"""
+    def __init__(self, validation_data, label_encoder=None, categorias=None):
+        super().__init__()
+        self.validation_data = validation_data
+        self.label_encoder = label_encoder
+        self.categorias = categorias
+        
+    def on_epoch_end(self, epoch, logs=None):
+        if epoch % 5 == 0:  # Calcular cada 5 épocas para no ralentizar demasiado
+            try:
+                # Obtener predicciones
+                X_val, y_val = self.validation_data
+                y_pred = self.model.predict(X_val)
+                
+                # Convertir one-hot a índices
+                y_true_indices = np.argmax(y_val, axis=2) if np.ndim(y_val) == 3 else np.asarray(y_val)  # (batch, timesteps)
+                y_pred_indices = np.argmax(y_pred, axis=2)  # (batch, timesteps)
+                
+                # Aplanar para cálculo de métricas
+                y_true_flat = y_true_indices.flatten()
+                y_pred_flat = y_pred_indices.flatten()
+                
+                # Calcular métricas
+                precision, recall, f1, _ = precision_recall_fscore_support(
+                    y_true_flat, y_pred_flat, average='weighted'
+                )
+                
+                print(f"\nMétricas adicionales - Epoch {epoch+1}:")
+                print(f"F1 Score: {f1:.4f}")
+                print(f"Precision: {precision:.4f}")
+                print(f"Recall: {recall:.4f}")
+                
+                # Mostrar top 3 errores más comunes si tenemos etiquetas
+                if self.label_encoder is not None and self.categorias is not None:
+                    # Crear matriz de confusión pequeña para los errores más comunes
+                    error_mask = y_true_flat != y_pred_flat
+                    true_error = y_true_flat[error_mask]
+                    pred_error = y_pred_flat[error_mask]
+                    
+                    if len(true_error) > 0:
+                        # Contar pares de error
+                        error_pairs = list(zip(true_error, pred_error))
+                        error_counts = {}
+                        for true, pred in error_pairs:
+                            pair = (true, pred)
+                            error_counts[pair] = error_counts.get(pair, 0) + 1
+                        
+                        # Mostrar los 3 errores más comunes
+                        print("\nErrores más comunes:")
+                        for (true, pred), count in sorted(error_counts.items(), 
+                                                        key=lambda x: x[1], reverse=True)[:3]:
+                            try:
+                                cat_true = self.categorias[true]
+                                cat_pred = self.categorias[pred]
+                                print(f"  Real: {cat_true} → Predicho: {cat_pred} ({count} veces)")
+                            except:
+                                print(f"  Clase {true} → Clase {pred} ({count} veces)")
+                                
+            except Exception as e:
+                print(f"Error en callback de métricas: {e}")
+
+
+class DropoutAjustable(keras.layers.Layer):
+    """Dropout cuya tasa es una variable: se cambia con asignar_tasa sin volver a trazar el modelo.
+    temporal=True usa la misma máscara en todos los pasos de la secuencia (como el dropout de entrada
+    de una LSTM)."""
+    def __init__(self, temporal=False, **kwargs):
+        super().__init__(**kwargs)
+        self.temporal = temporal
+        self.generador = keras.random.SeedGenerator()
+
+    def build(self, input_shape):
+        self.tasa = self.add_weight(shape=(), initializer='zeros', trainable=False, name='tasa')
+
+    def asignar_tasa(self, tasa):
+        self.tasa.assign(tasa)
+
+    def call(self, inputs, training=False):
+        if not training:
+            return inputs
+        forma = keras.ops.shape(inputs)
+        if self.temporal:
+            forma = (forma[0], 1, forma[2])
+        conservar = keras.ops.cast(keras.random.uniform(forma, seed=self.generador) >= self.tasa, inputs.dtype)
+        return inputs * conservar / (1.0 - self.tasa)
+
+    def get_config(self):
+        return {**super().get_config(), 'temporal': self.temporal}
@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import ventanas_temporales
+
+# Entrenamiento de los modelos del ensemble en procesos separados, uno por modelo.
+# Los modelos sin entrenar se guardan como .keras en un directorio temporal. Los procesos reciben la
+# serie normalizada, no las ventanas: abren matriz.npy y etiquetas.npy de la entrada de cache_series
+# (o de una copia temporal de la serie si no hay caché) mapeados en memoria, una sola copia física
+# compartida por todos, y arman las ventanas de cada lote a partir de los inicios de ventana
+# recibidos, como busqueda_hiperparametros y evaluacion_temporal. Cada proceso entrena con su parte
+# de los hilos de la máquina y guarda su modelo en modelos/ensemble_model_{i}.keras. El progreso de
+# cada época vuelve por una cola al proceso principal, que llama al callback de la GUI desde el hilo
+# que pidió el entrenamiento.
+
+DIRECTORIO_MODELOS = 'modelos'
+ESPERA_PROGRESO = 0.2  # Segundos entre revisiones de la cola de progreso
+
+_cola_progreso = None
+_hilos_proceso = 1
+
+
+def callbacks_miembro(al_terminar_epoca=None):
+    """Callbacks de entrenamiento de cada modelo del ensemble (secuencial o en paralelo)"""
+    from entorno_tensorflow import keras
+
+    callbacks = [
+        # Early stopping
+        keras.callbacks.EarlyStopping(
+            monitor='val_loss',
+            patience=10,
+            restore_best_weights=True,
+            verbose=1
+        ),
+        # Reducción de learning rate
+        keras.callbacks.ReduceLROnPlateau(
+            monitor='val_loss',
+            factor=0.5,
+            patience=5,
+            min_lr=0.00001,
+            verbose=1
+        )
+    ]
+    if al_terminar_epoca is not None:
+        callbacks.append(keras.callbacks.LambdaCallback(on_epoch_end=al_terminar_epoca))
+    return callbacks
+
+
+def planificar_procesos(num_modelos, nucleos, procesos=None):
+    """(procesos, hilos por proceso) para repartir los núcleos entre los modelos"""
+    procesos = max(1, min(num_modelos, procesos or nucleos))
+    return procesos, max(1, nucleos // procesos)
+
+
+def dataset_desde_memmap(X, y, batch_size, barajar=False, shuffle_buffer=10000, indices=None):
+    """tf.data que arma cada lote indexando los arrays mapeados, sin cargarlos completos en TensorFlow.
+    indices: posiciones de X/y a recorrer (todas si es None)"""
+    from entorno_tensorflow import tf
+
+    def leer_lote(indices):
+        indices = np.sort(indices)  # Lectura secuencial de las páginas del archivo
+        return np.asarray(X[indices], dtype=np.float32), np.asarray(y[indices], dtype=np.int32)
+
+    def construir_lote(indices):
+        X_lote, y_lote = tf.numpy_function(leer_lote, [indices], [tf.float32, tf.int32])
+        X_lote.set_shape((None,) + X.shape[1:])
+        y_lote.set_shape((None,) + y.shape[1:])
+        return X_lote, y_lote
+
+    indices = np.arange(len(y)) if indices is None else np.asarray(indices, dtype=np.int64)
+    dataset = tf.data.Dataset.from_tensor_slices(indices)
+    if barajar:
+        dataset = dataset.shuffle(max(1, min(shuffle_buffer, len(indices))), reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(construir_lote, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def _inicializar_proceso(cola, hilos):
+    """Se ejecuta al arrancar cada proceso, antes de importar TensorFlow"""
+    global _cola_progreso, _hilos_proceso
+    _cola_progreso = cola
+    _hilos_proceso = hilos
+    from perfil_rendimiento import limitar_hilos_blas
+    limitar_hilos_blas(hilos)
+
+
+def _entrenar_miembro(indice, ruta_modelo, directorio_serie, ventana_tiempo, inicios_train, inicios_val,
+                      epochs, batch_size, shuffle_buffer, ruta_salida):
+    """Entrena un modelo del ensemble dentro de un proceso del pool"""
+    from entorno_tensorflow import inicializar_tensorflow, keras
+
+    inicializar_tensorflow(hilos_intra_op=_hilos_proceso, hilos_inter_op=1, mostrar_info=False)
+    matriz = np.load(os.path.join(directorio_serie, 'matriz.npy'), mmap_mode='r')
+    etiquetas = np.load(os.path.join(directorio_serie, 'etiquetas.npy'), mmap_mode='r')
+    # Vistas (N, ventana, F) y (N, horizonte) sobre el memmap: solo se copian las ventanas de cada lote
+    X = ventanas_temporales.ventanas_entrada(matriz, ventana_tiempo)
+    y = ventanas_temporales.ventanas_objetivo(etiquetas, ventana_tiempo)
+    dataset_train = dataset_desde_memmap(X, y, batch_size, True, shuffle_buffer, indices=inicios_train)
+    dataset_val = None
+    if len(inicios_val) > 0:
+        dataset_val = dataset_desde_memmap(X, y, batch_size, indices=inicios_val)
+
+    def al_terminar_epoca(epoch, logs):
+        _cola_progreso.put((indice, epoch, {k: float(v) for k, v in (logs or {}).items()}))
+
+    modelo = keras.models.load_model(ruta_modelo)
+    history = modelo.fit(
+        dataset_train,
+        validation_data=dataset_val,
+        epochs=epochs,
+        callbacks=callbacks_miembro(al_terminar_epoca),
+        verbose=2
+    )
+    modelo.save(ruta_salida)
+    return indice, ruta_salida, history.history
+
+
+def entrenar_en_paralelo(modelos, matriz, etiquetas, inicios_train, inicios_val, ventana_tiempo=12, epochs=50,
+                         batch_size=64, callback=None, procesos=None, nucleos=None, shuffle_buffer=10000,
+                         directorio_serie=None, directorio_modelos=DIRECTORIO_MODELOS):
+    """Entrena cada modelo en su propio proceso sobre la serie normalizada (matriz (L, F), etiquetas (L,)).
+    inicios_train/inicios_val: posiciones de inicio de las ventanas de entrenamiento y validación.
+    directorio_serie: entrada de cache_series donde ya están matriz.npy y etiquetas.npy.
+    Devuelve (modelos entrenados, historiales) en el orden de `modelos`; los historiales son
+    keras.callbacks.History con el diccionario de métricas."""
+    from entorno_tensorflow import keras
+
+    nucleos = nucleos or os.cpu_count() or 1
+    procesos, hilos = planificar_procesos(len(modelos), nucleos, procesos)
+    print(f"Entrenamiento paralelo: {procesos} procesos, {hilos} hilos por proceso")
+    os.makedirs(directorio_modelos, exist_ok=True)
+
+    temporal = tempfile.mkdtemp(prefix='ensemble_')
+    try:
+        # Sin entrada en cache_series la serie (no las ventanas) se escribe una sola vez
+        if directorio_serie is None:
+            directorio_serie = temporal
+            np.save(os.path.join(temporal, 'matriz.npy'), np.ascontiguousarray(matriz, dtype=np.float32))
+            np.save(os.path.join(temporal, 'etiquetas.npy'), np.ascontiguousarray(etiquetas))
+        inicios_train = np.asarray(inicios_train, dtype=np.int64)
+        inicios_val = np.asarray(inicios_val, dtype=np.int64)
+        rutas_iniciales = []
+        for i, modelo in enumerate(modelos):
+            ruta = os.path.join(temporal, f"modelo_{i + 1}.keras")
+            modelo.save(ruta)
+            rutas_iniciales.append(ruta)
+
+        # spawn: TensorFlow no admite fork una vez iniciado su runtime
+        contexto = multiprocessing.get_context('spawn')
+        cola = contexto.Queue()
+        resultados = {}
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                                 initializer=_inicializar_proceso, initargs=(cola, hilos)) as pool:
+            pendientes = {
+                pool.submit(_entrenar_miembro, i, ruta, directorio_serie, ventana_tiempo, inicios_train,
+                            inicios_val, epochs, batch_size, shuffle_buffer,
+                            os.path.join(directorio_modelos, f"ensemble_model_{i + 1}.keras"))
+                for i, ruta in enumerate(rutas_iniciales)
+            }
+            while pendientes:
+                terminados, pendientes = wait(pendientes, timeout=ESPERA_PROGRESO, return_when=FIRST_COMPLETED)
+                _reenviar_progreso(cola, callback, epochs, len(modelos))
+                for futuro in terminados:
+                    indice, ruta_salida, historia = futuro.result()
+                    print(f"Modelo {indice + 1} guardado en {ruta_salida}")
+                    resultados[indice] = (ruta_salida, historia)
+            _reenviar_progreso(cola, callback, epochs, len(modelos))
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+    modelos_entrenados, historiales = [], []
+    for i in range(len(modelos)):
+        ruta_salida, historia = resultados[i]
+        modelos_entrenados.append(keras.models.load_model(ruta_salida))
+        history = keras.callbacks.History()
+        history.history = historia
+        historiales.append(history)
+    return modelos_entrenados, historiales
+
+
+def _reenviar_progreso(cola, callback, epochs, num_modelos):
+    """Pasa al callback de la GUI las épocas terminadas que informaron los procesos"""
+    while True:
+        try:
+            indice, epoch, logs = cola.get_nowait()
+        except queue.Empty:
+            return
+        print(f"Modelo {indice + 1}: época {epoch + 1}/{epochs} - " +
+              ", ".join(f"{k}: {v:.4f}" for k, v in logs.items()))
+        if callback:
+            callback(epoch, epochs, indice + 1, num_modelos)
@@ -0,0 +1,138 @@
+import importlib
+import os
+import platform
+import threading
+
+from perfil_rendimiento import limitar_hilos_blas, obtener_perfil, resumen_perfil
+
+# Carga diferida de TensorFlow/Keras.
+# Importar y configurar TensorFlow (hilos, XLA, dispositivos) cuesta varios segundos, así que los
+# módulos usan los sustitutos `tf` y `keras` de este archivo: TensorFlow se importa y se configura
+# la primera vez que se accede a uno de sus atributos, o antes si se llama a inicializar_tensorflow().
+
+# Configuración para reducir mensajes de TensorFlow (debe fijarse antes de importarlo)
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+os.environ['TF_USE_LEGACY_KERAS'] = 'None'
+
+_bloqueo = threading.RLock()
+_tensorflow = None
+_perfil_aplicado = None
+
+
+def print_system_info():
+    """Imprime información detallada del sistema"""
+    import psutil
+
+    print("\n=== Información del Sistema ===")
+    print(f"Sistema Operativo: {platform.system()} {platform.version()}")
+    print(f"Procesador: {platform.processor()}")
+    print(f"Núcleos Físicos: {psutil.cpu_count(logical=False)}")
+    print(f"Núcleos Totales: {psutil.cpu_count()}")
+
+    # Memoria RAM
+    ram = psutil.virtual_memory()
+    print("\n=== Memoria RAM ===")
+    print(f"Total: {ram.total / (1024 ** 3):.2f} GB")
+    print(f"Disponible: {ram.available / (1024 ** 3):.2f} GB")
+    print(f"Usada: {ram.used / (1024 ** 3):.2f} GB")
+    print(f"Porcentaje usado: {ram.percent}%")
+
+    # Espacio en disco
+    disk = psutil.disk_usage('/')
+    print("\n=== Espacio en Disco ===")
+    print(f"Total: {disk.total / (1024 ** 3):.2f} GB")
+    print(f"Disponible: {disk.free / (1024 ** 3):.2f} GB")
+    print(f"Usado: {disk.used / (1024 ** 3):.2f} GB")
+    print(f"Porcentaje usado: {disk.percent}%")
+
+
+def tensorflow_inicializado():
+    """Indica si TensorFlow ya fue importado y configurado"""
+    return _tensorflow is not None
+
+
+def perfil_aplicado():
+    """Perfil de hilos y memoria con el que se configuró TensorFlow (None si aún no se cargó)"""
+    return dict(_perfil_aplicado) if _perfil_aplicado is not None else None
+
+
+def inicializar_tensorflow(hilos_intra_op=None, hilos_inter_op=None, usar_xla=True, mostrar_info=True):
+    """Importa y configura TensorFlow; solo la primera llamada tiene efecto (los hilos no se pueden
+    cambiar una vez iniciado el runtime). Los hilos no indicados salen del perfil de la máquina.
+    Devuelve el módulo tensorflow."""
+    global _tensorflow, _perfil_aplicado
+    with _bloqueo:
+        if _tensorflow is not None:
+            return _tensorflow
+
+        perfil = obtener_perfil(hilos_intra_op=hilos_intra_op, hilos_inter_op=hilos_inter_op)
+        if mostrar_info:
+            print_system_info()
+            print(f"\n=== Perfil de rendimiento ===\n{resumen_perfil(perfil)}")
+        limitar_hilos_blas(perfil['hilos_blas'])
+        os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1'
+        import tensorflow
+
+        # Configuración para usar CPU eficientemente
+        physical_devices = tensorflow.config.list_physical_devices('CPU')
+        try:
+            # Configurar para usar toda la memoria disponible
+            tensorflow.config.experimental.set_virtual_device_configuration(
+                physical_devices[0],
+                [tensorflow.config.experimental.VirtualDeviceConfiguration(memory_limit=None)]
+            )
+        except RuntimeError as e:
+            print(f"Error en configuración de dispositivo: {e}")
+
+        # Configurar paralelismo
+        tensorflow.config.threading.set_intra_op_parallelism_threads(perfil['hilos_intra_op'])
+        tensorflow.config.threading.set_inter_op_parallelism_threads(perfil['hilos_inter_op'])
+
+        # Habilitar optimizaciones
+        tensorflow.config.optimizer.set_jit(usar_xla)  # XLA
+
+        # Configurar política de memoria
+        gpus = tensorflow.config.experimental.list_physical_devices('GPU')
+        if gpus:
+            try:
+                for gpu in gpus:
+                    tensorflow.config.experimental.set_memory_growth(gpu, True)
+            except RuntimeError as e:
+                print(e)
+
+        _perfil_aplicado = perfil
+        _tensorflow = tensorflow
+        return tensorflow
+
+
+class _ModuloDiferido:
+    """Sustituto de un módulo que lo importa (inicializando TensorFlow) en el primer acceso"""
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            inicializar_tensorflow()
+            self._modulo = importlib.import_module(self._nombre)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = 'cargado' if self._modulo is not None else 'sin cargar'
+        return f"<módulo diferido '{self._nombre}' ({estado})>"
+
+
+class ClaseDiferida:
+    """Descriptor de clase que importa su módulo (y TensorFlow) solo cuando se accede a ella"""
+
+    def __init__(self, modulo, nombre):
+        self.modulo = modulo
+        self.nombre = nombre
+
+    def __get__(self, instancia, propietario=None):
+        return getattr(importlib.import_module(self.modulo), self.nombre)
+
+
+tf = _ModuloDiferido('tensorflow')
+keras = _ModuloDiferido('tensorflow.keras')
@@ -13,6 +13,13 @@ import re
 import matplotlib.dates as mdates
 import numpy as np
 import math
+from lector_serial import LectorSerial
+from parser_estacion import ParserEstacion, encabezados_predeterminados
+from lecturas_estacion import LecturasEstacion
+from graficos_estacion import PanelSeries, MAXIMO, CATEGORIAS
+
+INTERVALO_LECTOR_MS = 100  # Cada cuánto la interfaz atiende los eventos del lector serial
+INTERVALO_GRAFICOS_RECEPCION = 1.0  # Segundos entre redibujados de gráficos mientras llegan datos
 
 class EstacionMeteoApp:
     def __init__(self, root):
@@ -32,21 +39,12 @@ class EstacionMeteoApp:
         # Variables de estado
         self.connected = False
         self.serial_conn = None
+        self.lector = None  # Hilo lector del puerto (lector_serial)
+        self.recepcion = None  # Bloque de datos que se está recibiendo
         self.password = "MaquinaDelTiempo"  # Contraseña correcta de la ESP32
         
-        # Variables para datos y gráficos
-        self.data = {
-            'fecha': [],
-            'temperatura_C': [],
-            'humedad_relativa': [],
-            'precipitacion_mm': [],
-            'cobertura_nubes_octas': [],
-            'velocidad_viento_kmh': [],
-            'luminosidad_lux': [],
-            'radiacion_solar_wm2': [],
-            'direccion_viento': [],
-            'condicion_climatica': []
-        }
+        # Lecturas de la estación para datos y gráficos (almacén en columnas, ordenado por tiempo)
+        self.lecturas = LecturasEstacion()
         
         # Variables para datos de alertas
         self.alertas_data = {
@@ -1042,13 +1040,13 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         self.hum_ax.set_title('Humedad Relativa (%)')
         self.hum_ax.grid(True)
         
-        # Precipitación
-        self.rain_fig, self.rain_ax = plt.subplots(figsize=(9, 6), dpi=80)
+        # Precipitación (self.rain_ax es el eje de lluvia de los gráficos de riesgo)
+        self.rain_fig, self.precip_ax = plt.subplots(figsize=(9, 6), dpi=80)
         self.rain_canvas = FigureCanvasTkAgg(self.rain_fig, self.rain_tab)
         self.rain_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.rain_ax.set_title('Precipitación (mm)')
-        self.rain_ax.grid(True)
+        self.precip_ax.set_title('Precipitación (mm)')
+        self.precip_ax.grid(True)
         
         # Viento
         self.wind_fig, (self.wind_speed_ax, self.wind_dir_ax) = plt.subplots(2, 1, figsize=(9, 7), dpi=80)
@@ -1070,6 +1068,45 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         self.lux_ax.set_title('Luminosidad (lux)')
         self.lux_ax.grid(True)
         
+        # Series persistentes: update_charts solo cambia sus datos (diezmados al ancho de cada eje)
+        temp_hum = PanelSeries(self.temp_hum_fig, self.temp_hum_canvas)
+        temp_hum.linea(self.temp_ax, 'temperatura_C', 'r-', marker='o', markersize=2)
+        temp_hum.linea(self.hum_ax, 'humedad_relativa', 'b-', marker='o', markersize=2)
+        
+        lluvia = PanelSeries(self.rain_fig, self.rain_canvas)
+        lluvia.linea(self.precip_ax, 'precipitacion_mm', '-', modo=MAXIMO, color='blue', linewidth=2)
+        lluvia.fijar_y(self.precip_ax, 0)
+        
+        # Dirección del viento como puntos, en grados
+        dir_map = {'N': 0, 'NE': 45, 'E': 90, 'SE': 135, 'S': 180, 'SO': 225, 'O': 270, 'NO': 315}
+        viento = PanelSeries(self.wind_fig, self.wind_canvas)
+        viento.linea(self.wind_speed_ax, 'velocidad_viento_kmh', 'g-', marker='o', markersize=2)
+        viento.linea(self.wind_dir_ax, 'direccion_viento', 'o', modo=CATEGORIAS, grados=dir_map,
+                     color='orange', markersize=4)
+        viento.fijar_y(self.wind_dir_ax, -20, 335)
+        self.wind_dir_ax.set_yticks(list(dir_map.values()))
+        self.wind_dir_ax.set_yticklabels(list(dir_map.keys()))
+        
+        radiacion = PanelSeries(self.rad_fig, self.rad_canvas)
+        radiacion.linea(self.rad_ax, 'radiacion_solar_wm2', 'y-', marker='o', markersize=2)
+        radiacion.linea(self.lux_ax, 'luminosidad_lux', 'y-', marker='s', markersize=2)
+        self.paneles_graficos = [temp_hum, lluvia, viento, radiacion]
+        
+        self.temp_ax.set_ylabel('°C')
+        self.hum_ax.set_ylabel('%')
+        self.precip_ax.set_ylabel('mm')
+        self.wind_speed_ax.set_ylabel('km/h')
+        self.rad_ax.set_ylabel('W/m²')
+        self.lux_ax.set_ylabel('lux')
+        for ax in [self.hum_ax, self.precip_ax, self.wind_dir_ax, self.lux_ax]:
+            ax.set_xlabel('Fecha/Hora')
+        
+        # Formato de fecha para ejes X
+        for ax in [self.temp_ax, self.hum_ax, self.precip_ax, self.wind_speed_ax,
+                   self.wind_dir_ax, self.rad_ax, self.lux_ax]:
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+            ax.tick_params(axis='x', labelrotation=30)
+        
         # Ajustar espaciado
         self.temp_hum_fig.tight_layout()
         self.rain_fig.tight_layout()
@@ -1664,149 +1701,17 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
     
     def update_charts(self):
         """Actualiza todos los gráficos con los datos recientes"""
-        if not self.data['fecha']:
+        if not len(self.lecturas):
             return  # No hay datos para mostrar
         
-        # Verificar que todas las listas de datos tienen elementos
-        for key in ['temperatura_C', 'humedad_relativa', 'precipitacion_mm', 'velocidad_viento_kmh', 
-                'direccion_viento', 'luminosidad_lux', 'radiacion_solar_wm2']:
-            if len(self.data[key]) == 0:
-                self.add_log(f"Advertencia: No hay datos para {key}, saltando actualización de gráficas")
-                return
-        
-        # Convertir fechas a objetos datetime para mejor visualización
-        dates = []
-        for d in self.data['fecha']:
-            if isinstance(d, str):
-                try:
-                    # Intentar varios formatos de fecha
-                    if '/' in d:
-                        dates.append(datetime.strptime(d, "%Y/%m/%d %H:%M:%S"))
-                    else:
-                        dates.append(datetime.strptime(d, "%Y-%m-%d %H:%M:%S"))
-                except:
-                    # No registrar error para cada fecha, solo para depuración
-                    dates.append(None)
-            else:
-                dates.append(d)
-        
-        # Eliminar fechas nulas y correspondientes valores de datos
-        valid_indices = [i for i, date in enumerate(dates) if date is not None]
-        if len(valid_indices) == 0:
-            self.add_log("No hay fechas válidas para graficar")
-            return
-        
-        cleaned_dates = [dates[i] for i in valid_indices]
-        
-        # Limpiar datos para cada serie de valores
-        cleaned_data = {}
-        for key in self.data.keys():
-            if key != 'fecha':
-                if len(self.data[key]) > 0:  # Verificar que hay datos
-                    cleaned_data[key] = [self.data[key][i] for i in valid_indices if i < len(self.data[key])]
-                else:
-                    cleaned_data[key] = []
-        
-        # Limpiar gráficos existentes
-        self.temp_ax.clear()
-        self.hum_ax.clear()
-        self.rain_ax.clear()
-        self.wind_speed_ax.clear()
-        self.wind_dir_ax.clear()
-        self.rad_ax.clear()
-        self.lux_ax.clear()
-        
         try:
-            # Verificar que hay datos suficientes para graficar
-            if len(cleaned_dates) > 0 and len(cleaned_data['temperatura_C']) > 0:
-                # Temperatura
-                self.temp_ax.plot(cleaned_dates, cleaned_data['temperatura_C'], 'r-', marker='o', markersize=2)
-                self.temp_ax.set_title('Temperatura (°C)')
-                self.temp_ax.grid(True)
-                self.temp_ax.set_ylabel('°C')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['humedad_relativa']) > 0:
-                # Humedad
-                self.hum_ax.plot(cleaned_dates, cleaned_data['humedad_relativa'], 'b-', marker='o', markersize=2)
-                self.hum_ax.set_title('Humedad Relativa (%)')
-                self.hum_ax.grid(True)
-                self.hum_ax.set_ylabel('%')
-                self.hum_ax.set_xlabel('Fecha/Hora')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['precipitacion_mm']) > 0:
-                # Precipitación
-                self.rain_ax.bar(cleaned_dates, cleaned_data['precipitacion_mm'], width=0.01, color='blue')
-                self.rain_ax.set_title('Precipitación (mm)')
-                self.rain_ax.grid(True)
-                self.rain_ax.set_ylabel('mm')
-                self.rain_ax.set_xlabel('Fecha/Hora')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['velocidad_viento_kmh']) > 0:
-                # Velocidad del viento
-                self.wind_speed_ax.plot(cleaned_dates, cleaned_data['velocidad_viento_kmh'], 'g-', marker='o', markersize=2)
-                self.wind_speed_ax.set_title('Velocidad del Viento (km/h)')
-                self.wind_speed_ax.grid(True)
-                self.wind_speed_ax.set_ylabel('km/h')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['direccion_viento']) > 0:
-                # Dirección del viento (gráfico de dispersión)
-                # Convertir direcciones a valores numéricos para graficar
-                dir_map = {'N': 0, 'NE': 45, 'E': 90, 'SE': 135, 'S': 180, 'SO': 225, 'O': 270, 'NO': 315}
-                dir_values = []
-                for dir_str in cleaned_data['direccion_viento']:
-                    if isinstance(dir_str, str) and dir_str.upper() in dir_map:
-                        dir_values.append(dir_map[dir_str.upper()])
-                    else:
-                        dir_values.append(None)  # Valor no válido
-                        
-                # Filtrar valores nulos antes de graficar
-                valid_dir_indices = [i for i, val in enumerate(dir_values) if val is not None]
-                if valid_dir_indices:
-                    dir_dates = [cleaned_dates[i] for i in valid_dir_indices]
-                    dir_values = [dir_values[i] for i in valid_dir_indices]
-                    
-                    self.wind_dir_ax.scatter(dir_dates, dir_values, marker='o', color='orange', s=15)
-                    self.wind_dir_ax.set_title('Dirección del Viento')
-                    self.wind_dir_ax.set_yticks([0, 45, 90, 135, 180, 225, 270, 315])
-                    self.wind_dir_ax.set_yticklabels(['N', 'NE', 'E', 'SE', 'S', 'SO', 'O', 'NO'])
-                    self.wind_dir_ax.grid(True)
-                    self.wind_dir_ax.set_xlabel('Fecha/Hora')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['radiacion_solar_wm2']) > 0:
-                # Radiación solar
-                self.rad_ax.plot(cleaned_dates, cleaned_data['radiacion_solar_wm2'], 'y-', marker='o', markersize=2)
-                self.rad_ax.set_title('Radiación Solar (W/m²)')
-                self.rad_ax.grid(True)
-                self.rad_ax.set_ylabel('W/m²')
-            
-            if len(cleaned_dates) > 0 and len(cleaned_data['luminosidad_lux']) > 0:
-                # Luminosidad
-                self.lux_ax.plot(cleaned_dates, cleaned_data['luminosidad_lux'], 'y-', marker='s', markersize=2)
-                self.lux_ax.set_title('Luminosidad (lux)')
-                self.lux_ax.grid(True)
-                self.lux_ax.set_ylabel('lux')
-                self.lux_ax.set_xlabel('Fecha/Hora')
-            
-            # Formato de fecha para ejes X
-            for ax in [self.temp_ax, self.hum_ax, self.rain_ax, self.wind_speed_ax, 
-                    self.wind_dir_ax, self.rad_ax, self.lux_ax]:
-                ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-                plt.setp(ax.get_xticklabels(), rotation=30, ha='right')
-            
-            # Ajustar diseño
-            self.temp_hum_fig.tight_layout()
-            self.rain_fig.tight_layout()
-            self.wind_fig.tight_layout()
-            self.rad_fig.tight_layout()
-            
-            # Actualizar canvas
-            self.temp_hum_canvas.draw()
-            self.rain_canvas.draw()
-            self.wind_canvas.draw()
-            self.rad_canvas.draw()
+            # Cada panel cambia los datos de sus series (solo los registros nuevos) y redibuja solo los
+            # ejes que cambiaron; la figura completa solo si los datos salen de los límites actuales
+            redibujados = [panel.actualizar(self.lecturas) for panel in self.paneles_graficos]
             
             # Forzar actualización de la interfaz para asegurar que los gráficos se muestren
-            self.root.update_idletasks()
+            if any(redibujados):
+                self.root.update_idletasks()
             
             self.add_log("Gráficos actualizados con éxito")
         
@@ -1817,12 +1722,10 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
     
     def update_readings_display(self):
         """Actualiza las etiquetas con los últimos valores recibidos"""
-        if not self.data['fecha']:
+        registro = self.lecturas.ultimo()
+        if registro is None:
             return
         
-        # Obtener el último índice
-        idx = len(self.data['fecha']) - 1
-        
         # Función auxiliar para formatear valores con seguridad
         def safe_format(value, format_str):
             try:
@@ -1834,12 +1737,12 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         
         # Actualizar cada etiqueta con el valor más reciente
         for key in self.reading_values.keys():
-            if key in self.data and idx < len(self.data[key]) and self.data[key]:
-                value = self.data[key][idx]
+            if key in registro:
+                value = registro[key]
                 if key in ['temperatura_C', 'humedad_relativa', 'precipitacion_mm', 
                         'velocidad_viento_kmh', 'luminosidad_lux', 'radiacion_solar_wm2']:
                     # Formato para valores numéricos
-                    display = safe_format(value, "{:.1f}")
+                    display = safe_format(value, "{:.1f}") if value is not None else "--.-"
                     unit = " °C" if key == 'temperatura_C' else \
                         " %" if key == 'humedad_relativa' else \
                         " mm" if key == 'precipitacion_mm' else \
@@ -1848,10 +1751,10 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                         " W/m²" if key == 'radiacion_solar_wm2' else ""
                     self.reading_values[key].config(text=f"{display}{unit}")
                 elif key == 'cobertura_nubes_octas':
-                    self.reading_values[key].config(text=f"{value} octas")
+                    self.reading_values[key].config(text=f"{value if value is not None else '-'} octas")
                 else:
                     # Texto directo para valores no numéricos
-                    self.reading_values[key].config(text=str(value))
+                    self.reading_values[key].config(text=str(value) if value is not None else "---")
         
         # Forzar actualización de la interfaz
         self.root.update_idletasks()
@@ -1896,15 +1799,8 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             # Contar cuántas columnas hay para determinar qué encabezados usar
             cols = lines[0].count(',') + 1
             
-            # Estos son los encabezados predeterminados si no hay encabezados en el CSV
-            default_headers = ["fecha_hora", "temp_dht_cal", "hum_dht_raw", "lluvia_mm", 
-                            "cobertura_nubes_octas", "vel_viento_kmh", "direccion_viento", 
-                            "radiacion_solar_J_m2", "radiacion_solar_wm2", "condicion_climatica"]
-            
-            # Asegurarse de que tenemos suficientes encabezados
-            headers = default_headers[:cols]
-            while len(headers) < cols:
-                headers.append(f"columna_{len(headers)+1}")
+            # Formato de 10 o de 15 columnas (y columna_N si sobran)
+            headers = encabezados_predeterminados(cols)
         else:
             # Usar los encabezados existentes de la primera línea
             headers = [h.strip() for h in lines[0].split(',')]
@@ -2124,129 +2020,30 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
     def parse_csv_to_data(self, csv_text):
         """Analiza los datos CSV y actualiza los diccionarios de datos para gráficos"""
         try:
-            # Dividir en líneas y extraer encabezados
-            lines = [line.strip() for line in csv_text.split('\n') if line.strip()]
-            if not lines:
+            parser = ParserEstacion(self.column_mapping)
+            parser.alimentar(csv_text)
+            parser.terminar()
+            
+            if parser.encabezados is None:
                 self.add_log("Error: CSV vacío")
                 return False
-            
-            # Determinar si la primera línea son encabezados
-            headers_line = lines[0]
-            data_starts_at = 0
-            
-            # Si la primera línea tiene texto como "fecha" y no empieza con dígitos, 
-            # asumimos que son encabezados
-            if not headers_line[0].isdigit() and any(keyword in headers_line.lower() 
-                                                for keyword in ['fecha', 'temp', 'hum']):
-                headers = [h.strip() for h in headers_line.split(',')]
-                data_starts_at = 1
-            else:
-                # Si no tiene encabezados, usamos los predeterminados
+            if parser.predeterminados:
                 self.add_log("CSV sin encabezados detectado")
-                # Determinar número de columnas contando comas en la primera línea
-                num_cols = headers_line.count(',') + 1
-                
-                # Crear encabezados predeterminados según el número de columnas
-                default_headers = [
-                    "fecha_hora", "temp_rtc", "temp_dht_raw", "temp_dht_cal", 
-                    "hum_dht_raw", "hum_dht_cal", "vel_viento_kmh", "direccion_viento",
-                    "valor_adc_veleta", "lluvia_mm", "lluvia_actual_mm", "radiacion_solar_J_m2",
-                    "radiacion_solar_wm2", "cobertura_nubes_octas", "condicion_climatica"
-                ]
-                headers = default_headers[:num_cols]
-            
-            # Verificar si tenemos suficientes líneas de datos
-            if data_starts_at >= len(lines):
-                self.add_log("Error: No hay datos después de los encabezados")
-                return False
-            
-            # Crear el mapeo de columnas
-            column_indices = {}
-            for i, header in enumerate(headers):
-                # Para asegurar que lluvia_mm se mapee correctamente
-                if header.lower() == 'lluvia_mm':
-                    column_indices['precipitacion_mm'] = i
-                # Mapear según las reglas
-                elif header in self.column_mapping:
-                    mapped_name = self.column_mapping[header]
-                    column_indices[mapped_name] = i
-                else:
-                    column_indices[header] = i
-            
-            # Limpiar datos existentes
-            for key in self.data:
-                self.data[key] = []
-            
-            # Procesar líneas en lotes para evitar bloqueo de UI
-            batch_size = 1000  # Procesar 1000 líneas a la vez
-            valid_lines = 0
-            total_batches = (len(lines) - data_starts_at + batch_size - 1) // batch_size
-            
-            for batch_start in range(data_starts_at, len(lines), batch_size):
-                batch_end = min(batch_start + batch_size, len(lines))
-                current_batch = batch_start // batch_size + 1
-                
-                self.add_log(f"Procesando lote {current_batch}/{total_batches} ({batch_start}-{batch_end})")
-                
-                # Procesar este lote
-                batch_valid_lines = 0
-                for i in range(batch_start, batch_end):
-                    line = lines[i].strip()
-                    if not line:  # Ignorar líneas vacías
-                        continue
-                    
-                    # Verificar si la línea contiene ayuda o comandos (no válida para datos)
-                    if any(help_text in line.lower() for help_text in ["ayuda", "comando", "logout", "reset"]):
-                        continue
-                    
-                    try:
-                        values = [v.strip() for v in line.split(',')]
-                        
-                        # Verificar que tenemos suficientes valores
-                        if len(values) < 3:  # Mínimo necesitamos fecha y algunos valores
-                            continue
-                        
-                        # Añadir datos a cada columna mapeada
-                        for mapped_col, orig_idx in column_indices.items():
-                            if mapped_col in self.data and orig_idx < len(values):
-                                value = values[orig_idx]
-                                
-                                # Convertir tipos para columnas numéricas
-                                if mapped_col in ['temperatura_C', 'humedad_relativa', 'precipitacion_mm', 
-                                                'velocidad_viento_kmh', 'luminosidad_lux', 
-                                                'radiacion_solar_wm2', 'cobertura_nubes_octas']:
-                                    try:
-                                        value = float(value)
-                                    except:
-                                        value = None
-                                
-                                self.data[mapped_col].append(value)
-                            elif mapped_col in self.data:
-                                # Si la columna existe pero no hay datos, usar None
-                                self.data[mapped_col].append(None)
-                        
-                        batch_valid_lines += 1
-                    except Exception as e:
-                        if i % 100 == 0:  # Limitar mensajes de error para no saturar el log
-                            self.add_log(f"Advertencia: Error al procesar línea {i+1}: {e}")
-                        continue
-                
-                valid_lines += batch_valid_lines
-                
-                # Forzar actualización de la interfaz entre lotes para mantener responsividad
-                if current_batch < total_batches:
-                    self.root.update_idletasks()
-            
-            if valid_lines == 0:
+            if parser.registros == 0:
                 self.add_log("Error: No se pudieron procesar líneas de datos válidas")
                 return False
             
+            # Reemplazar los datos existentes
+            self.lecturas = LecturasEstacion.desde_columnas(parser.arreglos())
+            if self.lecturas.descartados:
+                self.add_log(f"Advertencia: {self.lecturas.descartados} registros sin fecha válida descartados")
+            
             # Actualizar gráficos y lecturas de manera explícita en orden
             self.update_charts()
             self.update_readings_display()
             
             # Habilitar pestañas si hay datos
-            if self.data['fecha']:
+            if len(self.lecturas):
                 self.notebook.tab(self.dash_tab, state="normal")
                 self.notebook.tab(self.water_tab, state="normal")
                 self.notebook.tab(self.alerts_tab, state="normal")
@@ -2254,7 +2051,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             # Forzar actualización final de la UI
             self.root.update_idletasks()
             
-            self.add_log(f"✓ Datos procesados: {valid_lines} registros válidos de {len(lines) - data_starts_at} líneas")
+            self.add_log(f"✓ Datos procesados: {parser.registros} registros válidos")
             return True
             
         except Exception as e:
@@ -2279,47 +2076,16 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                 return
             
             # Verificar si tenemos datos para esta fecha
-            if not self.data['fecha']:
+            if not len(self.lecturas):
                 messagebox.showinfo("Sin datos", "No hay datos cargados para realizar el cálculo. Por favor descargue datos primero.")
                 return
             
-            # Convertir todas las fechas a objetos datetime para comparación
-            datetime_dates = []
-            for d in self.data['fecha']:
-                if isinstance(d, str):
-                    try:
-                        # Intentar varios formatos de fecha
-                        if '/' in d:
-                            dt = datetime.strptime(d, "%Y/%m/%d %H:%M:%S")
-                        else:
-                            dt = datetime.strptime(d, "%Y-%m-%d %H:%M:%S")
-                        datetime_dates.append(dt)
-                    except:
-                        datetime_dates.append(None)
-                else:
-                    datetime_dates.append(d)
-            
-            # Filtrar datos del día seleccionado
-            day_data = []
-            for i, dt in enumerate(datetime_dates):
-                if dt is not None:
-                    # Comparar solo año, mes y día
-                    if (dt.year == selected_date.tm_year and 
-                        dt.month == selected_date.tm_mon and 
-                        dt.day == selected_date.tm_mday):
-                        
-                        # Crear registro con datos relevantes
-                        if i < len(self.data['precipitacion_mm']):
-                            record = {
-                                'datetime': dt,
-                                'hora': dt.hour,
-                                'minuto': dt.minute,
-                                'precipitacion': self.data['precipitacion_mm'][i]
-                            }
-                            day_data.append(record)
+            # Resumen del día seleccionado (tabla de días y lluvia diaria y horaria ya calculadas)
+            resumen = self.lecturas.resumen_lluvia()
+            dia = resumen.detalle(datetime(selected_date.tm_year, selected_date.tm_mon, selected_date.tm_mday))
             
             # Verificar si hay datos para ese día
-            if not day_data:
+            if dia is None:
                 messagebox.showinfo("Sin datos", f"No se encontraron datos para la fecha: {selected_date_formatted}")
                 self.result_text.delete(1.0, tk.END)
                 self.result_text.insert(tk.END, f"No hay datos disponibles para el día {selected_date_formatted}\n")
@@ -2335,20 +2101,11 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                 
                 return
             
-            # Ordenar por hora y minuto
-            day_data.sort(key=lambda x: (x['hora'], x['minuto']))
-            
-            # Encontrar el valor máximo de precipitación del día
-            max_precipitacion = 0
-            max_record = None
-            for record in day_data:
-                if record['precipitacion'] is not None and record['precipitacion'] > max_precipitacion:
-                    max_precipitacion = record['precipitacion']
-                    max_record = record
-            
-            if max_record is None:
-                max_record = day_data[-1]  # Usar el último registro si no se encontró un máximo válido
-                max_precipitacion = max_record['precipitacion'] if max_record['precipitacion'] is not None else 0
+            # Registros del día (ya ordenados por tiempo) y lectura máxima
+            day_dates = self.lecturas.fechas(dia['seleccion']).tolist()
+            day_rain = np.nan_to_num(self.lecturas.valores('precipitacion_mm', dia['seleccion']))
+            max_precipitacion = dia['precipitacion_mm']
+            max_time = day_dates[dia['indice_maximo']]
             
             # Calcular volumen de agua
             volumen_litros = max_precipitacion * area
@@ -2359,8 +2116,8 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             self.result_text.insert(tk.END, f"Fecha: {selected_date_formatted}\n")
             self.result_text.insert(tk.END, f"Área de recolección: {area} m²\n\n")
             
-            self.result_text.insert(tk.END, f"Registros del día: {len(day_data)}\n")
-            self.result_text.insert(tk.END, f"Lectura máxima: {max_record['datetime'].strftime('%H:%M:%S')}\n")
+            self.result_text.insert(tk.END, f"Registros del día: {dia['registros']}\n")
+            self.result_text.insert(tk.END, f"Lectura máxima: {max_time.strftime('%H:%M:%S')}\n")
             self.result_text.insert(tk.END, f"Precipitación acumulada: {max_precipitacion:.2f} mm\n\n")
             
             self.result_text.insert(tk.END, f"RESULTADOS:\n")
@@ -2378,13 +2135,11 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             self.result_text.insert(tk.END, "Hora      | Precipitación (mm)\n")
             self.result_text.insert(tk.END, "-" * 40 + "\n")
             
-            for record in day_data:
-                hora_str = record['datetime'].strftime('%H:%M:%S')
-                precipitacion = record['precipitacion'] if record['precipitacion'] is not None else 0
-                self.result_text.insert(tk.END, f"{hora_str} | {precipitacion:.2f} mm\n")
+            self.result_text.insert(tk.END, "".join(f"{dt:%H:%M:%S} | {precipitacion:.2f} mm\n"
+                                                    for dt, precipitacion in zip(day_dates, day_rain.tolist())))
             
             # Actualizar gráfico de precipitación
-            self.update_rain_day_chart(day_data, selected_date_formatted)
+            self.update_rain_day_chart(day_dates, day_rain, dia['lluvia_hora'], selected_date_formatted)
             
             self.add_log(f"✓ Cálculo completado para {selected_date_formatted}: {volumen_litros:.2f} litros recolectados")
             
@@ -2457,31 +2212,26 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                                             text=f"{volume:.0f} L", anchor="e",
                                             font=("Segoe UI", 8))
     
-    def update_rain_day_chart(self, day_data, date_str):
-        """Actualiza el gráfico de precipitación para el día seleccionado con eje X de 24 horas"""
+    def update_rain_day_chart(self, day_dates, day_rain, rain_by_hour, date_str):
+        """Actualiza el gráfico de precipitación para el día seleccionado con eje X de 24 horas:
+        lluvia caída en cada hora (barras) y lectura acumulada de cada registro (línea)"""
         # Limpiar gráfico existente
         self.rain_day_ax.clear()
         
-        # Preparar datos para el gráfico
-        horas = [record['datetime'] for record in day_data]
-        precipitacion = [record['precipitacion'] if record['precipitacion'] is not None else 0 for record in day_data]
+        start_date = datetime.strptime(date_str, "%Y/%m/%d")
+        hour_starts = pd.date_range(start_date, periods=24, freq='h')
         
-        # Crear gráfico de barras para precipitación
-        self.rain_day_ax.bar(horas, precipitacion, width=0.01, color='#3498db', alpha=0.7)
-        self.rain_day_ax.plot(horas, precipitacion, 'o-', color='#2980b9', alpha=0.8, linewidth=1)
+        # Barras de una hora de ancho con la lluvia de cada hora
+        self.rain_day_ax.bar(hour_starts, rain_by_hour, width=1 / 24, align='edge', color='#3498db', alpha=0.7)
+        self.rain_day_ax.plot(day_dates, day_rain, 'o-', color='#2980b9', alpha=0.8, linewidth=1)
         
         # Configurar título y etiquetas
         self.rain_day_ax.set_title(f'Precipitación del {date_str}')
         self.rain_day_ax.set_ylabel('Precipitación (mm)')
         self.rain_day_ax.set_xlabel('Hora')
         
-        # Crear un rango de 24 horas para el eje X
-        start_date = datetime.strptime(date_str, "%Y/%m/%d")
-        hours_range = [start_date.replace(hour=i, minute=0, second=0) for i in range(24)]
-        next_day = start_date.replace(hour=0, minute=0, second=0) + pd.Timedelta(days=1)
-        
         # Configurar el eje X para mostrar las 24 horas del día
-        self.rain_day_ax.set_xlim(hours_range[0], next_day)
+        self.rain_day_ax.set_xlim(start_date, start_date + pd.Timedelta(days=1))
         
         # Configurar formato de hora en eje X
         hour_fmt = mdates.DateFormatter('%H:%M')
@@ -2591,7 +2341,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
 
     def export_processed_data(self):
         """Exporta los datos procesados con formato específico a un archivo CSV"""
-        if not self.data['fecha']:
+        if not len(self.lecturas):
             messagebox.showinfo("Información", "No hay datos para exportar")
             return
         
@@ -2603,16 +2353,12 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                 'radiacion_solar_wm2', 'direccion_viento', 'condicion_climatica'
             ]
             
+            df = self.lecturas.a_dataframe()
+            
             # Verificar qué columnas están disponibles
-            data_dict = {}
             for col in required_columns:
-                if col in self.data and self.data[col]:
-                    data_dict[col] = self.data[col]
-                else:
+                if df[col].isna().all():
                     self.add_log(f"Advertencia: Columna '{col}' no disponible - usando valores vacíos")
-                    data_dict[col] = [None] * len(self.data['fecha'])
-            
-            df = pd.DataFrame(data_dict)
             
             # Asegurar el orden de las columnas
             df = df[required_columns]
@@ -2737,15 +2483,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                         'radiacion_solar_wm2', 'direccion_viento', 'condicion_climatica'
                     ]
                     
-                    data_dict = {}
-                    for col in required_columns:
-                        if col in self.data and self.data[col]:
-                            data_dict[col] = self.data[col]
-                        else:
-                            data_dict[col] = [None] * len(self.data['fecha'])
-                    
-                    df = pd.DataFrame(data_dict)
-                    df = df[required_columns]
+                    df = self.lecturas.a_dataframe()[required_columns]
                     df.to_csv(filename, index=False)
                     
                     self.add_log(f"✓ Datos procesados guardados en: {filename}")
@@ -2844,7 +2582,11 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
     def _connect_thread(self, port, baudrate, password):
         """Proceso de conexión en hilo separado"""
         try:
-            # Cerrar conexión previa si existe
+            # Cerrar conexión previa si existe; el hilo lector se detiene antes de cerrar el puerto
+            lector = self.lector
+            if lector is not None:
+                lector.detener()
+            self.root.after(0, self.detener_lector)
             if self.serial_conn and self.serial_conn.is_open:
                 self.serial_conn.close()
                 self.serial_conn = None
@@ -2969,6 +2711,9 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         self.status_indicator.configure(bg="green")
         self.status_text.configure(text="Conectado")
         
+        # Desde aquí todas las respuestas de la estación las lee el hilo lector
+        self.iniciar_lector()
+        
         # Cambiar a pestaña de dashboard
         self.notebook.select(self.dash_tab)
         
@@ -2986,6 +2731,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
     def _update_ui_disconnected(self):
         """Actualiza la UI para mostrar estado desconectado"""
         self.connected = False
+        self.detener_lector()
         self.connect_btn.configure(text="CONECTAR", state=tk.NORMAL)
         self.status_indicator.configure(bg="red")
         self.status_text.configure(text="Desconectado")
@@ -3021,6 +2767,9 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         # Liberar semáforo si está bloqueado
         self.is_communicating = False
         
+        # Detener el lector antes de leer la respuesta a LOGOUT
+        self.detener_lector()
+        
         if self.serial_conn:
             try:
                 # Intentar hacer logout limpio
@@ -3045,15 +2794,15 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
         
     def save_data_cache(self):
         """Guarda los datos en caché local manteniendo el formato actual"""
-        if not self.data['fecha']:
+        if not len(self.lecturas):
             return False
             
         cache_file = "estacion_data_cache.pkl"
         try:
-            # Guardar diccionario completo
+            # Guardar el almacén de lecturas completo
             import pickle
             with open(cache_file, 'wb') as f:
-                pickle.dump(self.data, f)
+                pickle.dump(self.lecturas, f)
                 
             # También guardar datos de alertas si están disponibles
             if self.alertas_data['timestamp']:
@@ -3065,7 +2814,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                 with open('estacion_original_data.csv', 'w', encoding='utf-8') as f:
                     f.write(self.original_csv_data)
                     
-            self.add_log(f"✓ Datos guardados en caché local: {len(self.data['fecha'])} registros")
+            self.add_log(f"✓ Datos guardados en caché local: {len(self.lecturas)} registros")
             return True
         except Exception as e:
             self.add_log(f"❌ Error al guardar caché: {str(e)}")
@@ -3079,10 +2828,12 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             return False
             
         try:
-            # Cargar diccionario completo
+            # Cargar el almacén de lecturas completo
             import pickle
             with open(cache_file, 'rb') as f:
-                self.data = pickle.load(f)
+                lecturas = pickle.load(f)
+            # Las cachés anteriores guardaban un diccionario de listas
+            self.lecturas = LecturasEstacion.desde_columnas(lecturas) if isinstance(lecturas, dict) else lecturas
             
             # Intentar cargar datos de alertas
             if os.path.exists('estacion_alertas_cache.pkl'):
@@ -3097,7 +2848,7 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
                 with open('estacion_original_data.csv', 'r', encoding='utf-8') as f:
                     self.original_csv_data = f.read()
                 
-            self.add_log(f"✓ Datos cargados desde caché local: {len(self.data['fecha'])} registros")
+            self.add_log(f"✓ Datos cargados desde caché local: {len(self.lecturas)} registros")
             
             # Actualizar gráficos y lecturas
             self.update_charts()
@@ -3162,166 +2913,27 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             self.alert_update_job = self.root.after(300000, lambda: self.send_predefined_command("ALERTAS"))
             self.add_log("Actualizaciones automáticas reanudadas (próxima en 5 minutos)")
     def _send_command_thread(self, command):
-        """Envía comando y recibe respuesta en hilo separado usando semáforo"""
+        """Envía comando y espera su respuesta en hilo separado usando semáforo.
+        La respuesta la lee el hilo lector y la interfaz la procesa a medida que llega."""
         # Verificar si ya hay una comunicación en curso
         if self.is_communicating:
             self.root.after(0, lambda: self.add_log(f"⚠️ Comando {command} rechazado: comunicación en curso"))
             return
                 
         self.is_communicating = True
-        original_timeout = None
         
         try:
-            # Limpiar buffer completamente antes de enviar
-            self.serial_conn.reset_input_buffer()
-            
-            # Enviar comando
-            self.serial_conn.write(f"{command}\r\n".encode())
-            
-            # Esperar un poco más antes de empezar a leer
-            time.sleep(1.0)
-            
-            # Variables para lectura
-            csv_mode = False
-            csv_buffer = []
-            timeout = time.time() + 180  # Tiempo extendido para datos grandes (3 minutos)
-            csv_inicio_detectado = False
-            csv_fin_detectado = False
+            lector = self.lector
+            if lector is None or not lector.activo:
+                raise Exception("El lector serial no está activo")
             
-            # Para detección de inactividad
-            max_lines_without_activity = 500
-            inactive_counter = 0
-            
-            # Ajustar el timeout serial para lecturas más rápidas durante el proceso
-            original_timeout = self.serial_conn.timeout
-            self.serial_conn.timeout = 0.5
-            
-            while time.time() < timeout:
-                try:
-                    # Leer una línea completa (hasta \n o \r\n)
-                    line = self.serial_conn.readline().decode('latin-1', errors='replace').strip()
-                    
-                    if not line:
-                        inactive_counter += 1
-                        
-                        # Si hay demasiados intentos sin datos, considerar finalizar
-                        if inactive_counter > max_lines_without_activity:
-                            self.root.after(0, lambda: self.add_log("⚠️ Timeout por inactividad - finalizando recepción"))
-                            # Si estamos en modo CSV y hay datos, procesarlos de todos modos
-                            if csv_mode and csv_buffer:
-                                csv_mode = False
-                                csv_fin_detectado = True
-                                self.root.after(0, lambda: self.add_log("--- FIN DE DATOS CSV (FORZADO) ---"))
-                                
-                                # Procesar CSV completo
-                                csv_text = "\n".join(csv_buffer)
-                                self.original_csv_data = csv_text
-                                
-                                is_alertas = command.upper() == "ALERTAS"
-                                if is_alertas:
-                                    self.root.after(0, lambda: self.process_alerts_csv(csv_buffer))
-                                else:
-                                    processed_csv = self.process_csv_data(csv_text)
-                                    self.root.after(0, lambda: self.parse_csv_to_data(processed_csv))
-                                    self.root.after(100, lambda: self.update_charts())
-                                    self.root.after(200, lambda: self.update_readings_display())
-                                    self.root.after(300, lambda: self.root.update_idletasks())
-                                
-                                self.root.after(0, lambda: self.add_log(f"✓ Datos procesados por timeout: {len(csv_buffer)} líneas"))
-                            break
-                        
-                        if csv_fin_detectado or (not csv_mode and time.time() > timeout - 170):
-                            # Esperamos un poco más y si no hay datos, salimos
-                            time.sleep(0.2)
-                            if self.serial_conn.in_waiting == 0:
-                                break
-                        continue
-                    else:
-                        inactive_counter = 0  # Reiniciar contador de inactividad
-                    
-                    # Detectar inicio de datos CSV
-                    if "INICIO_DATOS" in line:
-                        csv_mode = True
-                        csv_inicio_detectado = True
-                        csv_buffer = []  # Reiniciar buffer
-                        self.root.after(0, lambda: self.add_log("--- INICIO DE DATOS CSV ---"))
-                        continue
-                    
-                    # Detectar fin de datos CSV
-                    if "FIN_DATOS" in line and csv_mode:
-                        csv_mode = False
-                        csv_fin_detectado = True
-                        self.root.after(0, lambda: self.add_log("--- FIN DE DATOS CSV ---"))
-                        
-                        # Procesar CSV completo inmediatamente
-                        if csv_buffer:
-                            try:
-                                # Convertir buffer a texto CSV
-                                csv_text = "\n".join(csv_buffer)
-                                
-                                # Guardar datos originales
-                                self.original_csv_data = csv_text
-                                
-                                # Determinar si es una solicitud de datos de alertas
-                                is_alertas = command.upper() == "ALERTAS"
-                                
-                                if is_alertas:
-                                    # Procesar directamente como alertas
-                                    self.root.after(0, lambda: self.process_alerts_csv(csv_buffer))
-                                else:
-                                    # Procesar para visualización
-                                    processed_csv = self.process_csv_data(csv_text)
-                                    # Hacer actualizaciones UI en el hilo principal, con delays para asegurar orden
-                                    self.root.after(0, lambda: self.parse_csv_to_data(processed_csv))
-                                    self.root.after(100, lambda: self.update_charts())
-                                    self.root.after(200, lambda: self.update_readings_display())
-                                    self.root.after(300, lambda: self.root.update_idletasks())
-                                
-                                # Verificar si estamos en una descarga por rango
-                                if hasattr(self, 'waiting_for_data_export') and self.waiting_for_data_export.get('active', False):
-                                    self.root.after(0, self.check_data_received)
-                                
-                                # Guardar caché automáticamente después de recibir datos completos
-                                if command.upper().startswith("DATOS") or command.upper() == "ALERTAS":
-                                    self.root.after(0, self.save_data_cache)
-                                    
-                                self.root.after(0, lambda: self.add_log(f"✓ Datos recibidos: {len(csv_buffer)} líneas"))
-                            except Exception as e:
-                                self.root.after(0, lambda: self.add_log(f"❌ Error procesando CSV: {str(e)}"))
-                                import traceback
-                                self.root.after(0, lambda: self.add_log(traceback.format_exc()))
-                        
-                        # Salir del bucle después de procesar
-                        break
-                    
-                    # Si estamos en modo CSV, almacenar la línea en el buffer
-                    if csv_mode:
-                        # Verificar si la línea parece ser una línea CSV válida
-                        if re.match(r'^\d{4}[-/]', line) or ('fecha' in line.lower() and ',' in line):
-                            csv_buffer.append(line)
-                            # Mostrar solo algunas líneas para no saturar el log
-                            if len(csv_buffer) % 50 == 1 or len(csv_buffer) < 5:
-                                self.root.after(0, lambda l=line: self.add_log(f"CSV[{len(csv_buffer)}]: {l[:60]}..."))
-                    else:
-                        # Reemplazar caracteres especiales en mensajes
-                        fixed_line = line
-                        fixed_line = fixed_line.replace("TransmisiÃ³n", "Transmisión")
-                        fixed_line = fixed_line.replace("lÃ­neas", "líneas")
-                        fixed_line = fixed_line.replace("aplicaciÃ³n", "aplicación")
-                        fixed_line = fixed_line.replace("estÃ¡n", "están")
-                        self.root.after(0, lambda l=fixed_line: self.add_log(f"< {l}"))
-                        
-                        # Si la respuesta contiene información del sistema, procesar variables de configuración
-                        if command.upper() == "INFO" and any(key in line for key in ["Área", "Capacidad", "Volumen"]):
-                            self.process_info_response(fixed_line)
-                        
-                except Exception as read_error:
-                    self.root.after(0, lambda e=read_error: self.add_log(f"⚠️ Error de lectura: {str(e)}"))
-                    time.sleep(0.2)  # Breve pausa antes de continuar
+            # Enviar comando (descarta lo pendiente en el puerto)
+            lector.enviar(command)
             
-            # Restaurar timeout original
-            if original_timeout is not None:
-                self.serial_conn.timeout = original_timeout
+            # Tiempo extendido para datos grandes (3 minutos)
+            resultado = lector.esperar_respuesta(tiempo_maximo=180)
+            if resultado in ('inactividad', 'tiempo'):
+                self.root.after(0, lambda: self.add_log("⚠️ Timeout por inactividad - finalizando recepción"))
             
             # Verificar si es logout
             if command.upper() == "LOGOUT":
@@ -3336,16 +2948,155 @@ El sistema monitorea continuamente estas variables y utiliza un algoritmo de ló
             # Liberar semáforo siempre, sin importar si hubo éxito o error
             self.is_communicating = False
             
-            # Restaurar timeout en caso de error
-            if original_timeout is not None and self.serial_conn:
-                try:
-                    self.serial_conn.timeout = original_timeout
-                except:
-                    pass
-            
             # Si es un comando de datos, reanudar las actualizaciones automáticas
             if command.upper().startswith("DATOS"):
                 self.root.after(1000, self.resume_automatic_updates)
+    
+    def iniciar_lector(self):
+        """Arranca el hilo lector del puerto y la atención de sus eventos desde la interfaz"""
+        self.detener_lector()
+        if not self.serial_conn:
+            return
+        self.lector = LectorSerial(self.serial_conn)
+        self.lector.iniciar()
+        self.root.after(INTERVALO_LECTOR_MS, lambda: self._atender_lector(self.lector))
+    
+    def detener_lector(self):
+        """Detiene el hilo lector (el puerto queda abierto)"""
+        if self.lector is not None:
+            self.lector.detener()
+            self.lector = None
+        self.recepcion = None
+    
+    def _atender_lector(self, lector):
+        """Procesa en el hilo de la interfaz los eventos publicados por el lector"""
+        if lector is not self.lector:
+            return  # Lector detenido o reemplazado
+        for tipo, comando, datos in lector.vaciar_eventos():
+            try:
+                self._procesar_evento_lector(tipo, comando or "", datos)
+            except Exception as e:
+                self.add_log(f"❌ Error procesando CSV: {str(e)}")
+                import traceback
+                self.add_log(traceback.format_exc())
+        self.root.after(INTERVALO_LECTOR_MS, lambda: self._atender_lector(lector))
+    
+    def _procesar_evento_lector(self, tipo, comando, datos):
+        """Líneas sueltas al log, bloques de datos a self.lecturas (o a alertas) a medida que llegan"""
+        if tipo == 'linea':
+            # Reemplazar caracteres especiales en mensajes
+            fixed_line = datos
+            fixed_line = fixed_line.replace("TransmisiÃ³n", "Transmisión")
+            fixed_line = fixed_line.replace("lÃ­neas", "líneas")
+            fixed_line = fixed_line.replace("aplicaciÃ³n", "aplicación")
+            fixed_line = fixed_line.replace("estÃ¡n", "están")
+            self.add_log(f"< {fixed_line}")
+            
+            # Si la respuesta contiene información del sistema, procesar variables de configuración
+            if comando.upper() == "INFO" and any(key in datos for key in ["Área", "Capacidad", "Volumen"]):
+                self.process_info_response(fixed_line)
+        elif tipo == 'inicio':
+            self.add_log("--- INICIO DE DATOS CSV ---")
+            self.recepcion = {
+                'comando': comando,
+                'lineas': [],
+                'alertas': comando.upper() == "ALERTAS",  # Las alertas se procesan al final del bloque
+                'parser': None,
+                'volcados': 0,  # Registros del parser ya pasados a self.lecturas
+                'ultimo_grafico': 0.0
+            }
+        elif tipo == 'registros':
+            self._recibir_registros(datos)
+        elif tipo == 'fin':
+            self._recibir_fin(datos)
+        elif tipo == 'error':
+            self.add_log(f"⚠️ Error de lectura: {datos}")
+    
+    def _recibir_registros(self, lineas):
+        """Pasa un lote de líneas del bloque en curso al parser y redibuja cada cierto tiempo"""
+        recepcion = self.recepcion
+        if recepcion is None:
+            return
+        inicio = len(recepcion['lineas'])
+        recepcion['lineas'].extend(lineas)
+        # Mostrar solo algunas líneas para no saturar el log
+        for numero, linea in enumerate(lineas, inicio + 1):
+            if numero % 50 == 1 or numero < 5:
+                self.add_log(f"CSV[{numero}]: {linea[:60]}...")
+        
+        if recepcion['parser'] is None and not recepcion['alertas']:
+            if "tipo_alerta" in lineas[0].lower():
+                recepcion['alertas'] = True
+            else:
+                recepcion['parser'] = ParserEstacion(self.column_mapping)
+        if recepcion['alertas']:
+            return
+        
+        parser = recepcion['parser']
+        parser.alimentar("\n".join(lineas) + "\n")
+        if parser.predeterminados and inicio == 0:
+            self.add_log("CSV sin encabezados detectado, añadiendo encabezados")
+        
+        ahora = time.monotonic()
+        if parser.registros and ahora - recepcion['ultimo_grafico'] >= INTERVALO_GRAFICOS_RECEPCION:
+            recepcion['ultimo_grafico'] = ahora
+            self._volcar_recepcion(recepcion)
+            self.update_charts()
+            self.update_readings_display()
+    
+    def _volcar_recepcion(self, recepcion):
+        """Añade a self.lecturas los registros del parser que aún no están en él"""
+        if recepcion['volcados'] == 0:
+            # Los datos anteriores se reemplazan por los que van llegando
+            self.lecturas = LecturasEstacion()
+        columnas = recepcion['parser'].arreglos()
+        total = len(columnas['fecha']) if 'fecha' in columnas else 0
+        self.lecturas.agregar({columna: valores[recepcion['volcados']:] for columna, valores in columnas.items()})
+        recepcion['volcados'] = total
+    
+    def _recibir_fin(self, info):
+        """Cierra el bloque recibido: gráficos finales, caché y exportaciones pendientes"""
+        recepcion, self.recepcion = self.recepcion, None
+        forzado = info['forzado']
+        self.add_log("--- FIN DE DATOS CSV (FORZADO) ---" if forzado else "--- FIN DE DATOS CSV ---")
+        if recepcion is None or not recepcion['lineas']:
+            return
+        
+        # Guardar datos originales
+        lineas = recepcion['lineas']
+        self.original_csv_data = "\n".join(lineas)
+        comando = recepcion['comando'].upper()
+        
+        parser = recepcion['parser']
+        if recepcion['alertas']:
+            # Procesar directamente como alertas
+            self.process_alerts_csv(lineas)
+        elif parser is None or parser.registros == 0:
+            self.add_log("Error: No se pudieron procesar líneas de datos válidas")
+        else:
+            self._volcar_recepcion(recepcion)
+            self.update_charts()
+            self.update_readings_display()
+            # Habilitar pestañas si hay datos
+            if len(self.lecturas):
+                self.notebook.tab(self.dash_tab, state="normal")
+                self.notebook.tab(self.water_tab, state="normal")
+                self.notebook.tab(self.alerts_tab, state="normal")
+            self.add_log(f"✓ Datos procesados: {parser.registros} registros válidos de {len(lineas)} líneas")
+        
+        if forzado:
+            self.add_log(f"✓ Datos procesados por timeout: {len(lineas)} líneas")
+            return
+        
+        # Verificar si estamos en una descarga por rango
+        if hasattr(self, 'waiting_for_data_export') and self.waiting_for_data_export.get('active', False):
+            self.check_data_received()
+        
+        # Guardar caché automáticamente después de recibir datos completos
+        if comando.startswith("DATOS") or comando == "ALERTAS":
+            self.save_data_cache()
+        self.add_log(f"✓ Datos recibidos: {len(lineas)} líneas")
+    
     def queue_command(self, command):
         """Añade un comando a la cola y procesa si no hay comandos en ejecución"""
         self.command_queue.append(command)
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import ventanas_temporales
+from ensemble_paralelo import dataset_desde_memmap, planificar_procesos
+
+# Evaluación con origen móvil (rolling origin) para generar_reporte_evaluacion.
+# Los folds son los de TimeSeriesSplit: cada uno entrena un modelo nuevo con todas las ventanas
+# anteriores a su tramo de prueba. Los límites de los folds y las predicciones de cada uno (categoría
+# predicha y su probabilidad por ventana y horizonte) se guardan en disco con una clave de la serie y
+# de la configuración; al repetir la evaluación solo se entrenan los folds que faltan. Los folds se
+# reparten entre procesos que leen la serie mapeada en memoria, como la búsqueda de hiperparámetros.
+# Las métricas salen de matrices de confusión armadas con np.bincount (globales, por horizonte y por
+# categoría) y se añaden a metricas_modelo.csv en formato largo: una fila por métrica, con columnas de
+# fold, horizonte y categoría para poder filtrarlas y seguir la habilidad del modelo en el tiempo.
+
+VERSION_EVALUACION = 1
+DIRECTORIO_EVALUACION = 'cache_evaluacion'
+ARCHIVO_METRICAS = 'metricas_modelo.csv'
+VENTANA_TIEMPO = 12
+NUM_PLIEGUES = 5
+EPOCAS_PLIEGUE = 20
+PACIENCIA_PLIEGUE = 5
+
+_hilos_proceso = 1
+
+
+def pliegues_origen_movil(total_ventanas, num_pliegues=NUM_PLIEGUES):
+    """[(fin del entrenamiento, inicio de prueba, fin de prueba)] de TimeSeriesSplit sobre las ventanas
+    (los folds son tramos contiguos, así que bastan sus límites)"""
+    from sklearn.model_selection import TimeSeriesSplit
+
+    return [(int(train[-1]) + 1, int(prueba[0]), int(prueba[-1]) + 1)
+            for train, prueba in TimeSeriesSplit(n_splits=num_pliegues).split(np.arange(total_ventanas))]
+
+
+def matriz_confusion(reales, predichas, num_categorias):
+    """Matriz de confusión (reales x predichas) con un solo np.bincount"""
+    codigos = np.ravel(reales).astype(np.int64) * num_categorias + np.ravel(predichas)
+    return np.bincount(codigos, minlength=num_categorias ** 2).reshape(num_categorias, num_categorias)
+
+
+def matrices_por_horizonte(reales, predichas, num_categorias):
+    """Matrices de confusión (H, C, C) de bloques (N, H), una por horizonte, con un solo np.bincount"""
+    reales = np.asarray(reales, dtype=np.int64)
+    horas = reales.shape[1]
+    codigos = (np.arange(horas) * num_categorias + reales) * num_categorias + np.asarray(predichas)
+    return np.bincount(codigos.ravel(), minlength=horas * num_categorias ** 2).reshape(
+        horas, num_categorias, num_categorias)
+
+
+def metricas_confusion(matriz):
+    """Métricas de una matriz (..., C, C): exactitud y precision/recall/f1 ponderados por soporte
+    (como precision_recall_fscore_support con average='weighted') y los valores por categoría"""
+    matriz = np.asarray(matriz, dtype=np.float64)
+    aciertos = np.diagonal(matriz, axis1=-2, axis2=-1)
+    soporte = matriz.sum(axis=-1)
+    predichas = matriz.sum(axis=-2)
+    total = soporte.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predichas > 0, aciertos / predichas, 0.0)
+        recall = np.where(soporte > 0, aciertos / soporte, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        pesos = soporte / np.expand_dims(np.where(total > 0, total, 1), -1)
+    return {
+        'exactitud': aciertos.sum(axis=-1) / np.where(total > 0, total, 1),
+        'precision': (precision * pesos).sum(axis=-1),
+        'recall': (recall * pesos).sum(axis=-1),
+        'f1': (f1 * pesos).sum(axis=-1),
+        'precision_clase': precision,
+        'recall_clase': recall,
+        'f1_clase': f1,
+        'soporte_clase': soporte
+    }
+
+
+def clave_evaluacion(serie, num_categorias, pliegues, epocas, batch_size):
+    """Clave de la caché: serie, categorías, límites de los folds y configuración del entrenamiento"""
+    contenido = json.dumps([VERSION_EVALUACION, serie, int(num_categorias), pliegues, int(epocas), int(batch_size)])
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()[:20]
+
+
+def _inicializar_proceso(hilos):
+    """Se ejecuta al arrancar cada proceso, antes de importar TensorFlow"""
+    global _hilos_proceso
+    _hilos_proceso = hilos
+    from perfil_rendimiento import limitar_hilos_blas
+    limitar_hilos_blas(hilos)
+
+
+def _evaluar_pliegue(numero, limites, ruta_modelo, directorio_serie, epocas, batch_size, ruta_salida):
+    """Entrena el modelo de un fold con las ventanas anteriores a su prueba y guarda sus predicciones"""
+    from entorno_tensorflow import inicializar_tensorflow, keras
+
+    inicializar_tensorflow(hilos_intra_op=_hilos_proceso, hilos_inter_op=1, mostrar_info=False)
+    fin_train, inicio_prueba, fin_prueba = limites
+    matriz = np.load(os.path.join(directorio_serie, 'matriz.npy'), mmap_mode='r')
+    etiquetas = np.load(os.path.join(directorio_serie, 'etiquetas.npy'), mmap_mode='r')
+    X = ventanas_temporales.ventanas_entrada(matriz, VENTANA_TIEMPO)
+    y = ventanas_temporales.ventanas_objetivo(etiquetas, VENTANA_TIEMPO)
+
+    # El último 20 % del tramo de entrenamiento se usa para validación (como validation_split)
+    inicios_train, inicios_val = ventanas_temporales.dividir_inicios(fin_train, 0.2)
+    dataset_train = dataset_desde_memmap(X, y, batch_size, barajar=True, indices=inicios_train)
+    dataset_val = dataset_desde_memmap(X, y, batch_size, indices=inicios_val)
+    dataset_prueba = dataset_desde_memmap(X, y, batch_size, indices=np.arange(inicio_prueba, fin_prueba))
+
+    modelo = keras.models.load_model(ruta_modelo)
+    historia = modelo.fit(
+        dataset_train,
+        validation_data=dataset_val,
+        epochs=epocas,
+        callbacks=[keras.callbacks.EarlyStopping(monitor='val_loss', patience=PACIENCIA_PLIEGUE,
+                                                 restore_best_weights=True)],
+        verbose=0
+    )
+    probabilidades = modelo.predict(dataset_prueba, verbose=0)
+
+    # Solo la categoría predicha y su probabilidad: las métricas se recalculan desde aquí
+    temporal = f"{ruta_salida}.tmp-{os.getpid()}.npz"
+    np.savez(temporal,
+             predichas=np.argmax(probabilidades, axis=-1).astype(np.int16),
+             probabilidad=np.max(probabilidades, axis=-1).astype(np.float16))
+    os.replace(temporal, ruta_salida)
+    return numero, len(historia.history.get('loss', []))
+
+
+def _cargar_pliegue(ruta):
+    try:
+        with np.load(ruta) as datos:
+            return datos['predichas'].astype(np.int64), datos['probabilidad'].astype(np.float32)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def evaluar(matriz, etiquetas, num_categorias, crear_modelo, num_pliegues=NUM_PLIEGUES, epocas=EPOCAS_PLIEGUE,
+            batch_size=64, procesos=None, nucleos=None, clave_serie=None, directorio_serie=None,
+            directorio=DIRECTORIO_EVALUACION):
+    """Evaluación con origen móvil. crear_modelo(input_shape, num_categorias) crea el modelo sin entrenar
+    de cada fold (solo para los folds que no están en la caché).
+    clave_serie/directorio_serie: entrada de cache_series donde ya están matriz.npy y etiquetas.npy."""
+    from busqueda_hiperparametros import huella_serie
+
+    total = ventanas_temporales.numero_ventanas(len(matriz), VENTANA_TIEMPO)
+    pliegues = pliegues_origen_movil(total, num_pliegues)
+    serie = clave_serie or huella_serie(matriz, etiquetas, num_categorias)
+    clave = clave_evaluacion(serie, num_categorias, pliegues, epocas, batch_size)
+    ruta = os.path.join(directorio, clave)
+    os.makedirs(ruta, exist_ok=True)
+    with open(os.path.join(ruta, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'version': VERSION_EVALUACION, 'serie': serie, 'num_categorias': int(num_categorias),
+                   'pliegues': pliegues, 'epocas': int(epocas), 'batch_size': int(batch_size)}, f, indent=2)
+
+    rutas = [os.path.join(ruta, f"pliegue_{k + 1}.npz") for k in range(len(pliegues))]
+    faltantes = [k for k, ruta_pliegue in enumerate(rutas) if _cargar_pliegue(ruta_pliegue) is None]
+    if faltantes:
+        _entrenar_pliegues(faltantes, pliegues, rutas, matriz, etiquetas, num_categorias, crear_modelo,
+                           epocas, batch_size, procesos, nucleos, directorio_serie)
+    else:
+        print(f"Evaluación {clave}: predicciones de los {len(pliegues)} folds tomadas de la caché")
+
+    # Métricas desde las predicciones guardadas
+    y = ventanas_temporales.ventanas_objetivo(etiquetas, VENTANA_TIEMPO)
+    por_horizonte = np.zeros((ventanas_temporales.HORIZONTE_PREDICCION, num_categorias, num_categorias), dtype=np.int64)
+    resultados_pliegues = []
+    for k, ((fin_train, inicio_prueba, fin_prueba), ruta_pliegue) in enumerate(zip(pliegues, rutas), 1):
+        predichas, _ = _cargar_pliegue(ruta_pliegue)
+        matrices = matrices_por_horizonte(y[inicio_prueba:fin_prueba], predichas, num_categorias)
+        por_horizonte += matrices
+        metricas = metricas_confusion(matrices.sum(axis=0))
+        resultados_pliegues.append({
+            'pliegue': k,
+            'ventanas_entrenamiento': fin_train,
+            'ventanas_prueba': fin_prueba - inicio_prueba,
+            **{nombre: float(metricas[nombre]) for nombre in ('exactitud', 'precision', 'recall', 'f1')}
+        })
+
+    confusion = por_horizonte.sum(axis=0)
+    return {
+        'clave': clave,
+        'pliegues': resultados_pliegues,
+        'global': metricas_confusion(confusion),
+        'por_horizonte': metricas_confusion(por_horizonte),
+        'matriz_confusion': confusion
+    }
+
+
+def _entrenar_pliegues(faltantes, pliegues, rutas, matriz, etiquetas, num_categorias, crear_modelo,
+                       epocas, batch_size, procesos, nucleos, directorio_serie):
+    nucleos = nucleos or os.cpu_count() or 1
+    procesos, hilos = planificar_procesos(len(faltantes), nucleos, procesos)
+    print(f"Evaluación con origen móvil: {len(faltantes)} de {len(pliegues)} folds por entrenar, "
+          f"{procesos} procesos de {hilos} hilos")
+
+    temporal = tempfile.mkdtemp(prefix='evaluacion_')
+    pool = None
+    try:
+        if directorio_serie is None:
+            directorio_serie = temporal
+            np.save(os.path.join(temporal, 'matriz.npy'), np.ascontiguousarray(matriz, dtype=np.float32))
+            np.save(os.path.join(temporal, 'etiquetas.npy'), np.ascontiguousarray(etiquetas))
+        tareas = []
+        for k in faltantes:
+            # Modelo nuevo por fold, creado aquí y entrenado en su proceso
+            ruta_modelo = os.path.join(temporal, f"modelo_{k + 1}.keras")
+            crear_modelo((VENTANA_TIEMPO, matriz.shape[1]), num_categorias).save(ruta_modelo)
+            tareas.append((k + 1, pliegues[k], ruta_modelo, directorio_serie, epocas, batch_size, rutas[k]))
+
+        if procesos == 1:
+            for tarea in tareas:
+                _informar(pliegues, *_evaluar_pliegue(*tarea))
+            return
+        # spawn: TensorFlow no admite fork una vez iniciado su runtime
+        pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_inicializar_proceso, initargs=(hilos,))
+        pendientes = {pool.submit(_evaluar_pliegue, *tarea) for tarea in tareas}
+        while pendientes:
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                _informar(pliegues, *futuro.result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def _informar(pliegues, numero, epocas_entrenadas):
+    fin_train, inicio_prueba, fin_prueba = pliegues[numero - 1]
+    print(f"Fold {numero}/{len(pliegues)}: {fin_train} ventanas de entrenamiento, "
+          f"{fin_prueba - inicio_prueba} de prueba, {epocas_entrenadas} épocas")
+
+
+def filas_metricas(evaluacion, categorias=None, fecha=None):
+    """Filas en formato largo (fecha, tipo, evaluación, fold, horizonte, categoría, métrica, valor):
+    totales y por fold, por horizonte y por categoría con soporte o predicciones"""
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d %H:%M')
+    num_categorias = len(evaluacion['matriz_confusion'])
+    base = {'fecha': fecha, 'tipo': 'evaluacion', 'num_categorias': num_categorias, 'evaluacion': evaluacion['clave']}
+    filas = []
+
+    def anotar(metrica, valor, pliegue=None, horizonte=None, categoria=None):
+        filas.append({**base, 'pliegue': pliegue, 'horizonte': horizonte, 'categoria': categoria,
+                      'metrica': metrica, 'valor': float(valor)})
+
+    for nombre in ('exactitud', 'precision', 'recall', 'f1'):
+        anotar(nombre, evaluacion['global'][nombre])
+        for resultado in evaluacion['pliegues']:
+            anotar(nombre, resultado[nombre], pliegue=resultado['pliegue'])
+    for nombre in ('exactitud', 'f1'):
+        for h, valor in enumerate(evaluacion['por_horizonte'][nombre], 1):
+            anotar(nombre, valor, horizonte=h)
+
+    global_ = evaluacion['global']
+    presentes = np.flatnonzero(evaluacion['matriz_confusion'].sum(axis=0) + global_['soporte_clase'] > 0)
+    for c in presentes:
+        categoria = categorias[c] if categorias is not None and c < len(categorias) else f"Clase {c}"
+        for nombre in ('precision', 'recall', 'f1', 'soporte'):
+            anotar(nombre, global_[f"{nombre}_clase"][c], categoria=categoria)
+    return filas
+
+
+def registrar_metricas(filas, ruta=ARCHIVO_METRICAS):
+    """Añade las filas a metricas_modelo.csv; si el archivo aún no tiene estas columnas se reescribe
+    con la unión de columnas (las filas de entrenamiento anteriores quedan vacías en las nuevas)"""
+    nuevas = pd.DataFrame(filas)
+    if os.path.exists(ruta):
+        columnas = list(pd.read_csv(ruta, nrows=0).columns)
+        if set(nuevas.columns) <= set(columnas):
+            nuevas.reindex(columns=columnas).to_csv(ruta, mode='a', header=False, index=False)
+            return
+        nuevas = pd.concat([pd.read_csv(ruta), nuevas], ignore_index=True)
+    nuevas.to_csv(ruta, index=False)
@@ -0,0 +1,257 @@
+import matplotlib.dates as mdates
+import numpy as np
+
+from parser_estacion import ColumnaCreciente
+
+# Gráficos de la estación con artistas persistentes y series diezmadas.
+# Cada serie es un Line2D que se crea una vez y se actualiza con set_data; títulos, rejillas y
+# formato de fechas no se vuelven a configurar. Los puntos se diezman al ancho del eje en píxeles:
+# los registros se agrupan en bloques de 2^k (el menor tamaño que deja como mucho un bloque por
+# píxel) y de cada bloque se dibujan el mínimo y el máximo en su orden (envolvente), solo el máximo
+# (barras de lluvia) o la primera aparición de cada categoría (dirección del viento). Los bloques
+# completos se guardan: al llegar registros nuevos solo se procesa la cola, y todo se recalcula
+# únicamente si cambia el tamaño de bloque (el historial se duplicó o cambió el ancho) o si las
+# lecturas se reemplazaron o reordenaron. Así el dibujo cuesta lo mismo con cien que con cientos de
+# miles de registros.
+# PanelSeries maneja una figura: si los datos nuevos caben en los límites actuales de un eje solo se
+# restaura su fondo guardado, se dibujan sus series y se copia ese recuadro al lienzo (blit); si no,
+# los límites se amplían con margen y se redibuja la figura completa.
+
+ENVOLVENTE = 'envolvente'  # Mínimo y máximo de cada bloque
+MAXIMO = 'maximo'  # Máximo de cada bloque, dibujado como barra vertical desde 0
+CATEGORIAS = 'categorias'  # Primera aparición de cada categoría en cada bloque
+
+MARGEN = 0.05  # Fracción del rango de datos que se deja a cada lado al fijar límites
+HOLGURA = 0.10  # Espacio extra hacia adelante al ampliar límites (los datos nuevos llegan a la derecha)
+HORA = 1 / 24  # Rango mínimo del eje X en días de matplotlib
+
+
+def tamano_bloque(registros, columnas):
+    """Menor potencia de dos que deja como mucho `columnas` bloques"""
+    tamano = 1
+    while tamano * max(columnas, 1) < registros:
+        tamano *= 2
+    return tamano
+
+
+def _en_bloques(valores, tamano, relleno):
+    """Matriz (bloques, tamano) con la última fila completada con `relleno`"""
+    filas = -(-len(valores) // tamano)
+    bloques = np.full(filas * tamano, relleno, dtype=valores.dtype)
+    bloques[:len(valores)] = valores
+    return bloques.reshape(filas, tamano)
+
+
+def envolvente(valores, tamano):
+    """Posiciones del mínimo y del máximo de cada bloque, en orden; un bloque sin datos aporta su primer
+    registro (NaN, de modo que la línea se corta)"""
+    if tamano == 1:
+        return np.arange(len(valores), dtype=np.int64)
+    bloques = _en_bloques(valores, tamano, np.nan)
+    nulos = np.isnan(bloques)
+    minimos = np.where(nulos, np.inf, bloques).argmin(axis=1)
+    maximos = np.where(nulos, -np.inf, bloques).argmax(axis=1)
+    pares = np.sort(np.stack([minimos, maximos], axis=1), axis=1)
+    return (pares + np.arange(len(bloques))[:, None] * tamano).ravel().astype(np.int64)
+
+
+def maximos(valores, tamano):
+    """Posición del máximo de cada bloque"""
+    if tamano == 1:
+        return np.arange(len(valores), dtype=np.int64)
+    bloques = _en_bloques(valores, tamano, np.nan)
+    posiciones = np.where(np.isnan(bloques), -np.inf, bloques).argmax(axis=1)
+    return (posiciones + np.arange(len(bloques)) * tamano).astype(np.int64)
+
+
+def primeras_categorias(codigos, tamano):
+    """Posición de la primera aparición de cada código (>= 0) en cada bloque, en orden"""
+    if tamano == 1:
+        return np.flatnonzero(codigos >= 0).astype(np.int64)
+    bloques = _en_bloques(codigos, tamano, -1)
+    partes = []
+    for codigo in np.unique(codigos[codigos >= 0]):
+        presentes = bloques == codigo
+        filas = np.flatnonzero(presentes.any(axis=1))
+        partes.append(filas * tamano + presentes[filas].argmax(axis=1))
+    if not partes:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(partes)).astype(np.int64)
+
+
+SELECCIONES = {ENVOLVENTE: envolvente, MAXIMO: maximos, CATEGORIAS: primeras_categorias}
+
+
+class SerieDiezmada:
+    """Registros a dibujar de una columna de LecturasEstacion; guarda los bloques ya completos"""
+
+    def __init__(self, columna, modo=ENVOLVENTE):
+        self.columna = columna
+        self.modo = modo
+        self._seleccionar = SELECCIONES[modo]
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._origen = None  # Columna de tiempos y reordenamientos de las lecturas diezmadas
+        self.tamano = 0
+        self.registros = 0
+        self.indices = np.empty(0, dtype=np.int64)
+        self._completos = ColumnaCreciente(np.int64)
+        self._bloques = 0
+
+    def actualizar(self, lecturas, columnas):
+        """Recalcula los índices para un eje de `columnas` píxeles. Devuelve None si no cambió nada,
+        'agregados' si son las mismas lecturas con registros nuevos (o con otro tamaño de bloque) o
+        'reemplazo' si las lecturas son otras o se reordenaron."""
+        registros = len(lecturas)
+        origen = (lecturas.tiempo, lecturas.reordenamientos)
+        tamano = tamano_bloque(registros, columnas)
+        mismas = (self._origen is not None and origen[0] is self._origen[0] and origen[1] == self._origen[1]
+                  and registros >= self.registros)
+        if mismas and tamano == self.tamano and registros == self.registros:
+            return None
+        if not (mismas and tamano == self.tamano):
+            self.reiniciar()
+            self._origen = origen
+            self.tamano = tamano
+
+        valores = lecturas.valores(self.columna)
+        completos = registros // tamano
+        if completos > self._bloques:
+            inicio = self._bloques * tamano
+            self._completos.agregar(self._seleccionar(valores[inicio:completos * tamano], tamano) + inicio)
+            self._bloques = completos
+        cola = completos * tamano
+        self.indices = np.concatenate([self._completos.valores,
+                                       self._seleccionar(valores[cola:registros], tamano) + cola])
+        self.registros = registros
+        return 'agregados' if mismas else 'reemplazo'
+
+
+class PanelSeries:
+    """Series persistentes de una figura; redibuja solo los ejes cuyos datos cambiaron"""
+
+    def __init__(self, figura, canvas):
+        self.figura = figura
+        self.canvas = canvas
+        self.series = []  # (eje, Line2D, SerieDiezmada, grados por categoría o None)
+        self._limites = {}  # Límites (x0, x1, y0, y1) fijados en cada eje
+        self._limites_y = {}  # Eje -> (inferior, superior); None en superior deja ese extremo libre
+        self._fondos = {}
+        self._dibujo_pendiente = False
+        canvas.mpl_connect('draw_event', self._al_dibujar)
+
+    def linea(self, eje, columna, formato='-', modo=ENVOLVENTE, grados=None, **estilo):
+        """Crea la serie de `columna` en `eje`. grados: valor Y de cada texto (modo CATEGORIAS)."""
+        linea, = eje.plot([], [], formato, animated=True, **estilo)
+        eje.xaxis_date()
+        self.series.append((eje, linea, SerieDiezmada(columna, modo), grados))
+        return linea
+
+    def fijar_y(self, eje, inferior, superior=None):
+        """Límites del eje Y que no dependen de los datos (superior None: se ajusta a los datos)"""
+        self._limites_y[eje] = (inferior, superior)
+
+    def actualizar(self, lecturas):
+        """Lleva las series a las lecturas actuales; devuelve True si hubo que redibujar algo"""
+        cambios = {}
+        for eje, linea, serie, grados in self.series:
+            cambio = serie.actualizar(lecturas, int(eje.bbox.width))
+            if cambio is None:
+                continue
+            linea.set_data(*self._puntos(lecturas, serie, grados))
+            cambios[eje] = 'reemplazo' if 'reemplazo' in (cambios.get(eje), cambio) else cambio
+        if not cambios:
+            return False
+
+        ampliados = [eje for eje, cambio in cambios.items() if self._ajustar_limites(eje, cambio == 'reemplazo')]
+        if ampliados or self._dibujo_pendiente or not self._fondos:
+            self._redibujar()
+        else:
+            for eje in cambios:
+                self._blit(eje)
+        return True
+
+    def _puntos(self, lecturas, serie, grados):
+        indices = serie.indices
+        x = mdates.date2num(lecturas.fechas(indices))
+        valores = lecturas.valores(serie.columna, indices)
+        if serie.modo == CATEGORIAS:
+            # El código -1 (sin valor) toma el último elemento de la tabla
+            tabla = np.array([grados.get(texto.upper(), np.nan) for texto in lecturas.categorias[serie.columna]]
+                             + [np.nan])
+            return x, tabla[valores]
+        y = valores.astype(np.float64)
+        if serie.modo == MAXIMO:
+            # Una barra por punto: (x, 0) -> (x, y) y un NaN que separa de la siguiente
+            x = np.repeat(x, 3)
+            barras = np.zeros((len(y), 3))
+            barras[:, 1] = y
+            barras[:, 2] = np.nan
+            return x, barras.ravel()
+        return x, y
+
+    def _ajustar_limites(self, eje, reiniciar):
+        """Fija límites que contengan los datos; devuelve True si cambiaron"""
+        xs, ys = [], []
+        for serie_eje, linea, _, _ in self.series:
+            if serie_eje is eje:
+                xs.append(np.asarray(linea.get_xdata(), dtype=np.float64))
+                ys.append(np.asarray(linea.get_ydata(), dtype=np.float64))
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        x = x[np.isfinite(x)]
+        y = y[np.isfinite(y)]
+        if not len(x):
+            return False
+        x0, x1 = float(x.min()), float(x.max())
+        y0, y1 = (float(y.min()), float(y.max())) if len(y) else (0.0, 1.0)
+        inferior, superior = self._limites_y.get(eje, (None, None))
+
+        actuales = None if reiniciar else self._limites.get(eje)
+        if actuales is not None:
+            if x0 >= actuales[0] and x1 <= actuales[1] and y0 >= actuales[2] and y1 <= actuales[3]:
+                return False
+            # Ampliar con holgura para que las próximas lecturas quepan sin redibujar la figura
+            x_ini, x_fin = min(x0, actuales[0]), max(x1, actuales[1])
+            y_ini, y_fin = min(y0, actuales[2]), max(y1, actuales[3])
+            rango_x = max(x_fin - x_ini, HORA)
+            rango_y = max(y_fin - y_ini, 1.0)
+            limites = (x_ini, x_fin + HOLGURA * rango_x if x1 > actuales[1] else x_fin,
+                       y_ini - HOLGURA * rango_y if y0 < actuales[2] else y_ini,
+                       y_fin + HOLGURA * rango_y if y1 > actuales[3] else y_fin)
+        else:
+            rango_x = max(x1 - x0, HORA)
+            rango_y = max(y1 - y0, 1.0)
+            limites = (x0 - MARGEN * rango_x, x1 + MARGEN * rango_x, y0 - MARGEN * rango_y, y1 + MARGEN * rango_y)
+        if inferior is not None:
+            limites = limites[:2] + (inferior, limites[3])
+        if superior is not None:
+            limites = limites[:3] + (superior,)
+        if limites == actuales:
+            return False
+        self._limites[eje] = limites
+        eje.set_xlim(limites[0], limites[1])
+        eje.set_ylim(limites[2], limites[3])
+        return True
+
+    def _redibujar(self):
+        """Dibujo completo (ejes, marcas y series); los fondos se guardan en _al_dibujar"""
+        self._dibujo_pendiente = True
+        self.figura.tight_layout()
+        self.canvas.draw_idle()
+
+    def _al_dibujar(self, evento):
+        # El dibujo completo omite los artistas animados: se guarda el fondo de cada eje y se dibujan encima
+        ejes = {eje for eje, _, _, _ in self.series}
+        self._fondos = {eje: self.canvas.copy_from_bbox(eje.bbox) for eje in ejes}
+        for eje, linea, _, _ in self.series:
+            eje.draw_artist(linea)
+        self._dibujo_pendiente = False
+
+    def _blit(self, eje):
+        self.canvas.restore_region(self._fondos[eje])
+        for serie_eje, linea, _, _ in self.series:
+            if serie_eje is eje:
+                eje.draw_artist(linea)
+        self.canvas.blit(eje.bbox)
@@ -0,0 +1,230 @@
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import almacen_columnar
+import puente_temporal
+
+# Histórico integrado particionado por mes, para integrar_datasets(..., incremental=True).
+# Cada partición guarda los datos crudos (con NaN) y los rellenados de un mes. Al llegar datos
+# nuevos solo se cargan los meses desde el último registro completo anterior a ellos, se vuelve a
+# rellenar ese vecindario y se reescribe el CSV de salida desde el inicio del primer mes afectado
+# (truncando el archivo en ese punto), en lugar de regenerar los siete años cada noche.
+
+VERSION_HISTORICO = 1
+ARCHIVO_INDICE = 'indice.json'
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+DIAS_HUECO_PUENTE = 30  # Con huecos mayores se genera un puente sintético (puente_temporal)
+
+COLUMNAS_INTEGRACION = ['fecha', 'temperatura_C', 'humedad_relativa',
+                        'precipitacion_mm', 'cobertura_nubes_octas',
+                        'velocidad_viento_kmh', 'radiacion_solar_J_m2']
+# La precipitación faltante se toma como 0; el resto se interpola y necesita vecinos válidos
+COLUMNAS_INTERPOLADAS = [col for col in COLUMNAS_INTEGRACION[1:] if col != 'precipitacion_mm']
+
+
+def cargar_para_integracion(ruta, nombre, convertir_radiacion=False):
+    """Lee un CSV y lo deja con las columnas de integración, numéricas e indexadas por fecha"""
+    # float64: los valores se vuelven a escribir en el CSV integrado sin cambiar su representación
+    df = almacen_columnar.cargar_tabla(ruta, dtype_flotante=np.float64)
+    df['fecha'] = pd.to_datetime(df['fecha'])
+
+    # Convertir radiacion_solar_wm2 a radiacion_solar_J_m2 si existe
+    if convertir_radiacion and 'radiacion_solar_wm2' in df.columns and 'radiacion_solar_J_m2' not in df.columns:
+        print("Convirtiendo unidades de radiación solar de W/m² a J/m²...")
+        # Para datos horarios, multiplicamos por 3600 segundos
+        df['radiacion_solar_J_m2'] = df['radiacion_solar_wm2'] * 3600
+        df = df.drop('radiacion_solar_wm2', axis=1)
+
+    for col in COLUMNAS_INTEGRACION[1:]:
+        if col not in df.columns:
+            print(f"Advertencia: La columna '{col}' no existe en el dataset {nombre}. Creando columna con valores NaN.")
+            df[col] = float('nan')
+
+    df = df[COLUMNAS_INTEGRACION].copy()
+    for col in COLUMNAS_INTEGRACION[1:]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.set_index('fecha')
+
+
+def combinar_con_prioridad(*dfs):
+    """Concatena y ordena; con fechas repetidas gana el último DataFrame (la estación propia)"""
+    df = pd.concat(dfs)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df.index.name = 'fecha'
+    return df
+
+
+def rellenar_integracion(df):
+    """Rellena los valores nulos del dataset integrado con el método de cada variable"""
+    df = df.copy()
+    for col in COLUMNAS_INTEGRACION[1:]:
+        if df[col].isnull().any():
+            if col in ['temperatura_C', 'humedad_relativa']:
+                # Para temp y humedad, usar interpolación tiempo con límites
+                df[col] = df[col].interpolate(method='time', limit_direction='both')
+            elif col == 'precipitacion_mm':
+                df[col] = df[col].fillna(0)  # Asumir 0 precipitación por defecto
+            else:
+                # Para otras variables, interpolación linear simple
+                df[col] = df[col].interpolate(method='linear', limit_direction='both')
+    return df
+
+
+def firma_archivo(ruta):
+    """Tamaño y fecha de modificación de un archivo, para detectar que cambió"""
+    estado = os.stat(ruta)
+    return [estado.st_size, estado.st_mtime_ns]
+
+
+def _mes(fecha):
+    return fecha.strftime('%Y-%m')
+
+
+def _texto_csv(df, encabezado=False):
+    return df.reset_index().to_csv(index=False, header=encabezado, date_format=FORMATO_FECHA,
+                                   lineterminator='\n').encode('utf-8')
+
+
+class HistoricoParticionado:
+    """Histórico integrado en particiones mensuales, sincronizado con el CSV de salida"""
+
+    def __init__(self, ruta_csv, directorio=None):
+        self.ruta_csv = ruta_csv
+        self.directorio = directorio or os.path.splitext(ruta_csv)[0] + '_particiones'
+        self.indice = None
+
+    def disponible(self, origen=None):
+        """True si el almacén existe, el CSV de salida no se modificó fuera de él ni quedó a medio
+        escribir, y (si se indica) se construyó con el histórico de firma `origen`"""
+        ruta = os.path.join(self.directorio, ARCHIVO_INDICE)
+        if not os.path.exists(ruta) or not os.path.exists(self.ruta_csv):
+            return False
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except Exception as e:
+            print(f"Error al leer el índice del histórico particionado: {e}")
+            return False
+        if (indice.get('version') != VERSION_HISTORICO or not indice.get('particiones')
+                or indice.get('bytes_csv') != os.path.getsize(self.ruta_csv)):
+            return False
+        if origen is not None and indice.get('origen') != origen:
+            print("El histórico de origen cambió desde la última integración")
+            return False
+        self.indice = indice
+        return True
+
+    def reconstruir(self, crudo, relleno, origen=None):
+        """Crea el almacén y el CSV completos a partir de una integración completa; `origen` es la
+        firma del histórico usado (ver firma_archivo)"""
+        os.makedirs(self.directorio, exist_ok=True)
+        if self.indice is not None:
+            for particion in self.indice['particiones'].values():
+                ruta = os.path.join(self.directorio, particion['archivo'])
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+        self.indice = {'version': VERSION_HISTORICO, 'origen': origen, 'particiones': {}}
+        with open(self.ruta_csv, 'wb') as f:
+            f.write(_texto_csv(relleno.iloc[:0], encabezado=True))
+            self._escribir_meses(f, crudo, relleno)
+        self._guardar_indice()
+
+    def cargar(self, desde=None):
+        """Histórico rellenado completo (o desde el mes `desde`, 'AAAA-MM')"""
+        meses = [m for m in sorted(self.indice['particiones']) if desde is None or m >= desde]
+        return pd.concat([self._cargar_mes(m)[1] for m in meses])
+
+    def integrar(self, nuevos):
+        """Inserta o actualiza registros (con prioridad sobre los guardados), rellena solo el
+        vecindario afectado y actualiza el CSV en su lugar. Devuelve los meses reescritos
+        (el histórico completo se obtiene con cargar())."""
+        if len(nuevos) == 0:
+            print("Integración incremental: no hay registros nuevos")
+            return nuevos.iloc[:0]
+        meses = sorted(self.indice['particiones'])
+        ultima_fecha = pd.Timestamp(self.indice['particiones'][meses[-1]]['hasta'])
+        inicio_nuevos = nuevos.index.min()
+
+        # Hueco largo tras el histórico: puente sintético, como en la integración completa
+        if (inicio_nuevos - ultima_fecha).days > DIAS_HUECO_PUENTE:
+            print(f"ADVERTENCIA: Existe un hueco temporal de {(inicio_nuevos - ultima_fecha).days} días")
+            cola = self._cargar_mes(meses[-1])[1]
+            puente = puente_temporal.puente_entre(cola, nuevos, COLUMNAS_INTEGRACION[1:])
+            if len(puente) > 0:
+                print(f"Puente temporal creado con {len(puente)} puntos de datos")
+                nuevos = combinar_con_prioridad(puente, nuevos)
+                inicio_nuevos = nuevos.index.min()
+
+        # Se cargan meses hacia atrás hasta encontrar un registro completo anterior a los nuevos:
+        # la interpolación desde ese ancla en adelante no depende de nada anterior
+        afectados = [m for m in meses if m >= _mes(inicio_nuevos)] or meses[-1:]
+        anteriores = [m for m in meses if m < afectados[0]]
+        partes = {m: self._cargar_mes(m) for m in afectados}
+        while True:
+            crudo = pd.concat([partes[m][0] for m in sorted(partes)])
+            previos = crudo[crudo.index < inicio_nuevos]
+            completos = previos[COLUMNAS_INTERPOLADAS].notna().all(axis=1)
+            if completos.any() or not anteriores:
+                break
+            mes = anteriores.pop()
+            partes[mes] = self._cargar_mes(mes)
+        ancla = completos[completos].index[-1] if completos.any() else None
+
+        relleno_previo = pd.concat([partes[m][1] for m in sorted(partes)])
+        crudo = combinar_con_prioridad(crudo, nuevos)
+        if ancla is None:
+            relleno = rellenar_integracion(crudo)
+        else:
+            relleno = pd.concat([relleno_previo[relleno_previo.index < ancla],
+                                 rellenar_integracion(crudo[crudo.index >= ancla])])
+        print(f"Integración incremental: {len(nuevos)} registros nuevos, "
+              f"meses reescritos: {_mes(crudo.index[0])} a {_mes(crudo.index[-1])}")
+
+        # El CSV se trunca al inicio del primer mes cargado (todos los posteriores también lo están)
+        primer_mes = sorted(partes)[0]
+        inicio_csv = self.indice['particiones'][primer_mes]['inicio_csv']
+        # Mientras se reescribe, el índice queda marcado como incompleto: si el proceso se interrumpe,
+        # disponible() devuelve False y la próxima integración reconstruye todo
+        self.indice['bytes_csv'] = None
+        self._guardar_indice()
+        for mes in [m for m in meses if m >= primer_mes]:
+            del self.indice['particiones'][mes]
+        with open(self.ruta_csv, 'r+b') as f:
+            f.seek(inicio_csv)
+            f.truncate()
+            self._escribir_meses(f, crudo, relleno)
+        self._guardar_indice()
+        return relleno
+
+    def _escribir_meses(self, f, crudo, relleno):
+        """Guarda cada mes como partición y lo añade al CSV abierto en f"""
+        claves = relleno.index.strftime('%Y-%m')
+        for mes in pd.unique(claves):
+            mascara = claves == mes
+            relleno_mes = relleno[mascara]
+            archivo = f'{mes}.pkl'
+            joblib.dump((crudo[mascara], relleno_mes), os.path.join(self.directorio, archivo))
+            inicio = f.tell()
+            f.write(_texto_csv(relleno_mes))
+            self.indice['particiones'][mes] = {
+                'archivo': archivo,
+                'filas': int(mascara.sum()),
+                'desde': str(relleno_mes.index[0]),
+                'hasta': str(relleno_mes.index[-1]),
+                'inicio_csv': inicio
+            }
+        self.indice['bytes_csv'] = f.tell()
+
+    def _cargar_mes(self, mes):
+        return joblib.load(os.path.join(self.directorio, self.indice['particiones'][mes]['archivo']))
+
+    def _guardar_indice(self):
+        # Escritura atómica: el índice solo referencia particiones ya escritas
+        ruta = os.path.join(self.directorio, ARCHIVO_INDICE)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.indice, f, indent=2)
+        os.replace(ruta + '.tmp', ruta)
@@ -0,0 +1,302 @@
+import queue
+import re
+import threading
+import time
+
+# Lector serial asíncrono de la estación.
+# Un hilo persistente por puerto lee los bytes disponibles y los deja en un buffer circular acotado;
+# de ahí se separan las líneas completas y un entramador reconoce los bloques INICIO_DATOS/FIN_DATOS
+# a medida que llegan. Cada línea suelta, inicio de bloque, lote de registros (para parser_estacion)
+# y fin de bloque se publica como evento en una cola que la interfaz vacía desde su propio hilo
+# (root.after), así que un volcado grande de DATOS se puede ir mostrando mientras se recibe.
+# Los hilos de comandos solo escriben el comando y esperan a que la respuesta termine (fin de bloque
+# o inactividad) sobre una condición, sin leer el puerto. Cada enviar() abre una generación nueva y
+# espera a que termine la lectura en curso: sus bytes llegaron antes de limpiar el puerto, son de la
+# respuesta anterior y se descartan. Ninguna lectura empieza entre el cambio de generación y la escritura.
+
+CAPACIDAD_BUFFER = 1 << 20  # Bytes pendientes de formar línea (una línea sin fin no crece sin límite)
+TAMANO_MAXIMO_LOTE = 500  # Registros por evento como máximo
+INTERVALO_PUBLICACION = 0.2  # Segundos que se acumulan registros antes de publicarlos
+MAX_EVENTOS = 2000  # Eventos en cola antes de frenar la lectura hasta que la interfaz los consuma
+TIMEOUT_LECTURA = 0.1  # Segundos que bloquea cada lectura del puerto (permite detener el hilo)
+
+PATRON_REGISTRO = re.compile(r'^\d{4}[-/]')
+
+
+def es_linea_csv(linea):
+    """Línea de datos (empieza por una fecha) o encabezado del CSV"""
+    return bool(PATRON_REGISTRO.match(linea)) or ('fecha' in linea.lower() and ',' in linea)
+
+
+class BufferCircular:
+    """Buffer de bytes de capacidad fija; al desbordarse descarta los bytes más antiguos"""
+
+    def __init__(self, capacidad=CAPACIDAD_BUFFER):
+        self._datos = bytearray(capacidad)
+        self._inicio = 0
+        self._tamano = 0
+        self.descartados = 0
+
+    @property
+    def capacidad(self):
+        return len(self._datos)
+
+    def __len__(self):
+        return self._tamano
+
+    def limpiar(self):
+        self._inicio = 0
+        self._tamano = 0
+
+    def escribir(self, datos):
+        datos = memoryview(datos)
+        capacidad = self.capacidad
+        if len(datos) > capacidad:
+            self.descartados += len(datos) - capacidad
+            datos = datos[-capacidad:]
+        exceso = self._tamano + len(datos) - capacidad
+        if exceso > 0:
+            self._inicio = (self._inicio + exceso) % capacidad
+            self._tamano -= exceso
+            self.descartados += exceso
+        fin = (self._inicio + self._tamano) % capacidad
+        primera = min(len(datos), capacidad - fin)
+        self._datos[fin:fin + primera] = datos[:primera]
+        self._datos[:len(datos) - primera] = datos[primera:]
+        self._tamano += len(datos)
+
+    def _segmentos(self):
+        """Los datos guardados como uno o dos tramos (inicio, fin) del arreglo"""
+        fin = self._inicio + self._tamano
+        if fin <= self.capacidad:
+            return [(self._inicio, fin)]
+        return [(self._inicio, self.capacidad), (0, fin - self.capacidad)]
+
+    def leer(self, n):
+        """Extrae los n primeros bytes"""
+        n = min(n, self._tamano)
+        salida = bytearray()
+        for inicio, fin in self._segmentos():
+            if len(salida) >= n:
+                break
+            salida += self._datos[inicio:min(fin, inicio + n - len(salida))]
+        self._inicio = (self._inicio + n) % self.capacidad
+        self._tamano -= n
+        return bytes(salida)
+
+    def extraer_lineas(self):
+        """Extrae todas las líneas completas (terminadas en \\n); la línea incompleta queda en el buffer"""
+        desplazamiento = 0
+        ultimo = -1
+        for inicio, fin in self._segmentos():
+            posicion = self._datos.rfind(b'\n', inicio, fin)
+            if posicion >= 0:
+                ultimo = desplazamiento + posicion - inicio
+            desplazamiento += fin - inicio
+        if ultimo < 0:
+            return []
+        return self.leer(ultimo + 1).split(b'\n')[:-1]
+
+
+class EntramadorBloques:
+    """Convierte líneas en eventos (tipo, comando, datos), reconociendo los bloques de datos:
+    ('linea', texto), ('inicio', None), ('registros', líneas), ('fin', {'lineas', 'forzado'})"""
+
+    def __init__(self, comando=None):
+        self.reiniciar(comando)
+
+    def reiniciar(self, comando=None):
+        self.comando = comando
+        self.en_bloque = False
+        self.lineas_bloque = 0
+        self.bloques_terminados = 0
+        self._lote = []
+        self._ultima_publicacion = time.monotonic()
+
+    def procesar(self, lineas):
+        """Eventos de las líneas recibidas; los registros se acumulan hasta completar un lote o hasta
+        que pasa INTERVALO_PUBLICACION desde la última publicación"""
+        eventos = []
+        for linea in lineas:
+            texto = linea.decode('latin-1', errors='replace').strip()
+            if not texto:
+                continue
+            if "INICIO_DATOS" in texto:
+                self._publicar_lote(eventos)
+                self.en_bloque = True
+                self.lineas_bloque = 0
+                eventos.append(('inicio', self.comando, None))
+            elif "FIN_DATOS" in texto and self.en_bloque:
+                self._publicar_lote(eventos)
+                eventos.append(self._cerrar(forzado=False))
+            elif self.en_bloque:
+                if es_linea_csv(texto):
+                    self._lote.append(texto)
+                    self.lineas_bloque += 1
+                    if len(self._lote) >= TAMANO_MAXIMO_LOTE:
+                        self._publicar_lote(eventos)
+            else:
+                eventos.append(('linea', self.comando, texto))
+        if time.monotonic() - self._ultima_publicacion >= INTERVALO_PUBLICACION:
+            self._publicar_lote(eventos)
+        return eventos
+
+    def pendientes(self):
+        """Publica los registros acumulados (el puerto quedó en silencio)"""
+        eventos = []
+        self._publicar_lote(eventos)
+        return eventos
+
+    def _publicar_lote(self, eventos):
+        self._ultima_publicacion = time.monotonic()
+        if self._lote:
+            eventos.append(('registros', self.comando, self._lote))
+            self._lote = []
+
+    def forzar_fin(self):
+        """Cierra el bloque abierto (respuesta interrumpida por inactividad)"""
+        if not self.en_bloque:
+            return []
+        eventos = self.pendientes()
+        eventos.append(self._cerrar(forzado=True))
+        return eventos
+
+    def _cerrar(self, forzado):
+        self.en_bloque = False
+        self.bloques_terminados += 1
+        return ('fin', self.comando, {'lineas': self.lineas_bloque, 'forzado': forzado})
+
+
+class LectorSerial:
+    """Hilo lector persistente de un puerto serie, con buffer circular y cola de eventos para la interfaz"""
+
+    def __init__(self, conexion, capacidad=CAPACIDAD_BUFFER, max_eventos=MAX_EVENTOS):
+        self.conexion = conexion
+        self.buffer = BufferCircular(capacidad)
+        self.entramador = EntramadorBloques()
+        self.eventos = queue.Queue(maxsize=max_eventos)
+        self.ultima_actividad = time.monotonic()
+        self._generacion = 0  # Comandos enviados; una lectura solo vale si no cambió mientras leía
+        self._leyendo = False
+        self._enviando = False
+        self._condicion = threading.Condition()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._timeout_original = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        self._timeout_original = self.conexion.timeout
+        self.conexion.timeout = TIMEOUT_LECTURA
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._leer, name="LectorSerial", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo (el puerto queda abierto, con su timeout original)"""
+        self._detener.set()
+        if self._hilo is not None and self._hilo is not threading.current_thread():
+            self._hilo.join(timeout=2)
+        self._hilo = None
+        if self._timeout_original is not None:
+            try:
+                self.conexion.timeout = self._timeout_original
+            except Exception:
+                pass
+
+    def _leer(self):
+        while not self._detener.is_set():
+            with self._condicion:
+                while self._enviando and not self._detener.is_set():
+                    self._condicion.wait(timeout=TIMEOUT_LECTURA)
+                generacion = self._generacion
+                self._leyendo = True
+            try:
+                datos = self.conexion.read(self.conexion.in_waiting or 1)
+            except Exception as e:
+                self._publicar([('error', self.entramador.comando, str(e))])
+                return
+            with self._condicion:
+                self._leyendo = False
+                if generacion != self._generacion:
+                    self._condicion.notify_all()  # enviar() espera el final de esta lectura
+                    continue  # Leído antes de enviar(): pertenece a la respuesta anterior
+                if datos:
+                    self.ultima_actividad = time.monotonic()
+                    self.buffer.escribir(datos)
+                    eventos = self.entramador.procesar(self.buffer.extraer_lineas())
+                    self._condicion.notify_all()
+                else:
+                    eventos = self.entramador.pendientes()
+            self._publicar(eventos)
+
+    def _publicar(self, eventos):
+        for evento in eventos:
+            # Con la cola llena la lectura espera a la interfaz (los bytes quedan en el puerto)
+            while not self._detener.is_set():
+                try:
+                    self.eventos.put(evento, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    def enviar(self, comando):
+        """Descarta lo pendiente y envía el comando; los eventos siguientes llevan ese comando"""
+        with self._condicion:
+            self._generacion += 1
+            self._enviando = True
+            try:
+                # La lectura en curso (como mucho TIMEOUT_LECTURA) se descarta al terminar
+                while self._leyendo and self.activo:
+                    self._condicion.wait(timeout=TIMEOUT_LECTURA)
+                self.conexion.reset_input_buffer()
+                self.buffer.limpiar()
+                self.entramador.reiniciar(comando)
+                self.ultima_actividad = time.monotonic()
+                self.conexion.write(f"{comando}\r\n".encode())
+            finally:
+                self._enviando = False
+                self._condicion.notify_all()
+
+    def esperar_respuesta(self, tiempo_maximo=180, espera_minima=10, silencio=1.0, inactividad_bloque=30):
+        """Espera el final de la respuesta al último comando. Devuelve 'bloque' (FIN_DATOS recibido),
+        'silencio' (sin bloque abierto, pasada espera_minima y sin datos durante `silencio` segundos),
+        'inactividad' (bloque abierto sin datos durante inactividad_bloque; se cierra forzado) o 'tiempo'."""
+        inicio = time.monotonic()
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+                quieto = ahora - self.ultima_actividad
+                # enviar() reinicia el entramador: cualquier bloque terminado responde a este comando
+                if self.entramador.bloques_terminados > 0:
+                    return 'bloque'
+                if self.entramador.en_bloque:
+                    if quieto >= inactividad_bloque:
+                        eventos = self.entramador.forzar_fin()
+                        resultado = 'inactividad'
+                        break
+                elif ahora - inicio >= espera_minima and quieto >= silencio:
+                    return 'silencio'
+                if ahora - inicio >= tiempo_maximo:
+                    eventos = self.entramador.forzar_fin()
+                    resultado = 'tiempo'
+                    break
+                if not self.activo:
+                    return 'detenido'
+                self._condicion.wait(timeout=0.5)
+        self._publicar(eventos)
+        return resultado
+
+    def vaciar_eventos(self, limite_segundos=0.05):
+        """Eventos disponibles, sin pasar de limite_segundos (para llamarlo desde la interfaz)"""
+        eventos = []
+        fin = time.monotonic() + limite_segundos
+        while time.monotonic() < fin:
+            try:
+                eventos.append(self.eventos.get_nowait())
+            except queue.Empty:
+                break
+        return eventos
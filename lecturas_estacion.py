@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+
+from parser_estacion import COLUMNAS_DATOS, COLUMNAS_NUMERICAS, ColumnaCreciente
+
+# Almacén en columnas de las lecturas de la estación (reemplaza el diccionario de listas de
+# EstacionMeteoApp). La fecha de cada registro se interpreta una sola vez al añadirlo y se guarda como
+# segundos desde 1970 (int64); las mediciones como float32 con NaN en los faltantes y la dirección del
+# viento y la condición climática como códigos int16 sobre una tabla de textos (-1 = sin valor).
+# Los registros se mantienen ordenados por tiempo, así que un rango de fechas se resuelve con dos
+# búsquedas binarias (searchsorted) y devuelve un slice contiguo. Gráficos, lecturas, cálculo de agua,
+# exportaciones y la importación al predictor leen las columnas directamente.
+# ResumenLluvia es el índice por día (posición del primer registro de cada día) con la lluvia acumulada
+# de cada día y la caída en cada hora, calculados de una vez para todos los días y guardados hasta
+# que cambian las lecturas; el detalle de un día (lectura máxima) se guarda la primera vez que se pide.
+
+COLUMNAS_CATEGORICAS = ('direccion_viento', 'condicion_climatica')
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'  # Formato de la estación (también con '/' como separador)
+SIN_CATEGORIA = -1
+SEGUNDOS_DIA = 86400
+
+
+def a_epoca(fechas):
+    """Segundos desde 1970 de textos 'AAAA-MM-DD HH:MM:SS' / 'AAAA/MM/DD HH:MM:SS' u objetos fecha.
+    Devuelve (segundos int64, máscara de fechas reconocidas)."""
+    serie = pd.Series(np.asarray(fechas, dtype=object), dtype=object)
+    if pd.api.types.infer_dtype(serie, skipna=True) == 'string':
+        convertidas = pd.to_datetime(serie.str.strip().str.replace('/', '-', regex=False),
+                                     format=FORMATO_FECHA, errors='coerce')
+    else:
+        # Objetos fecha, o mezcla con textos (cachés antiguas)
+        convertidas = pd.to_datetime(serie.map(lambda f: f.strip().replace('/', '-') if isinstance(f, str) else f),
+                                     format='mixed', errors='coerce')
+    validas = convertidas.notna().to_numpy()
+    segundos = convertidas.to_numpy('datetime64[s]').astype(np.int64)
+    segundos[~validas] = 0
+    return segundos, validas
+
+
+def a_segundos(fecha):
+    """Segundos desde 1970 de una fecha (datetime, date, texto o datetime64)"""
+    return int(np.datetime64(pd.Timestamp(fecha).to_datetime64(), 's').astype(np.int64))
+
+
+def _alinear(valores, total):
+    """Lista o arreglo recortado o completado con None hasta `total` elementos"""
+    valores = list(valores) if valores is not None else []
+    return valores[:total] + [None] * (total - len(valores))
+
+
+class LecturasEstacion:
+    """Lecturas de la estación en columnas tipadas, ordenadas por tiempo"""
+
+    def __init__(self):
+        self.limpiar()
+
+    def limpiar(self):
+        self.tiempo = ColumnaCreciente(np.int64)
+        self.numericas = {columna: ColumnaCreciente(np.float32) for columna in COLUMNAS_NUMERICAS}
+        self.codigos = {columna: ColumnaCreciente(np.int16) for columna in COLUMNAS_CATEGORICAS}
+        self.categorias = {columna: [] for columna in COLUMNAS_CATEGORICAS}
+        self._posicion_categoria = {columna: {} for columna in COLUMNAS_CATEGORICAS}
+        self.descartados = 0  # Registros sin fecha reconocible
+        self.reordenamientos = 0  # Veces que se reordenaron registros ya guardados (invalida los diezmados)
+        self._resumen = None
+
+    @classmethod
+    def desde_columnas(cls, columnas):
+        lecturas = cls()
+        lecturas.agregar(columnas)
+        return lecturas
+
+    def __len__(self):
+        return len(self.tiempo)
+
+    # --- Escritura ---
+
+    def agregar(self, columnas):
+        """Añade registros desde columnas con los nombres de la aplicación ('fecha' como texto o fecha;
+        las columnas que falten quedan sin valor). Devuelve cuántos registros se añadieron."""
+        fechas = columnas.get('fecha')
+        total = 0 if fechas is None else len(fechas)
+        segundos, validas = a_epoca(fechas if total else [])
+        nuevos = int(validas.sum())
+        self.descartados += total - nuevos
+        if nuevos == 0:
+            return 0
+
+        segundos = segundos[validas]
+        ordenado = (len(self) == 0 or segundos[0] >= self.tiempo.valores[-1]) and bool(np.all(np.diff(segundos) >= 0))
+        self.tiempo.agregar(segundos)
+        for columna, datos in self.numericas.items():
+            valores = columnas.get(columna)
+            if valores is None or len(valores) == 0:
+                datos.agregar(np.full(nuevos, np.nan, dtype=np.float32))
+                continue
+            if not (isinstance(valores, np.ndarray) and valores.dtype.kind == 'f' and len(valores) == total):
+                valores = pd.to_numeric(pd.Series(_alinear(valores, total), dtype=object), errors='coerce').to_numpy(np.float64)
+            datos.agregar(valores[validas].astype(np.float32))
+        for columna, datos in self.codigos.items():
+            valores = columnas.get(columna)
+            if valores is None or len(valores) == 0:
+                datos.agregar(np.full(nuevos, SIN_CATEGORIA, dtype=np.int16))
+                continue
+            if len(valores) != total:
+                valores = _alinear(valores, total)
+            datos.agregar(self._codificar(columna, np.asarray(valores, dtype=object)[validas]))
+        if not ordenado:
+            self._ordenar()
+        self._resumen = None
+        return nuevos
+
+    def _codificar(self, columna, textos):
+        textos = pd.Series(textos, dtype=object).fillna('').astype(str).str.strip().to_numpy(str)
+        unicos, inverso = np.unique(textos, return_inverse=True)
+        posiciones = self._posicion_categoria[columna]
+        tabla = np.empty(len(unicos), dtype=np.int16)
+        for k, texto in enumerate(unicos.tolist()):
+            if not texto:
+                tabla[k] = SIN_CATEGORIA
+                continue
+            if texto not in posiciones:
+                posiciones[texto] = len(self.categorias[columna])
+                self.categorias[columna].append(texto)
+            tabla[k] = posiciones[texto]
+        return tabla[inverso]
+
+    def _ordenar(self):
+        """Reordena todas las columnas por tiempo (registros que llegaron desordenados)"""
+        orden = np.argsort(self.tiempo.valores, kind='stable')
+        self.reordenamientos += 1
+        for datos in [self.tiempo, *self.numericas.values(), *self.codigos.values()]:
+            datos.valores[:] = datos.valores[orden]
+
+    # --- Consultas ---
+
+    def tiempos(self, seleccion=slice(None)):
+        """Segundos desde 1970 (vista)"""
+        return self.tiempo.valores[seleccion]
+
+    def fechas(self, seleccion=slice(None)):
+        """Fechas como datetime64[s] (vista sobre los mismos datos)"""
+        return self.tiempo.valores[seleccion].view('datetime64[s]')
+
+    def valores(self, columna, seleccion=slice(None)):
+        """Mediciones float32 (vista) o códigos int16 de una columna categórica"""
+        if columna in self.numericas:
+            return self.numericas[columna].valores[seleccion]
+        return self.codigos[columna].valores[seleccion]
+
+    def textos(self, columna, seleccion=slice(None)):
+        """Textos de una columna categórica (None si no hay valor)"""
+        tabla = np.array(self.categorias[columna] + [None], dtype=object)
+        return tabla[self.codigos[columna].valores[seleccion]]
+
+    def rango(self, desde=None, hasta=None):
+        """Slice de los registros con desde <= fecha < hasta (búsqueda binaria)"""
+        tiempos = self.tiempo.valores
+        inicio = 0 if desde is None else int(np.searchsorted(tiempos, a_segundos(desde), side='left'))
+        fin = len(tiempos) if hasta is None else int(np.searchsorted(tiempos, a_segundos(hasta), side='left'))
+        return slice(inicio, max(inicio, fin))
+
+    def dia(self, fecha):
+        """Slice de los registros del día de `fecha` (tabla de días del resumen)"""
+        return self.resumen_lluvia().rango_dia(fecha)
+
+    def resumen_lluvia(self):
+        """Índice por día con la lluvia diaria y horaria; se recalcula solo si cambiaron las lecturas"""
+        if self._resumen is None:
+            self._resumen = ResumenLluvia(self.tiempos(), self.valores('precipitacion_mm'))
+        return self._resumen
+
+    def registro(self, i):
+        """Registro i como diccionario (fecha datetime, None en los valores faltantes)"""
+        registro = {'fecha': pd.Timestamp(self.fechas()[i]).to_pydatetime()}
+        for columna, datos in self.numericas.items():
+            valor = datos.valores[i]
+            # Decimal más corto que representa el float32 (12.56 y no 12.5600004196167)
+            registro[columna] = None if np.isnan(valor) else float(str(valor))
+        for columna in self.codigos:
+            codigo = int(self.codigos[columna].valores[i])
+            registro[columna] = None if codigo == SIN_CATEGORIA else self.categorias[columna][codigo]
+        return registro
+
+    def ultimo(self):
+        return self.registro(len(self) - 1) if len(self) else None
+
+    def a_dataframe(self, seleccion=slice(None)):
+        """DataFrame con las columnas de la aplicación (fecha datetime64, categóricas como Categorical)"""
+        datos = {'fecha': self.fechas(seleccion)}
+        for columna in COLUMNAS_DATOS[1:]:
+            if columna in self.numericas:
+                datos[columna] = self.numericas[columna].valores[seleccion]
+            else:
+                datos[columna] = pd.Categorical.from_codes(self.codigos[columna].valores[seleccion],
+                                                           self.categorias[columna])
+        return pd.DataFrame(datos)
+
+    # --- Caché (pickle) ---
+
+    def __getstate__(self):
+        return {
+            'tiempo': self.tiempo.valores.copy(),
+            'numericas': {columna: datos.valores.copy() for columna, datos in self.numericas.items()},
+            'codigos': {columna: datos.valores.copy() for columna, datos in self.codigos.items()},
+            'categorias': self.categorias,
+            'descartados': self.descartados
+        }
+
+    def __setstate__(self, estado):
+        self.limpiar()
+        self.tiempo.agregar(estado['tiempo'])
+        for columna, valores in estado['numericas'].items():
+            self.numericas[columna].agregar(valores)
+        for columna, valores in estado['codigos'].items():
+            self.codigos[columna].agregar(valores)
+        self.categorias = estado['categorias']
+        self._posicion_categoria = {columna: {texto: i for i, texto in enumerate(textos)}
+                                    for columna, textos in self.categorias.items()}
+        self.descartados = estado['descartados']
+
+
+class ResumenLluvia:
+    """Tabla de días de unas lecturas ordenadas, con la lluvia acumulada de cada día (la mayor lectura)
+    y la caída en cada hora (aumento de la lectura acumulada respecto a la hora anterior)"""
+
+    def __init__(self, tiempos, lluvia):
+        self._lluvia = lluvia
+        self._detalles = {}
+        self.registros = len(tiempos)
+        dias = tiempos // SEGUNDOS_DIA
+        self.inicios = np.flatnonzero(np.diff(dias, prepend=dias[:1] - 1)) if len(dias) else np.empty(0, dtype=np.intp)
+        self.fines = np.append(self.inicios[1:], self.registros)
+        self.dias = dias[self.inicios]
+        num_dias = len(self.dias)
+
+        # Mayor lectura de cada día y de cada hora (-inf mientras no haya lecturas)
+        con_valor = np.where(np.isnan(lluvia), -np.inf, lluvia.astype(np.float64))
+        self.acumulada = np.full(num_dias, np.nan)
+        maximo_hora = np.full((num_dias, 24), np.nan)
+        if num_dias:
+            self.acumulada = np.maximum.reduceat(con_valor, self.inicios)
+            posicion_dia = np.repeat(np.arange(num_dias), self.fines - self.inicios)
+            celda = posicion_dia * 24 + (tiempos - dias * SEGUNDOS_DIA) // 3600
+            inicios_hora = np.flatnonzero(np.diff(celda, prepend=celda[:1] - 1))
+            maximo_hora.flat[celda[inicios_hora]] = np.maximum.reduceat(con_valor, inicios_hora)
+        self.acumulada[np.isinf(self.acumulada)] = np.nan
+        maximo_hora[np.isinf(maximo_hora)] = np.nan
+
+        # Lluvia de cada hora: lo que sube la lectura acumulada (las horas sin lecturas no suman)
+        acumulado = np.fmax.accumulate(maximo_hora, axis=1)
+        anterior = np.nan_to_num(np.concatenate([np.zeros((num_dias, 1)), acumulado[:, :-1]], axis=1))
+        self.lluvia_hora = np.clip(np.nan_to_num(acumulado - anterior), 0, None)
+
+    def __len__(self):
+        return len(self.dias)
+
+    def posicion(self, fecha):
+        """Posición del día de `fecha` en la tabla, o None si no tiene registros"""
+        dia = a_segundos(pd.Timestamp(fecha).normalize()) // SEGUNDOS_DIA
+        k = int(np.searchsorted(self.dias, dia))
+        return k if k < len(self.dias) and self.dias[k] == dia else None
+
+    def rango_dia(self, fecha):
+        """Slice de los registros del día (vacío si no hay)"""
+        k = self.posicion(fecha)
+        if k is None:
+            dia = a_segundos(pd.Timestamp(fecha).normalize()) // SEGUNDOS_DIA
+            j = int(np.searchsorted(self.dias, dia))
+            inicio = int(self.inicios[j]) if j < len(self.dias) else self.registros
+            return slice(inicio, inicio)
+        return slice(int(self.inicios[k]), int(self.fines[k]))
+
+    def detalle(self, fecha):
+        """Resumen de un día: registros, lectura máxima (posición dentro del día y valor) y lluvia por
+        hora. Si ninguna lectura supera 0 se toma la última. None si el día no tiene registros."""
+        k = self.posicion(fecha)
+        if k is None:
+            return None
+        if k not in self._detalles:
+            seleccion = slice(int(self.inicios[k]), int(self.fines[k]))
+            lluvia = self._lluvia[seleccion]
+            if self.acumulada[k] > 0:
+                indice = int(np.nanargmax(lluvia))
+            else:
+                indice = len(lluvia) - 1
+            maximo = 0.0 if np.isnan(lluvia[indice]) else float(str(lluvia[indice]))
+            self._detalles[k] = {
+                'seleccion': seleccion,
+                'registros': seleccion.stop - seleccion.start,
+                'indice_maximo': indice,
+                'precipitacion_mm': maximo,
+                'lluvia_hora': self.lluvia_hora[k]
+            }
+        return self._detalles[k]
+
+    def volumen(self, fecha, area):
+        """Litros recogidos el día de `fecha` por un área de captación en m² (1 mm = 1 L/m²)"""
+        detalle = self.detalle(fecha)
+        return 0.0 if detalle is None else detalle['precipitacion_mm'] * area
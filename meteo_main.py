@@ -23,51 +23,36 @@ from estacion_meteorologica import EstacionMeteoApp  # Importar la clase princip
 import tkinter as tk
 #Integrar ventana de proceso de procesar Datos
 from ProcesarDatosGUI import EstacionMeteorologicaGUI
+import puente_temporal
+import historico_incremental
+import almacen_columnar
+from pronostico_compacto import como_dataframe, tabla_exportacion
 # Integrar Dataset de 7 años
 
-def integrar_datasets(ruta_historico, ruta_estacion_propia, ruta_salida):
-    """Integra el dataset histórico con los datos de la estación meteorológica local"""
-    # Cargar datasets
-    df_historico = pd.read_csv(ruta_historico)
-    df_estacion = pd.read_csv(ruta_estacion_propia)
+def integrar_datasets(ruta_historico, ruta_estacion_propia, ruta_salida, incremental=False):
+    """Integra el dataset histórico con los datos de la estación meteorológica local.
+    Con incremental=True, si ya existe el histórico particionado de ruta_salida y ruta_historico no
+    cambió desde que se creó, solo se integran los datos de la estación sobre él (ver
+    historico_incremental). En ambos casos se devuelve el dataset integrado completo."""
+    if incremental:
+        historico = historico_incremental.HistoricoParticionado(ruta_salida)
+        firma_historico = historico_incremental.firma_archivo(ruta_historico)
+        if historico.disponible(origen=firma_historico):
+            df_estacion = historico_incremental.cargar_para_integracion(
+                ruta_estacion_propia, "estación", convertir_radiacion=True)
+            df_reescrito = historico.integrar(df_estacion)
+            print(f"Dataset actualizado: {len(df_reescrito)} registros reescritos")
+            df_combinado = historico.cargar()
+            print(f"Dataset combinado: {len(df_combinado)} registros")
+            print(f"Rango de fechas: {df_combinado.index.min()} hasta {df_combinado.index.max()}")
+            return df_combinado
+        print("No hay histórico particionado válido: se realiza la integración completa")
     
-    # Convertir fechas a datetime
-    df_historico['fecha'] = pd.to_datetime(df_historico['fecha'])
-    df_estacion['fecha'] = pd.to_datetime(df_estacion['fecha'])
-    
-    # Convertir radiacion_solar_wm2 a radiacion_solar_J_m2 si existe
-    if 'radiacion_solar_wm2' in df_estacion.columns and 'radiacion_solar_J_m2' not in df_estacion.columns:
-        print("Convirtiendo unidades de radiación solar de W/m² a J/m²...")
-        # Para datos horarios, multiplicamos por 3600 segundos
-        periodo_segundos = 3600
-        df_estacion['radiacion_solar_J_m2'] = df_estacion['radiacion_solar_wm2'] * periodo_segundos
-        # Eliminar la columna original
-        df_estacion = df_estacion.drop('radiacion_solar_wm2', axis=1)
-    
-    # Asegurar que ambos datasets tengan las mismas columnas
-    columnas_comunes = ['fecha', 'temperatura_C', 'humedad_relativa', 
-                       'precipitacion_mm', 'cobertura_nubes_octas', 
-                       'velocidad_viento_kmh', 'radiacion_solar_J_m2']
-    
-    # Verificar que todas las columnas existan
-    for df, nombre in [(df_historico, "histórico"), (df_estacion, "estación")]:
-        for col in columnas_comunes:
-            if col != 'fecha' and col not in df.columns:
-                print(f"Advertencia: La columna '{col}' no existe en el dataset {nombre}. Creando columna con valores NaN.")
-                df[col] = float('nan')
-    
-    df_historico = df_historico[columnas_comunes]
-    df_estacion = df_estacion[columnas_comunes]
-    
-    # Convertir a valores numéricos
-    for col in columnas_comunes[1:]:
-        df_historico[col] = pd.to_numeric(df_historico[col], errors='coerce')
-        df_estacion = df_estacion.copy()  # Hacer una copia explícita
-        df_estacion.loc[:, col] = pd.to_numeric(df_estacion[col], errors='coerce')
-    
-    # Establecer fechas como índice
-    df_historico.set_index('fecha', inplace=True)
-    df_estacion.set_index('fecha', inplace=True)
+    # Cargar datasets con las columnas comunes, valores numéricos y la fecha como índice
+    columnas_comunes = historico_incremental.COLUMNAS_INTEGRACION
+    df_historico = historico_incremental.cargar_para_integracion(ruta_historico, "histórico")
+    df_estacion = historico_incremental.cargar_para_integracion(
+        ruta_estacion_propia, "estación", convertir_radiacion=True)
     
     # PUNTO CLAVE: Verificar el hueco temporal entre datasets
     print(f"Fecha final del histórico: {df_historico.index.max()}")
@@ -80,138 +65,10 @@ def integrar_datasets(ruta_historico, ruta_estacion_propia, ruta_salida):
         print(f"ADVERTENCIA: Existe un hueco temporal de {diferencia_dias} días entre datasets")
         print("Creando puente temporal mejorado para mantener la continuidad...")
         
-        fecha_inicio = df_historico.index.max() + pd.Timedelta(days=1)
-        fecha_fin = df_estacion.index.min() - pd.Timedelta(days=1)
+        # Puente cada 6 horas con transición sigmoide, factores estacionales y perfiles horarios
+        df_puente = puente_temporal.puente_entre(df_historico, df_estacion, columnas_comunes[1:])
         
-        # Crear fechas intermedias con mayor frecuencia (cada 6 horas en lugar de 15 días)
-        fechas_puente = pd.date_range(
-            start=fecha_inicio,
-            end=fecha_fin,
-            freq='6H'  # Frecuencia aumentada para mayor granularidad
-        )
-        
-        if len(fechas_puente) > 0:
-            # Crear dataframe puente con valores interpolados
-            df_puente = pd.DataFrame(index=fechas_puente)
-            
-            # Definir factores estacionales por mes para ajustar las interpolaciones
-            factores_estacionales = {
-                # Mes: [factor_temperatura, factor_precipitacion, factor_humedad, factor_nubosidad]
-                1: [-0.8, 0.2, 0.5, 0.3],   # Enero
-                2: [-0.5, 0.3, 0.4, 0.3],   # Febrero
-                3: [0.0, 0.8, 0.6, 0.5],    # Marzo
-                4: [0.2, 1.2, 0.8, 0.7],    # Abril
-                5: [0.3, 1.0, 0.7, 0.6],    # Mayo
-                6: [0.2, 0.4, 0.5, 0.4],    # Junio
-                7: [0.1, 0.3, 0.4, 0.3],    # Julio
-                8: [0.0, 0.3, 0.5, 0.4],    # Agosto
-                9: [0.1, 0.7, 0.6, 0.5],    # Septiembre
-                10: [0.0, 1.3, 0.8, 0.7],   # Octubre
-                11: [-0.2, 1.1, 0.9, 0.8],  # Noviembre
-                12: [-0.5, 0.5, 0.6, 0.5]   # Diciembre
-            }
-            
-            # Patrones horarios para variables como temperatura y radiación
-            patrones_horarios = {
-                'temperatura_C': {  # Ajuste horario para temperatura (en °C)
-                    0: -1.5, 1: -2.0, 2: -2.5, 3: -3.0, 4: -3.0, 5: -2.5,  # Madrugada
-                    6: -2.0, 7: -1.0, 8: 0.0, 9: 1.0, 10: 2.0, 11: 3.0,    # Mañana
-                    12: 3.5, 13: 4.0, 14: 4.0, 15: 3.5, 16: 2.5, 17: 1.5,  # Tarde
-                    18: 0.5, 19: 0.0, 20: -0.5, 21: -1.0, 22: -1.2, 23: -1.3  # Noche
-                },
-                'radiacion_solar_J_m2': {  # Factor multiplicativo para radiación
-                    0: 0.0, 1: 0.0, 2: 0.0, 3: 0.0, 4: 0.0, 5: 0.1,        # Madrugada
-                    6: 0.2, 7: 0.4, 8: 0.6, 9: 0.8, 10: 0.9, 11: 1.0,      # Mañana
-                    12: 1.0, 13: 0.95, 14: 0.9, 15: 0.8, 16: 0.6, 17: 0.4, # Tarde
-                    18: 0.2, 19: 0.1, 20: 0.0, 21: 0.0, 22: 0.0, 23: 0.0   # Noche
-                }
-            }
-            
-            # Calcular valores de referencia
-            for col in columnas_comunes[1:]:
-                # Obtener valores de referencia
-                ultimos_datos_hist = df_historico[col].iloc[-48:]  # Últimas 48 horas del histórico
-                primeros_datos_est = df_estacion[col].iloc[:48]   # Primeras 48 horas de la estación
-                
-                valor_inicial = ultimos_datos_hist.mean()  # Promedio en lugar del último valor
-                valor_final = primeros_datos_est.mean()    # Promedio en lugar del primer valor
-                
-                # Variables para guardar valores interpolados
-                valores_interpolados = []
-                
-                # Generar datos interpolados para cada fecha del puente
-                for idx, fecha in enumerate(fechas_puente):
-                    # Cálculo de progreso (de 0 a 1) a lo largo del período del puente
-                    progreso = idx / (len(fechas_puente) - 1) if len(fechas_puente) > 1 else 0.5
-                    
-                    # Interpolación base con curva suavizada (función sigmoide en lugar de lineal)
-                    # Esto hace que la transición sea más suave al inicio y al final
-                    factor_sigmoid = 1 / (1 + np.exp(-10 * (progreso - 0.5)))
-                    valor_base = valor_inicial + (valor_final - valor_inicial) * factor_sigmoid
-                    
-                    # Ajuste estacional según mes
-                    mes = fecha.month
-                    factores = factores_estacionales[mes]
-                    
-                    # Aplicar ajustes específicos por variable
-                    if col == 'temperatura_C':
-                        # Ajuste por hora del día
-                        ajuste_hora = patrones_horarios['temperatura_C'].get(fecha.hour, 0)
-                        # Ajuste estacional
-                        ajuste_estacional = factores[0]
-                        valor_ajustado = valor_base + ajuste_hora + ajuste_estacional
-                        
-                    elif col == 'precipitacion_mm':
-                        # Ajuste estacional para precipitación
-                        factor_precip = factores[1]
-                        # Añadir variabilidad para precipitación (más realista)
-                        variabilidad = np.random.exponential(0.5) if np.random.random() < 0.2 else 0
-                        valor_ajustado = valor_base * factor_precip + variabilidad
-                        valor_ajustado = max(0, valor_ajustado)  # Precipitación no puede ser negativa
-                        
-                    elif col == 'humedad_relativa':
-                        # Ajuste estacional para humedad
-                        factor_humedad = factores[2]
-                        # Correlación inversa con temperatura
-                        hora = fecha.hour
-                        es_dia = 8 <= hora <= 17
-                        ajuste_hora = -5 if es_dia else 5  # Menor humedad durante el día
-                        valor_ajustado = valor_base * factor_humedad + ajuste_hora
-                        valor_ajustado = min(max(valor_ajustado, 30), 100)  # Rango válido: 30-100%
-                        
-                    elif col == 'cobertura_nubes_octas':
-                        # Ajuste estacional para nubosidad
-                        factor_nubes = factores[3]
-                        valor_ajustado = valor_base * factor_nubes
-                        valor_ajustado = min(max(valor_ajustado, 0), 8)  # Rango válido: 0-8 octas
-                        
-                    elif col == 'radiacion_solar_J_m2':
-                        # Radiación depende fuertemente de la hora
-                        factor_hora = patrones_horarios['radiacion_solar_J_m2'].get(fecha.hour, 0)
-                        # Valor típico de radiación para ese mes/hora
-                        radiacion_tipica = 0 if factor_hora == 0 else 900000 * factor_hora
-                        # Ajustar por nubosidad (correlación inversa)
-                        nubosidad_estimada = 4  # Valor promedio si no tenemos dato real
-                        factor_nubosidad = max(0, 1 - (nubosidad_estimada / 10))
-                        valor_ajustado = radiacion_tipica * factor_nubosidad
-                        
-                    elif col == 'velocidad_viento_kmh':
-                        # Velocidad del viento con patrón diurno
-                        hora = fecha.hour
-                        factor_hora = 1.2 if 10 <= hora <= 16 else 0.8  # Mayor velocidad en horas de sol
-                        variabilidad = np.random.normal(0, 0.5)
-                        valor_ajustado = valor_base * factor_hora + variabilidad
-                        valor_ajustado = max(0, valor_ajustado)  # No puede ser negativa
-                        
-                    else:
-                        # Para otras variables, usar interpolación simple
-                        valor_ajustado = valor_base
-                    
-                    valores_interpolados.append(valor_ajustado)
-                
-                # Asignar los valores interpolados
-                df_puente[col] = valores_interpolados
-            
+        if len(df_puente) > 0:
             print(f"Puente temporal mejorado creado con {len(df_puente)} puntos de datos")
             
             # Combinar los tres datasets
@@ -223,36 +80,19 @@ def integrar_datasets(ruta_historico, ruta_estacion_propia, ruta_salida):
         # Si no hay un hueco grande, combinar normalmente
         df_combinado = pd.concat([df_historico, df_estacion])
     
-    # Si hay solapamiento de fechas, priorizar datos de la estación propia
-    df_combinado = df_combinado[~df_combinado.index.duplicated(keep='last')]
-    
-    # Ordenar por fecha
-    df_combinado = df_combinado.sort_index()
-    
-    # Rellenar valores nulos con métodos más avanzados
-    for col in columnas_comunes[1:]:
-        if df_combinado[col].isnull().any():
-            # Usar interpolación específica para cada variable
-            if col in ['temperatura_C', 'humedad_relativa']:
-                # Para temp y humedad, usar interpolación tiempo con límites
-                df_combinado[col] = df_combinado[col].interpolate(method='time', limit_direction='both')
-            elif col == 'precipitacion_mm':
-                # Para precipitación, usar ffill pero con límite (la lluvia no dura para siempre)
-                df_combinado[col] = df_combinado[col].fillna(0)  # Asumir 0 precipitación por defecto
-            else:
-                # Para otras variables, interpolación linear simple
-                df_combinado[col] = df_combinado[col].interpolate(method='linear', limit_direction='both')
+    # Si hay solapamiento de fechas, priorizar datos de la estación propia; ordenar por fecha
+    df_crudo = historico_incremental.combinar_con_prioridad(df_combinado)
     
-    # MODIFICACIÓN CLAVE: Guardar dataset combinado preservando la columna fecha
-    # Primero resetear el índice para convertirlo en columna
-    df_output = df_combinado.reset_index()
+    # Rellenar valores nulos con el método de cada variable
+    df_combinado = historico_incremental.rellenar_integracion(df_crudo)
     
-    # Asegurarse de que la columna se llame 'fecha'
-    if 'index' in df_output.columns and 'fecha' not in df_output.columns:
-        df_output = df_output.rename(columns={'index': 'fecha'})
-        
-    # Guardar el dataset con la columna fecha explícita
-    df_output.to_csv(ruta_salida, index=False)
+    if incremental:
+        # Guardar también las particiones mensuales para las próximas integraciones
+        historico.reconstruir(df_crudo, df_combinado, origen=firma_historico)
+    else:
+        # MODIFICACIÓN CLAVE: Guardar dataset combinado preservando la columna fecha
+        df_output = df_combinado.reset_index()
+        df_output.to_csv(ruta_salida, index=False)
     
     # Información detallada del dataset combinado
     fechas_unicas = pd.Series(df_combinado.index.date).unique()
@@ -1509,8 +1349,7 @@ class VentanaPronosticoDetallado(tk.Toplevel):
                 return
             
             # Convertir a DataFrame
-            df_pred = pd.DataFrame(predicciones)
-            df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+            df_pred = como_dataframe(predicciones)
             
             # Definir periodos
             periodos = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
@@ -2878,7 +2717,7 @@ class MicroClimaGUI:
                     self.ventana_progreso.update_progress(10, "Preparando datos de estación...")
                     
                     # Cargar datos de estación
-                    df_estacion = pd.read_csv(ruta_estacion)
+                    df_estacion = almacen_columnar.cargar_tabla(ruta_estacion, dtype_flotante=np.float64)
                     
                     # Verificar el formato de la fecha
                     if 'fecha_hora' in df_estacion.columns:
@@ -2954,17 +2793,8 @@ class MicroClimaGUI:
                     # Calcular categoría climática usando el método del predictor
                     self.ventana_progreso.update_progress(25, "Calculando categorías climáticas...")
                     
-                    # Crear lista para almacenar las categorías
-                    categorias = []
-                    
-                    # Calcular categoría para cada fila
-                    for idx, row in df_procesado.iterrows():
-                        # Usar el método de categorización del predictor
-                        categoria = self.predictor.categorizar_clima(row)
-                        categorias.append(categoria)
-                    
-                    # Añadir categorías calculadas al dataframe
-                    df_procesado['categoria_clima'] = categorias
+                    # Calcular categorías de todas las filas con el método vectorizado del predictor
+                    df_procesado['categoria_clima'] = self.predictor.categorizar_clima_vectorizado(df_procesado)
                     
                     # Añadir columna que indica datos verificados
                     df_procesado['verificado'] = True
@@ -3554,21 +3384,8 @@ class MicroClimaGUI:
                         # Obtener las últimas predicciones
                         predicciones = self.predictor.predecir_proximo_periodo(self.dataset)
                         
-                        # Crear DataFrame con las predicciones
-                        data = []
-                        for pred in predicciones:
-                            data.append({
-                                'Fecha': pred['fecha'],
-                                'Hora': pred['hora'],
-                                'Categoría': pred['categoria'],
-                                'Temperatura': f"{pred['temperatura']:.1f}°C",
-                                'Confianza': f"{pred['confianza']*100:.1f}%",
-                                'Descripción': pred['detalles']['descripcion'],
-                                'Recomendaciones': ', '.join(pred['detalles']['recomendaciones'])
-                            })
-                        
                         # Crear y guardar DataFrame
-                        df = pd.DataFrame(data)
+                        df = tabla_exportacion(predicciones)
                         df.to_csv(filename, index=False, encoding='utf-8')
                         
                         self.root.after(0, lambda: messagebox.showinfo(
@@ -3886,8 +3703,8 @@ class MicroClimaGUI:
 
             # Variables para controlar el progreso por fases
             self.fase_actual = 1
-            self.total_fases = 2
-            self.max_epochs_por_fase = {1: 25, 2: epochs}
+            self.total_fases = 3 if use_ensemble else 2
+            self.max_epochs_por_fase = {1: 25, 2: epochs, 3: min(epochs, 50)}
 
             # Callback para manejar fases
             def progress_callback(epoch, max_epochs, fase=None, total_fases=None):
@@ -3962,7 +3779,8 @@ class MicroClimaGUI:
                         epochs=epochs,
                         batch_size=batch_size,
                         callback=progress_callback,
-                        learning_rate=learning_rate  # Añadir learning rate
+                        learning_rate=learning_rate,  # Añadir learning rate
+                        ensemble=use_ensemble  # Fase 3: entrenar también el ensemble
                     )
                     
                     handle_success(history)
@@ -4282,7 +4100,7 @@ class MicroClimaGUI:
                 return
             
             # Verificar si hay datos cargados
-            if not hasattr(self.station_app, 'data') or not self.station_app.data['fecha']:
+            if not hasattr(self.station_app, 'lecturas') or not len(self.station_app.lecturas):
                 messagebox.showinfo("Información", "No hay datos cargados en la Estación Meteorológica")
                 return
             
@@ -4295,26 +4113,14 @@ class MicroClimaGUI:
                     # Convertir datos de la estación a formato compatible con el predictor
                     self.ventana_progreso.update_progress(30, "Procesando formato de datos...")
                     
-                    # Crear DataFrame a partir de los datos de la estación
-                    import pandas as pd
-                    from datetime import datetime
-                    
-                    data_dict = {}
-                    for key in self.station_app.data:
-                        if len(self.station_app.data[key]) > 0:
-                            data_dict[key] = self.station_app.data[key]
+                    # Crear DataFrame a partir de las lecturas de la estación (fechas ya interpretadas),
+                    # sin las columnas que no tienen ningún valor
+                    df_estacion = self.station_app.lecturas.a_dataframe().dropna(axis=1, how='all')
                     
                     # Verificar si hay datos suficientes
-                    if not data_dict or 'fecha' not in data_dict:
+                    if df_estacion.empty or 'fecha' not in df_estacion:
                         raise ValueError("No hay datos suficientes en la estación para importar")
                     
-                    # Crear DataFrame
-                    df_estacion = pd.DataFrame(data_dict)
-                    
-                    # Convertir fechas a datetime si son strings
-                    if isinstance(df_estacion['fecha'][0], str):
-                        df_estacion['fecha'] = pd.to_datetime(df_estacion['fecha'])
-                    
                     # Establecer fecha como índice
                     df_estacion.set_index('fecha', inplace=True)
                     
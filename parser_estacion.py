@@ -0,0 +1,231 @@
+import codecs
+import csv
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+# Parser incremental de los volcados CSV de la estación (DATOS, archivos importados, caché).
+# Recibe fragmentos de bytes o de texto a medida que llegan y solo procesa las líneas completas.
+# Los encabezados se resuelven una vez con la primera línea útil: la fila de encabezados si la hay, o
+# los predeterminados de 10 o de 15 columnas según cuántos campos tenga el primer registro. Los
+# registros de cada fragmento se separan con una expresión regular sobre todo el texto y se acumulan
+# hasta reunir un bloque grande (o hasta que se piden las columnas); cada bloque se convierte por
+# columnas con el lector CSV de pandas (celdas no numéricas como NaN), en lugar de separar, limpiar y
+# convertir celda por celda. Cada columna se acumula en un arreglo NumPy tipado que crece por bloques
+# geométricos.
+
+ENCABEZADOS_10 = ["fecha_hora", "temp_dht_cal", "hum_dht_raw", "lluvia_mm",
+                  "cobertura_nubes_octas", "vel_viento_kmh", "direccion_viento",
+                  "radiacion_solar_J_m2", "radiacion_solar_wm2", "condicion_climatica"]
+ENCABEZADOS_15 = ["fecha_hora", "temp_rtc", "temp_dht_raw", "temp_dht_cal",
+                  "hum_dht_raw", "hum_dht_cal", "vel_viento_kmh", "direccion_viento",
+                  "valor_adc_veleta", "lluvia_mm", "lluvia_actual_mm", "radiacion_solar_J_m2",
+                  "radiacion_solar_wm2", "cobertura_nubes_octas", "condicion_climatica"]
+
+# Nombres de la estación -> columnas de la aplicación
+MAPEO_COLUMNAS = {
+    'fecha_hora': 'fecha',
+    'temp_dht_cal': 'temperatura_C',
+    'hum_dht_raw': 'humedad_relativa',
+    'lluvia_mm': 'precipitacion_mm',
+    'cobertura_nubes_octas': 'cobertura_nubes_octas',
+    'vel_viento_kmh': 'velocidad_viento_kmh',
+    'radiacion_solar_J_m2': 'luminosidad_lux',
+    'radiacion_solar_wm2': 'radiacion_solar_wm2',
+    'direccion_viento': 'direccion_viento',
+    'condicion_climatica': 'condicion_climatica'
+}
+COLUMNAS_DATOS = ('fecha', 'temperatura_C', 'humedad_relativa', 'precipitacion_mm', 'cobertura_nubes_octas',
+                  'velocidad_viento_kmh', 'luminosidad_lux', 'radiacion_solar_wm2', 'direccion_viento',
+                  'condicion_climatica')
+COLUMNAS_NUMERICAS = ('temperatura_C', 'humedad_relativa', 'precipitacion_mm', 'velocidad_viento_kmh',
+                      'luminosidad_lux', 'radiacion_solar_wm2', 'cobertura_nubes_octas')
+PALABRAS_AYUDA = ("ayuda", "comando", "logout", "reset")  # Líneas de la consola, no de datos
+PALABRAS_ENCABEZADO = ('fecha', 'temp', 'hum')
+CAPACIDAD_INICIAL = 1024
+TAMANO_BLOQUE = 1 << 20  # Caracteres de registros pendientes que disparan la conversión
+
+# Registro: empieza por una fecha y tiene al menos tres campos
+PATRON_REGISTRO = re.compile(r'^[ \t]*\d{4}[-/][^\n,]*,[^\n,]*,[^\n]*$', re.M)
+
+
+def encabezados_predeterminados(num_columnas):
+    """Encabezados de un CSV sin fila de encabezados: el formato de 10 o el de 15 columnas"""
+    encabezados = list(ENCABEZADOS_15 if num_columnas > len(ENCABEZADOS_10) else ENCABEZADOS_10)[:num_columnas]
+    encabezados += [f"columna_{i + 1}" for i in range(len(encabezados), num_columnas)]
+    return encabezados
+
+
+def indices_columnas(encabezados, mapeo=MAPEO_COLUMNAS):
+    """Posición de cada columna de la aplicación en las filas con estos encabezados"""
+    indices = {}
+    for i, encabezado in enumerate(encabezados):
+        # Para asegurar que lluvia_mm se mapee correctamente
+        if encabezado.lower() == 'lluvia_mm':
+            indices['precipitacion_mm'] = i
+        else:
+            indices[mapeo.get(encabezado, encabezado)] = i
+    return indices
+
+
+def es_encabezado(linea):
+    return not linea[0].isdigit() and any(palabra in linea.lower() for palabra in PALABRAS_ENCABEZADO)
+
+
+class ColumnaCreciente:
+    """Arreglo NumPy que duplica su capacidad cuando se llena"""
+
+    def __init__(self, dtype, capacidad=CAPACIDAD_INICIAL):
+        self._datos = np.empty(capacidad, dtype=dtype)
+        self._tamano = 0
+
+    def __len__(self):
+        return self._tamano
+
+    @property
+    def valores(self):
+        return self._datos[:self._tamano]
+
+    def agregar(self, valores):
+        necesario = self._tamano + len(valores)
+        if necesario > len(self._datos):
+            capacidad = len(self._datos)
+            while capacidad < necesario:
+                capacidad *= 2
+            datos = np.empty(capacidad, dtype=self._datos.dtype)
+            datos[:self._tamano] = self.valores
+            self._datos = datos
+        self._datos[self._tamano:necesario] = valores
+        self._tamano = necesario
+
+
+class ParserEstacion:
+    """Convierte el CSV de la estación, por fragmentos, en columnas NumPy de la aplicación"""
+
+    def __init__(self, mapeo=MAPEO_COLUMNAS, columnas=COLUMNAS_DATOS, codificacion='utf-8'):
+        self.mapeo = mapeo
+        self.columnas_destino = columnas
+        self.encabezados = None
+        self.predeterminados = False  # Encabezados supuestos (el CSV no los traía)
+        self.indices = {}
+        self.columnas = {}
+        self.registros = 0  # Registros válidos recibidos (convertidos o pendientes)
+        self._resto = ''
+        self._pendientes = []
+        self._tamano_pendiente = 0
+        self._decodificador = codecs.getincrementaldecoder(codificacion)(errors='replace')
+
+    def alimentar(self, fragmento):
+        """Procesa las líneas completas del fragmento (bytes o texto); devuelve los registros encontrados"""
+        if not isinstance(fragmento, str):
+            fragmento = self._decodificador.decode(bytes(fragmento))
+        texto = self._resto + fragmento
+        corte = texto.rfind('\n') + 1
+        self._resto = texto[corte:]
+        return self._procesar(texto[:corte])
+
+    def terminar(self):
+        """Procesa la última línea si no terminaba en salto de línea"""
+        texto = self._resto + self._decodificador.decode(b'', final=True)
+        self._resto = ''
+        nuevos = self._procesar(texto + '\n') if texto.strip() else 0
+        self._convertir_pendientes()
+        return nuevos
+
+    def _procesar(self, texto):
+        texto = texto.replace('\r', '')
+        if self.encabezados is None:
+            texto = self._detectar_encabezados(texto)
+        if not texto or not self.indices:
+            return 0
+        registros = PATRON_REGISTRO.findall(texto)
+        if not registros:
+            return 0
+        bloque = '\n'.join(registros)
+        # Verificar si alguna línea contiene ayuda o comandos (no válida para datos)
+        if any(palabra in bloque.lower() for palabra in PALABRAS_AYUDA):
+            registros = [r for r in registros if not any(palabra in r.lower() for palabra in PALABRAS_AYUDA)]
+            if not registros:
+                return 0
+            bloque = '\n'.join(registros)
+        self._pendientes.append(bloque)
+        self._tamano_pendiente += len(bloque)
+        self.registros += len(registros)
+        if self._tamano_pendiente >= TAMANO_BLOQUE:
+            self._convertir_pendientes()
+        return len(registros)
+
+    def _detectar_encabezados(self, texto):
+        """Fija los encabezados con la primera línea útil y devuelve el texto que sigue a los encabezados"""
+        posicion = 0
+        while posicion < len(texto):
+            fin = texto.find('\n', posicion)
+            fin = len(texto) if fin < 0 else fin
+            linea = texto[posicion:fin].strip()
+            if linea:
+                if PATRON_REGISTRO.match(linea):
+                    self.predeterminados = True
+                    self._fijar_encabezados(encabezados_predeterminados(linea.count(',') + 1))
+                    return texto[posicion:]
+                if es_encabezado(linea):
+                    self._fijar_encabezados([h.strip() for h in linea.split(',')])
+                    return texto[fin + 1:]
+            posicion = fin + 1
+        return ''
+
+    def _fijar_encabezados(self, encabezados):
+        self.encabezados = encabezados
+        self.indices = {columna: i for columna, i in indices_columnas(encabezados, self.mapeo).items()
+                        if columna in self.columnas_destino}
+        self.columnas = {columna: ColumnaCreciente(np.float64 if columna in COLUMNAS_NUMERICAS else object)
+                         for columna in self.indices}
+
+    def _convertir_pendientes(self):
+        """Separa y convierte por columnas todos los registros pendientes"""
+        if not self._pendientes:
+            return
+        bloque = '\n'.join(self._pendientes)
+        self._pendientes = []
+        self._tamano_pendiente = 0
+        usadas = sorted(set(self.indices.values()))
+        textos = [i for columna, i in self.indices.items() if columna not in COLUMNAS_NUMERICAS]
+        tabla = pd.read_csv(io.StringIO(bloque), header=None, names=range(usadas[-1] + 1), usecols=usadas,
+                            dtype={i: object for i in textos}, keep_default_na=False, na_values=[''],
+                            quoting=csv.QUOTE_NONE, engine='c')
+        # Solo hace falta limpiar espacios si el bloque los tiene junto a una coma o al final de línea
+        con_espacios = ' ,' in bloque or ', ' in bloque or ' \n' in bloque or bloque.endswith(' ')
+        for columna, indice in self.indices.items():
+            valores = tabla[indice]
+            if columna in COLUMNAS_NUMERICAS:
+                if valores.dtype != np.float64:
+                    valores = pd.to_numeric(valores, errors='coerce')
+                valores = valores.to_numpy(np.float64)
+            else:
+                valores = valores.fillna('')
+                if con_espacios:
+                    valores = valores.str.strip()
+                valores = valores.to_numpy(object)
+            self.columnas[columna].agregar(valores)
+
+    def arreglos(self):
+        """Columnas acumuladas (vistas, sin copiar)"""
+        self._convertir_pendientes()
+        return {columna: datos.valores for columna, datos in self.columnas.items()}
+
+    def a_listas(self):
+        """Columnas como listas con None en los valores faltantes (formato de EstacionMeteoApp.data)"""
+        self._convertir_pendientes()
+        listas = {}
+        for columna in self.columnas_destino:
+            if columna not in self.columnas:
+                listas[columna] = []
+                continue
+            valores = self.columnas[columna].valores
+            if columna in COLUMNAS_NUMERICAS:
+                con_nulos = valores.astype(object)
+                con_nulos[np.isnan(valores)] = None
+                valores = con_nulos
+            listas[columna] = valores.tolist()
+        return listas
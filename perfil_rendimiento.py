@@ -0,0 +1,163 @@
+import json
+import math
+import os
+
+# Perfil de hilos y memoria según la máquina donde corre el sistema.
+# Se detectan los núcleos físicos, la cuota de CPU del cgroup (contenedores) y la RAM disponible,
+# y a partir de ellos se eligen los hilos de TensorFlow y de NumPy/BLAS y los tamaños de chunk
+# de PrediccionMeteo. Cualquier valor puede fijarse en perfil_rendimiento.json (el benchmark
+# `hilos` guarda ahí la mejor combinación medida) o pasarse directamente a obtener_perfil().
+
+ARCHIVO_CONFIGURACION = 'perfil_rendimiento.json'
+FRACCION_MEMORIA = 0.75  # Parte de la memoria disponible que se permite usar
+CLAVES_PERFIL = ('hilos_intra_op', 'hilos_inter_op', 'hilos_blas', 'memoria_max_gb',
+                 'chunk_size', 'chunk_entrenamiento')
+
+_perfil = None
+
+
+def _leer_archivo(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cuota_cpu_cgroup():
+    """Número de CPUs que permite la cuota del cgroup (v2 o v1), o None si no hay límite"""
+    contenido = _leer_archivo('/sys/fs/cgroup/cpu.max')  # cgroup v2: "<cuota> <periodo>" o "max <periodo>"
+    if contenido:
+        cuota, _, periodo = contenido.partition(' ')
+        if cuota != 'max' and periodo:
+            return int(cuota) / int(periodo)
+        return None
+    cuota = _leer_archivo('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')  # cgroup v1
+    periodo = _leer_archivo('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if cuota and periodo and int(cuota) > 0:
+        return int(cuota) / int(periodo)
+    return None
+
+
+def limite_memoria_cgroup():
+    """Límite de memoria del cgroup en bytes, o None si no hay límite"""
+    for ruta in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        contenido = _leer_archivo(ruta)
+        if contenido and contenido != 'max':
+            limite = int(contenido)
+            # cgroup v1 usa un valor enorme para indicar "sin límite"
+            return limite if limite < 1 << 60 else None
+    return None
+
+
+def detectar_recursos():
+    """Núcleos y memoria realmente utilizables por este proceso"""
+    import psutil
+
+    logicos = psutil.cpu_count() or os.cpu_count() or 1
+    fisicos = psutil.cpu_count(logical=False) or logicos
+    try:
+        afinidad = len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows/macOS
+        afinidad = logicos
+    cuota = cuota_cpu_cgroup()
+
+    cpus = min(logicos, afinidad)
+    if cuota is not None:
+        cpus = min(cpus, max(1, math.ceil(cuota)))
+    # Sin hyperthreading útil para TensorFlow: como mucho un hilo por núcleo físico
+    nucleos = max(1, min(fisicos, cpus))
+
+    memoria = psutil.virtual_memory().available
+    limite = limite_memoria_cgroup()
+    if limite is not None:
+        memoria = min(memoria, limite)
+
+    return {
+        'nucleos_fisicos': fisicos,
+        'nucleos_logicos': logicos,
+        'afinidad': afinidad,
+        'cuota_cgroup': cuota,
+        'nucleos_utilizables': nucleos,
+        'memoria_disponible_gb': round(memoria / 1024 ** 3, 2)
+    }
+
+
+def perfil_automatico(recursos):
+    """Configuración recomendada para los recursos detectados"""
+    nucleos = recursos['nucleos_utilizables']
+    memoria_max = max(0.5, round(recursos['memoria_disponible_gb'] * FRACCION_MEMORIA, 1))
+    return {
+        'hilos_intra_op': nucleos,
+        # Un segundo hilo entre operaciones solapa la entrada de datos con el cálculo
+        'hilos_inter_op': 2 if nucleos >= 4 else 1,
+        'hilos_blas': nucleos,
+        'memoria_max_gb': memoria_max,
+        # Registros por chunk al leer y categorizar CSV, y por tramo de entrenamiento
+        'chunk_size': int(min(10000, max(500, 250 * memoria_max))),
+        'chunk_entrenamiento': int(min(20000, max(2000, 1000 * memoria_max)))
+    }
+
+
+def cargar_configuracion(ruta=ARCHIVO_CONFIGURACION):
+    """Valores fijados a mano o por el benchmark; {} si no existe el archivo"""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            configuracion = json.load(f)
+        return {clave: valor for clave, valor in configuracion.items() if clave in CLAVES_PERFIL}
+    except Exception as e:
+        print(f"Advertencia: no se pudo leer {ruta}: {e}")
+        return {}
+
+
+def guardar_configuracion(valores, ruta=ARCHIVO_CONFIGURACION):
+    """Guarda (fusionando con lo existente) los valores que deben sustituir a los automáticos"""
+    configuracion = cargar_configuracion(ruta)
+    configuracion.update({clave: valor for clave, valor in valores.items() if clave in CLAVES_PERFIL})
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(configuracion, f, indent=2)
+    return configuracion
+
+
+def obtener_perfil(**ajustes):
+    """Perfil de la máquina: automático < perfil_rendimiento.json < ajustes explícitos.
+    Sin ajustes se calcula una sola vez por proceso."""
+    global _perfil
+    ajustes = {clave: valor for clave, valor in ajustes.items() if valor is not None}
+    if _perfil is not None and not ajustes:
+        return dict(_perfil)
+
+    recursos = detectar_recursos()
+    perfil = perfil_automatico(recursos)
+    configuracion = cargar_configuracion()
+    perfil.update(configuracion)
+    perfil.update(ajustes)
+    perfil['origen'] = 'ajustes' if ajustes else ('configuracion' if configuracion else 'automatico')
+    perfil['recursos'] = recursos
+
+    if not ajustes:
+        _perfil = perfil
+    return dict(perfil)
+
+
+def limitar_hilos_blas(hilos):
+    """Limita los hilos de NumPy/BLAS (OpenMP, OpenBLAS, MKL) de este proceso"""
+    for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ.setdefault(variable, str(hilos))
+    # Las variables de entorno solo afectan a bibliotecas aún no cargadas
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(hilos)
+    except ImportError:
+        pass
+
+
+def resumen_perfil(perfil):
+    """Línea legible del perfil para los registros de ejecución"""
+    recursos = perfil.get('recursos', {})
+    return (f"{perfil['hilos_intra_op']} hilos intra-op, {perfil['hilos_inter_op']} inter-op, "
+            f"{perfil['hilos_blas']} BLAS, {perfil['memoria_max_gb']} GB, chunks de {perfil['chunk_size']} "
+            f"({perfil['origen']}; {recursos.get('nucleos_utilizables')} núcleos utilizables de "
+            f"{recursos.get('nucleos_logicos')}, {recursos.get('memoria_disponible_gb')} GB disponibles)")
@@ -0,0 +1,264 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from proyeccion_temperatura import generador_local
+
+# Post-procesamiento físico del pronóstico de 72 horas sobre columnas NumPy.
+# Las reglas de asegurar_consistencia_fisica y forzar_temperaturas_realistas se aplican a arreglos
+# de fechas, horas, temperaturas y códigos de categoría (con su tabla de textos), en lugar de volver
+# a interpretar la fecha de cada diccionario en cada etapa. Los factores "aleatorios" por día salen de
+# un generador con la fecha como semilla, igual que antes, pero sin tocar el estado global de np.random.
+# round(x, 1) no redondeaba igual en todos los valores: sobre un np.float64 equivale a np.round y sobre
+# un float de Python (p. ej. el límite al que se recorta una temperatura) redondea el valor decimal
+# exacto, así que 12.35 daba 12.4 o 12.3 según el tipo. Para obtener los mismos resultados se sigue qué
+# valores habrían sido float de Python en los bucles originales y se redondean con round().
+# Las versiones _lote aplican las mismas reglas a bloques (N, H) de N pronósticos: las comparaciones
+# con la hora vecina y los agrupamientos por día nunca cruzan de un pronóstico a otro.
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M'
+
+# Rango esperado por hora del día antes del ajuste diario: (mínimo, máximo)
+RANGO_ESPERADO_HORA = np.array(
+    [(11.5, 14.0)] * 6 +   # Madrugada (basado en promedio de 12.9°C)
+    [(13.0, 16.0)] * 3 +   # Amanecer/Mañana temprana
+    [(15.0, 18.0)] * 3 +   # Media mañana (basado en promedio de 16.8°C)
+    [(16.0, 18.5)] * 3 +   # Mediodía/Tarde temprana (basado en promedio de 17.1°C)
+    [(15.0, 17.5)] * 3 +   # Tarde
+    [(14.0, 16.0)] * 3 +   # Primeras horas de la noche (basado en promedio de 14.3°C)
+    [(12.0, 15.0)] * 3     # Noche avanzada
+)
+
+# Rangos históricos por periodo del día para forzar_temperaturas_realistas
+RANGO_REALISTA_HORA = np.array(
+    [(11.9, 13.9)] * 6 +   # Madrugada, centrado en 12.9°C
+    [(15.8, 17.8)] * 6 +   # Mañana, centrado en 16.8°C
+    [(16.1, 18.1)] * 6 +   # Tarde, centrado en 17.1°C
+    [(13.3, 15.3)] * 6     # Noche, centrado en 14.3°C
+)
+
+UMBRAL_PICO = 2.0  # Diferencia con ambas horas vecinas para considerar un cambio brusco
+
+
+class CategoriasCodificadas:
+    """Categorías como códigos enteros sobre una tabla de textos; las reglas se evalúan por texto distinto"""
+
+    def __init__(self, categorias):
+        tabla, self.codigos = np.unique(np.asarray(categorias, dtype=object).astype(str), return_inverse=True)
+        self.tabla = list(tabla)
+
+    @classmethod
+    def desde_codigos(cls, codigos, tabla):
+        """Categorías ya codificadas (p. ej. índices de label_encoder.classes_); los códigos se aplanan"""
+        cats = cls.__new__(cls)
+        cats.codigos = np.array(codigos, dtype=np.intp).ravel()
+        cats.tabla = [str(c) for c in tabla]
+        return cats
+
+    def contiene(self, texto):
+        return np.array([texto in categoria for categoria in self.tabla], dtype=bool)[self.codigos]
+
+    def codigo(self, categoria):
+        if categoria not in self.tabla:
+            self.tabla.append(categoria)
+        return self.tabla.index(categoria)
+
+    def transformar(self, mascara, funcion, codigos_origen=None):
+        """Aplica funcion(texto) a las filas de mascara; codigos_origen permite partir de otra columna"""
+        origen = self.codigos if codigos_origen is None else codigos_origen
+        for codigo in np.unique(origen[mascara]):
+            self.codigos[mascara & (origen == codigo)] = self.codigo(funcion(self.tabla[codigo]))
+
+    def textos(self):
+        return [self.tabla[codigo] for codigo in self.codigos]
+
+
+def redondear(valores, flotantes):
+    """round(x, 1) de los bucles originales: np.round para los np.float64 y round() de Python para las
+    posiciones marcadas en flotantes"""
+    resultado = np.round(valores, 1)
+    for i in np.flatnonzero(flotantes):
+        resultado[i] = round(float(valores[i]), 1)
+    return resultado
+
+
+def uniforme_por_dia(dias, bajo, alto):
+    """Valor uniforme en [bajo, alto) por día (AAAAMMDD como semilla), como np.random.seed + uniform"""
+    unicos, inverso = np.unique(dias, return_inverse=True)
+    generador = generador_local()
+    valores = np.empty(len(unicos))
+    for k, dia in enumerate(unicos):
+        generador.seed(int(dia))
+        valores[k] = generador.uniform(bajo, alto)
+    return valores[inverso]
+
+
+def columnas_de_fechas(fechas):
+    """(horas, días AAAAMMDD) de un arreglo de fechas de cualquier forma"""
+    forma = np.shape(fechas)
+    fechas = pd.DatetimeIndex(np.ravel(np.asarray(fechas, dtype='datetime64[ns]')))
+    dias = (fechas.year * 10000 + fechas.month * 100 + fechas.day).to_numpy()
+    return fechas.hour.to_numpy().reshape(forma), dias.reshape(forma)
+
+
+def _sin_alta_radiacion(categoria):
+    return ' + '.join([c for c in categoria.split(' + ') if c != "Alta Radiacion"]) or "Templado"
+
+
+def _suavizar_picos(temperatura, grupos, flotantes):
+    """Cuarta etapa: suaviza máximos/mínimos aislados de más de 2°C dentro del mismo día (grupo).
+    Cada hora se compara con la anterior ya corregida, así que solo se revisan en orden las horas
+    candidatas y las que siguen a una hora corregida."""
+    t = temperatura
+    interiores = np.zeros(len(t), dtype=bool)
+    interiores[1:-1] = (grupos[1:-1] == grupos[:-2]) & (grupos[1:-1] == grupos[2:])
+
+    def es_pico(i):
+        anterior, actual, siguiente = t[i - 1], t[i], t[i + 1]
+        return (abs(actual - anterior) > UMBRAL_PICO and abs(actual - siguiente) > UMBRAL_PICO and
+                ((actual > anterior and actual > siguiente) or (actual < anterior and actual < siguiente)))
+
+    diferencia_anterior = np.abs(np.diff(t, prepend=np.nan))
+    diferencia_siguiente = np.abs(np.diff(t, append=np.nan))
+    pendientes = deque(np.flatnonzero(interiores & (diferencia_anterior > UMBRAL_PICO) &
+                                      (diferencia_siguiente > UMBRAL_PICO)))
+    while pendientes:
+        i = pendientes.popleft()
+        if es_pico(i):
+            # La media es np.float64 salvo que ambas vecinas sean float de Python
+            flotantes[i] = flotantes[i - 1] and flotantes[i + 1]
+            media = (t[i - 1] + t[i + 1]) / 2
+            t[i] = round(float(media), 1) if flotantes[i] else np.round(media, 1)
+            # La hora siguiente se compara ahora con el valor suavizado
+            if interiores[i + 1] and (not pendientes or pendientes[0] != i + 1):
+                pendientes.appendleft(i + 1)
+    return t
+
+
+def consistencia_fisica(fechas, temperatura, categorias):
+    """Reglas de asegurar_consistencia_fisica sobre columnas en orden cronológico.
+    Devuelve (temperatura, categorías, filas modificadas)."""
+    # Los float de Python de la entrada se redondean como en los bucles originales (np.float64 es subclase)
+    flotantes = np.array([type(valor) is float for valor in temperatura], dtype=bool)
+    t = np.asarray(temperatura, dtype=np.float64)
+    if len(t) == 0:
+        return t.copy(), list(categorias), np.zeros(0, dtype=bool)
+    cats = CategoriasCodificadas(categorias)
+    codigos_iniciales = cats.codigos.copy()
+    corregidas = consistencia_fisica_lote(np.asarray(fechas, dtype='datetime64[ns]')[None], t[None], cats,
+                                          flotantes[None])[0]
+    # La tabla solo crece, así que un mismo texto conserva su código
+    modificadas = (corregidas != t) | (cats.codigos != codigos_iniciales)
+    return corregidas, cats.textos(), modificadas
+
+
+def consistencia_fisica_lote(fechas, temperatura, cats, flotantes=None):
+    """consistencia_fisica para N pronósticos a la vez: fechas y temperatura (N, H), cats con los N*H
+    códigos en el mismo orden (se modifican en el sitio). flotantes (N, H) marca las temperaturas que
+    son float de Python (por defecto ninguna). Devuelve la temperatura corregida (N, H)."""
+    forma = np.shape(temperatura)
+    t = np.asarray(temperatura, dtype=np.float64).ravel().copy()
+    if flotantes is None:
+        flotantes = np.zeros(len(t), dtype=bool)
+    else:
+        flotantes = np.asarray(flotantes, dtype=bool).ravel().copy()
+    hora, dias = (c.ravel() for c in columnas_de_fechas(fechas))
+    filas = np.repeat(np.arange(forma[0]), forma[1])
+    grupos = filas * 100000000 + dias  # Día dentro de cada pronóstico
+    noche = (hora >= 18) | (hora <= 6)
+
+    # PRIMERA ETAPA: nunca "Calido" durante la noche (18:00-06:00)
+    cats.transformar(noche & cats.contiene("Calido"), lambda c: c.replace("Calido", "Templado"))
+
+    # SEGUNDA ETAPA: a medianoche la temperatura debe quedar por debajo de la de las 23:00
+    medianoche = np.zeros(len(t), dtype=bool)
+    medianoche[1:] = (hora[1:] == 0) & (t[1:] >= t[:-1]) & (filas[1:] == filas[:-1])
+    if medianoche.any():
+        descenso = 0.5 * uniforme_por_dia(dias[medianoche], 0.7, 1.3)  # Variable según el día
+        anteriores = np.flatnonzero(medianoche) - 1
+        flotantes[medianoche] = flotantes[anteriores]
+        t[medianoche] = redondear(t[anteriores] - descenso, flotantes[medianoche])
+
+    # TERCERA ETAPA: máximo diario y rango esperado por hora, con un factor propio de cada día
+    factor_dia = uniforme_por_dia(dias, 0.9, 1.1)
+    limite_max = np.clip(19.0 * factor_dia, 17.5, 20.5)
+    _, grupo_dia = np.unique(grupos, return_inverse=True)
+    maximo_dia = np.full(grupo_dia.max() + 1, -np.inf)
+    np.maximum.at(maximo_dia, grupo_dia, t)
+    maximo = maximo_dia[grupo_dia]
+    exceso = maximo > limite_max
+    if exceso.any():
+        # max() devolvía la primera hora con el máximo del día: su tipo decide el del factor de ajuste
+        posiciones = np.flatnonzero(t == maximo)
+        _, primeras = np.unique(grupo_dia[posiciones], return_index=True)
+        maximo_flotante = np.zeros(len(maximo_dia), dtype=bool)
+        maximo_flotante[grupo_dia[posiciones[primeras]]] = flotantes[posiciones[primeras]]
+        flotantes[exceso] &= maximo_flotante[grupo_dia[exceso]]
+        t[exceso] = redondear(t[exceso] * (limite_max[exceso] / maximo[exceso]), flotantes[exceso])
+
+    ajuste_dia = (factor_dia - 1.0) * 2.0  # Convierte ±10% en ±20% para temperaturas
+    minimo_esperado = np.maximum(RANGO_ESPERADO_HORA[hora, 0] + ajuste_dia, 9.0)
+    maximo_esperado = np.minimum(RANGO_ESPERADO_HORA[hora, 1] + ajuste_dia, 20.0)
+    fuera = (t < minimo_esperado) | (t > maximo_esperado)
+    # El valor recortado es uno de los límites, un float de Python
+    flotantes[fuera] = True
+    t[fuera] = redondear(np.minimum(np.maximum(t[fuera], minimo_esperado[fuera]), maximo_esperado[fuera]),
+                         flotantes[fuera])
+
+    # CUARTA ETAPA: continuidad dentro del mismo día
+    t = _suavizar_picos(t, grupos, flotantes)
+
+    # QUINTA ETAPA: categorías según hora y temperatura (cada regla parte de la categoría de esta etapa)
+    origen = cats.codigos.copy()
+    cats.transformar(cats.contiene("Alta Radiacion") & ((hora < 7) | (hora >= 18)), _sin_alta_radiacion)
+    calido = np.array(["Calido" in categoria for categoria in cats.tabla], dtype=bool)[origen]
+    cats.transformar(calido & (t < 12), lambda c: c.replace('Calido', 'Frio'), origen)
+    cats.transformar(calido & (t >= 12) & (t < 15), lambda c: c.replace('Calido', 'Templado'), origen)
+    cats.transformar(calido & noche, lambda c: c.replace("Calido", "Templado"), origen)
+
+    # SEXTA ETAPA: temperaturas demasiado altas, con un límite que varía ±5% por día
+    factor_dia = uniforme_por_dia(dias, 0.95, 1.05)
+    alta = t > 19.0 * factor_dia
+    tope = np.where((hora >= 11) & (hora <= 15), 18.5, 17.0) * factor_dia
+    flotantes[alta & (tope < t)] = True
+    t[alta] = redondear(np.minimum(t[alta], tope[alta]), flotantes[alta])
+    return t.reshape(forma)
+
+
+def temperaturas_realistas(fechas, temperatura):
+    """Reglas de forzar_temperaturas_realistas: limita cada hora al rango histórico de su periodo"""
+    hora, _ = columnas_de_fechas(fechas)
+    return np.clip(np.asarray(temperatura, dtype=np.float64), RANGO_REALISTA_HORA[hora, 0], RANGO_REALISTA_HORA[hora, 1])
+
+
+def variar_categorias(fechas, categorias):
+    """Fase de variación final de construir_predicciones: con la fecha y hora (AAAAMMDDHH) como semilla,
+    35% de probabilidad de quitar una parte que no sea de temperatura a las categorías de más de dos partes"""
+    cats = CategoriasCodificadas(list(categorias))
+    variar_categorias_lote(fechas, cats)
+    return cats.textos()
+
+
+def variar_categorias_lote(fechas, cats):
+    """variar_categorias sobre categorías codificadas (cualquier forma de fechas, códigos en el mismo orden)"""
+    fechas = pd.DatetimeIndex(np.ravel(np.asarray(fechas, dtype='datetime64[ns]')))
+    semillas = (fechas.year * 1000000 + fechas.month * 10000 + fechas.day * 100 + fechas.hour).to_numpy()
+    # Solo se sortea donde el sorteo puede cambiar la categoría
+    elegibles = {}
+    for codigo, categoria in enumerate(list(cats.tabla)):
+        partes = categoria.split(' + ')
+        partes_no_temp = [p for p in partes if p not in ['Frío', 'Templado', 'Cálido']]
+        if len(partes) > 2 and len(partes_no_temp) > 1:
+            elegibles[codigo] = (partes, partes_no_temp)
+    if not elegibles:
+        return cats
+    generador = generador_local()
+    for i in np.flatnonzero(np.isin(cats.codigos, list(elegibles))):
+        partes, partes_no_temp = elegibles[cats.codigos[i]]
+        generador.seed(int(semillas[i]))
+        if generador.random_sample() < 0.35:
+            restantes = list(partes)
+            restantes.remove(generador.choice(partes_no_temp))
+            cats.codigos[i] = cats.codigo(' + '.join(restantes))
+    return cats
@@ -0,0 +1,203 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# Contenedor compacto del pronóstico horario.
+# En lugar de 72 diccionarios con textos de fecha, categoría y detalles ya formateados, un Pronostico
+# guarda columnas NumPy (fechas datetime64, temperatura, confianza y códigos de categoría sobre una
+# tabla de textos). Los textos de fecha y hora se forman al pedirlos y los detalles (descripción y
+# recomendaciones) se generan la primera vez que se consultan, de modo que solo se calculan para las
+# horas que se muestran o exportan. Cada hora se sigue leyendo como pred['campo'] y a_dataframe()
+# entrega las columnas a pandas sin copiarlas ni volver a interpretar las fechas.
+# LotePronosticos agrupa N pronósticos (modo backtest) en bloques (N, H) con una tabla común; cada
+# fila se lee como un Pronostico sobre vistas de esos bloques.
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M'
+CAMPOS = ('fecha', 'hora', 'categoria', 'confianza', 'temperatura', 'detalles')
+
+
+class Pronostico:
+    """Lote de predicciones horarias en columnas NumPy con una tabla de categorías"""
+
+    __slots__ = ('fechas', 'temperatura', 'confianza', 'codigos', 'categorias', '_generar_detalles', '_detalles')
+
+    def __init__(self, fechas, temperatura, confianza, categorias, codigos=None, generar_detalles=None):
+        """categorias: un texto por hora, o la tabla de textos si se pasan los códigos.
+        generar_detalles(categoria, confianza, temperatura, fecha): genera los detalles de una hora."""
+        self.fechas = np.asarray(fechas, dtype='datetime64[ns]')
+        self.temperatura = np.asarray(temperatura, dtype=np.float64)
+        self.confianza = np.asarray(confianza, dtype=np.float64)
+        if codigos is None:
+            tabla, codigos = np.unique(np.asarray(categorias, dtype=object).astype(str), return_inverse=True)
+            categorias = tabla
+        self.categorias = [str(c) for c in categorias]
+        self.codigos = np.asarray(codigos, dtype=np.int32)
+        self._generar_detalles = generar_detalles
+        self._detalles = {}
+
+    def __len__(self):
+        return len(self.fechas)
+
+    def __iter__(self):
+        return (RegistroPronostico(self, i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            indices = range(*i.indices(len(self)))
+            parte = Pronostico(self.fechas[i], self.temperatura[i], self.confianza[i], self.categorias,
+                               codigos=self.codigos[i], generar_detalles=self._generar_detalles)
+            # Los detalles ya generados siguen valiendo para la parte
+            parte._detalles = {k: self._detalles[j] for k, j in enumerate(indices) if j in self._detalles}
+            return parte
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Índice de predicción fuera de rango")
+        return RegistroPronostico(self, i)
+
+    def fecha(self, i):
+        return pd.Timestamp(self.fechas[i])
+
+    def texto_fecha(self, i):
+        return np.datetime_as_string(self.fechas[i], unit='m').replace('T', ' ')
+
+    def categoria(self, i):
+        return self.categorias[self.codigos[i]]
+
+    def detalles(self, i):
+        """Detalles de la hora i, generados (y guardados) la primera vez que se piden"""
+        if i not in self._detalles:
+            if self._generar_detalles is None:
+                return None
+            self._detalles[i] = self._generar_detalles(
+                self.categoria(i), float(self.confianza[i]), float(self.temperatura[i]), self.fecha(i))
+        return self._detalles[i]
+
+    def a_dataframe(self):
+        """DataFrame con fecha, categoría (categórica), confianza y temperatura sobre las mismas columnas"""
+        return pd.DataFrame({
+            'fecha': self.fechas,
+            'categoria': pd.Categorical.from_codes(self.codigos, self.categorias),
+            'confianza': self.confianza,
+            'temperatura': self.temperatura
+        }, copy=False)
+
+    def a_registros(self):
+        """Lista de diccionarios con todos los campos (respuesta JSON, código que espera dicts)"""
+        return [registro.copy() for registro in self]
+
+
+class LotePronosticos:
+    """N pronósticos de H horas en bloques (N, H) que comparten la tabla de categorías"""
+
+    __slots__ = ('anclas', 'fechas', 'temperatura', 'confianza', 'codigos', 'categorias', '_generar_detalles')
+
+    def __init__(self, anclas, fechas, temperatura, confianza, categorias, codigos, generar_detalles=None):
+        """anclas (N,): última hora observada de cada pronóstico; fechas, temperatura, confianza y
+        codigos (N, H) sobre la tabla de textos categorias"""
+        self.anclas = np.asarray(anclas, dtype='datetime64[ns]')
+        self.fechas = np.asarray(fechas, dtype='datetime64[ns]')
+        self.temperatura = np.asarray(temperatura, dtype=np.float64)
+        self.confianza = np.asarray(confianza, dtype=np.float64)
+        self.codigos = np.asarray(codigos, dtype=np.int32).reshape(self.fechas.shape)
+        self.categorias = [str(c) for c in categorias]
+        self._generar_detalles = generar_detalles
+
+    @property
+    def shape(self):
+        return self.fechas.shape
+
+    def __len__(self):
+        return len(self.anclas)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __getitem__(self, i):
+        """Un entero devuelve el Pronostico de esa ancla; un slice, otro lote"""
+        if isinstance(i, slice):
+            return LotePronosticos(self.anclas[i], self.fechas[i], self.temperatura[i], self.confianza[i],
+                                   self.categorias, self.codigos[i], self._generar_detalles)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Índice de pronóstico fuera de rango")
+        return Pronostico(self.fechas[i], self.temperatura[i], self.confianza[i], self.categorias,
+                          codigos=self.codigos[i], generar_detalles=self._generar_detalles)
+
+    def categorias_bloque(self):
+        """Textos de categoría (N, H)"""
+        return np.asarray(self.categorias, dtype=object)[self.codigos]
+
+    def a_dataframe(self):
+        """Formato largo: una fila por ancla y hora, con el horizonte en horas (1..H)"""
+        n, horas = self.shape
+        return pd.DataFrame({
+            'ancla': np.repeat(self.anclas, horas),
+            'horizonte': np.tile(np.arange(1, horas + 1), n),
+            'fecha': self.fechas.ravel(),
+            'categoria': pd.Categorical.from_codes(self.codigos.ravel(), self.categorias),
+            'confianza': self.confianza.ravel(),
+            'temperatura': self.temperatura.ravel()
+        }, copy=False)
+
+
+class RegistroPronostico(Mapping):
+    """Vista de una hora de un Pronostico con la interfaz de lectura de un diccionario"""
+
+    __slots__ = ('_pronostico', '_i')
+
+    def __init__(self, pronostico, i):
+        self._pronostico = pronostico
+        self._i = i
+
+    def __getitem__(self, campo):
+        p, i = self._pronostico, self._i
+        if campo == 'fecha':
+            return p.texto_fecha(i)
+        if campo == 'hora':
+            return p.texto_fecha(i)[11:]
+        if campo == 'categoria':
+            return p.categoria(i)
+        if campo == 'confianza':
+            return float(p.confianza[i])
+        if campo == 'temperatura':
+            return float(p.temperatura[i])
+        if campo == 'detalles':
+            return p.detalles(i)
+        raise KeyError(campo)
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def copy(self):
+        return {campo: self[campo] for campo in CAMPOS}
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
+def como_dataframe(predicciones):
+    """DataFrame con 'fecha' como datetime a partir de un Pronostico o de una lista de diccionarios"""
+    if isinstance(predicciones, Pronostico):
+        return predicciones.a_dataframe()
+    df_pred = pd.DataFrame(list(predicciones))
+    df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+    return df_pred
+
+
+def tabla_exportacion(predicciones):
+    """Tabla de exportación a CSV (una fila por hora, textos formateados)"""
+    return pd.DataFrame([{
+        'Fecha': pred['fecha'],
+        'Hora': pred['hora'],
+        'Categoría': pred['categoria'],
+        'Temperatura': f"{pred['temperatura']:.1f}°C",
+        'Confianza': f"{pred['confianza']*100:.1f}%",
+        'Descripción': pred['detalles']['descripcion'],
+        'Recomendaciones': ', '.join(pred['detalles']['recomendaciones'])
+    } for pred in predicciones])
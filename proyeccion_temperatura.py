@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+
+# Proyección horaria de temperatura para Facatativá (curva diaria, ajuste estacional, onda semanal y
+# ruido determinístico por día y por hora), calculada para todas las horas y todos los inicios de una
+# vez. Reemplaza las 72 llamadas a predecir_temperatura, que volvían a sembrar np.random dos veces por
+# hora y guardaban la hora anterior en el predictor (dos pronósticos simultáneos se interferían).
+# Los sorteos usan las mismas semillas de antes (AAAAMMDD y AAAAMMDD + hora), así que los valores no
+# cambian, pero con un generador propio de cada hilo que se vuelve a sembrar antes de cada sorteo.
+
+TEMPERATURA_BASE = 14.0  # Temperatura de referencia ajustada
+LIMITES_TEMPERATURA = (10.0, 19.0)  # Límites realistas
+
+
+def _tendencia(hora):
+    """Tendencia horaria realista según los datos de Facatativá"""
+    if 0 <= hora <= 3:
+        return -2.0 - (0.3 * hora)  # Enfriamiento en la madrugada profunda, hacia 11-12°C
+    if 4 <= hora <= 6:
+        return -3.0 + 0.5 * (hora - 3)  # Ligero aumento hacia el amanecer, hacia 13°C
+    if 7 <= hora <= 10:
+        return -1.0 + 1.0 * (hora - 6)  # Aumento claro en la mañana, hacia 16-17°C
+    if 11 <= hora <= 14:
+        return 3.0 + 0.1 * (hora - 10)  # Meseta de temperatura máxima, cerca de 17°C
+    if 15 <= hora <= 17:
+        return 3.2 - 0.3 * (hora - 14)  # Ligero descenso en la tarde
+    return 2.5 - 0.3 * (hora - 17)  # Enfriamiento gradual en la noche, hacia 14-15°C
+
+
+TENDENCIA_HORA = np.array([_tendencia(h) for h in range(24)])
+# Diciembre-Febrero (más frío) y Junio-Agosto (temporada seca/fría); índice = mes
+AJUSTE_MES = np.array([0.0, -0.8, -0.8, 0.0, 0.0, 0.0, -0.5, -0.5, -0.5, 0.0, 0.0, 0.0, -0.8])
+# Onda sinusoidal de ±0.8°C según el día de la semana (0=lunes) para diferenciar días consecutivos
+VARIACION_SEMANA = np.sin(np.arange(7) * np.pi/3) * 0.8
+# Cambio máximo entre horas consecutivas: mayor en el calentamiento de la mañana
+CAMBIO_MAXIMO_HORA = np.where((np.arange(24) >= 7) & (np.arange(24) <= 10), 1.2, 0.7)
+
+
+_hilo = threading.local()
+
+
+def generador_local():
+    """RandomState propio del hilo, para volver a sembrarlo antes de cada sorteo
+    (crear un RandomState es mucho más lento que volver a sembrarlo)"""
+    generador = getattr(_hilo, 'generador', None)
+    if generador is None:
+        generador = _hilo.generador = np.random.RandomState()
+    return generador
+
+
+def _normales(semillas):
+    """Primer valor normal estándar tras sembrar con cada semilla (como np.random.seed + normal)"""
+    generador = generador_local()
+    unicas, inverso = np.unique(semillas, return_inverse=True)
+    valores = np.empty(len(unicas))
+    for k, semilla in enumerate(unicas):
+        generador.seed(int(semilla))
+        valores[k] = generador.normal()
+    return valores[inverso].reshape(np.shape(semillas))
+
+
+def proyectar_temperaturas(inicios, horas=72):
+    """Temperaturas de las `horas` siguientes a cada inicio (la hora 0 es el propio inicio).
+    inicios: una fecha -> (horas,); varias fechas -> (N, horas)."""
+    unico = np.ndim(inicios) == 0
+    inicios = np.atleast_1d(np.asarray(inicios, dtype='datetime64[ns]'))
+    desplazamientos = np.arange(horas)
+    fechas = inicios[:, None] + desplazamientos.astype('timedelta64[h]')
+    dias = fechas.astype('datetime64[D]')
+    meses = dias.astype('datetime64[M]')
+    hora = (fechas.astype('datetime64[h]').astype(np.int64) % 24).astype(np.intp)
+    mes = (meses.astype(np.int64) % 12 + 1).astype(np.intp)
+    dia_semana = ((dias.astype(np.int64) + 3) % 7).astype(np.intp)  # 1970-01-01 fue jueves (0=lunes)
+    semilla_dia = ((meses.astype('datetime64[Y]').astype(np.int64) + 1970) * 10000 + mes * 100
+                   + (dias - meses).astype(np.int64) + 1)
+
+    temperatura = (TEMPERATURA_BASE + TENDENCIA_HORA[hora]
+                   + AJUSTE_MES[mes]
+                   + VARIACION_SEMANA[dia_semana]
+                   + 0.6 * _normales(semilla_dia))
+    # Variación específica por hora: la semilla del día desplazada por la hora del pronóstico
+    temperatura = temperatura + 0.2 * _normales(semilla_dia + desplazamientos)
+    temperatura = np.clip(temperatura, *LIMITES_TEMPERATURA)
+
+    # Predicción adaptativa: limitar el cambio respecto a la hora anterior ya ajustada
+    cambio = CAMBIO_MAXIMO_HORA[hora]
+    for h in range(1, horas):
+        previa = temperatura[:, h - 1]
+        temperatura[:, h] = np.minimum(np.maximum(temperatura[:, h], previa - cambio[:, h]), previa + cambio[:, h])
+
+    temperatura = np.round(temperatura, 1)
+    return temperatura[0] if unico else temperatura
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Puente de datos sintéticos para huecos largos entre el histórico y los datos de la estación.
+# Cada variable pasa del promedio de las últimas 48 horas antes del hueco al de las primeras 48
+# horas después, con una transición sigmoide, ajustes estacionales por mes y perfiles por hora.
+# Todo se calcula como arreglos indexados por mes y hora, así que años de hueco tardan milisegundos.
+
+FRECUENCIA_PUENTE = '6h'
+HORAS_REFERENCIA = 48  # Registros promediados a cada lado del hueco
+SEMILLA_PUENTE = 2024  # Generador con semilla fija: el mismo hueco produce siempre el mismo puente
+
+# Factores estacionales por mes (fila 0 = enero):
+# [factor_temperatura, factor_precipitacion, factor_humedad, factor_nubosidad]
+FACTORES_ESTACIONALES = np.array([
+    [-0.8, 0.2, 0.5, 0.3],   # Enero
+    [-0.5, 0.3, 0.4, 0.3],   # Febrero
+    [0.0, 0.8, 0.6, 0.5],    # Marzo
+    [0.2, 1.2, 0.8, 0.7],    # Abril
+    [0.3, 1.0, 0.7, 0.6],    # Mayo
+    [0.2, 0.4, 0.5, 0.4],    # Junio
+    [0.1, 0.3, 0.4, 0.3],    # Julio
+    [0.0, 0.3, 0.5, 0.4],    # Agosto
+    [0.1, 0.7, 0.6, 0.5],    # Septiembre
+    [0.0, 1.3, 0.8, 0.7],    # Octubre
+    [-0.2, 1.1, 0.9, 0.8],   # Noviembre
+    [-0.5, 0.5, 0.6, 0.5]    # Diciembre
+])
+
+# Ajuste horario para temperatura (en °C), índice = hora del día
+PATRON_HORARIO_TEMPERATURA = np.array([
+    -1.5, -2.0, -2.5, -3.0, -3.0, -2.5,  # Madrugada
+    -2.0, -1.0, 0.0, 1.0, 2.0, 3.0,      # Mañana
+    3.5, 4.0, 4.0, 3.5, 2.5, 1.5,        # Tarde
+    0.5, 0.0, -0.5, -1.0, -1.2, -1.3     # Noche
+])
+
+# Factor multiplicativo para radiación, índice = hora del día
+PATRON_HORARIO_RADIACION = np.array([
+    0.0, 0.0, 0.0, 0.0, 0.0, 0.1,        # Madrugada
+    0.2, 0.4, 0.6, 0.8, 0.9, 1.0,        # Mañana
+    1.0, 0.95, 0.9, 0.8, 0.6, 0.4,       # Tarde
+    0.2, 0.1, 0.0, 0.0, 0.0, 0.0         # Noche
+])
+
+RADIACION_MAXIMA_J_M2 = 900000
+NUBOSIDAD_ESTIMADA = 4  # Octas supuestas para atenuar la radiación cuando no hay dato real
+
+
+def progreso_sigmoide(n):
+    """Avance suavizado de 0 a 1 a lo largo de n puntos (más lento al inicio y al final)"""
+    progreso = np.arange(n) / (n - 1) if n > 1 else np.full(n, 0.5)
+    return 1 / (1 + np.exp(-10 * (progreso - 0.5)))
+
+
+def generar_puente(fechas, valores_iniciales, valores_finales, semilla=SEMILLA_PUENTE):
+    """Valores sintéticos para cada fecha de `fechas` (DatetimeIndex).
+    valores_iniciales / valores_finales: {columna: valor de referencia antes / después del hueco}."""
+    fechas = pd.DatetimeIndex(fechas)
+    rng = np.random.default_rng(semilla)
+    n = len(fechas)
+    sigmoide = progreso_sigmoide(n)
+    factores = FACTORES_ESTACIONALES[fechas.month - 1]
+    hora = fechas.hour.to_numpy()
+
+    df_puente = pd.DataFrame(index=fechas)
+    for col, valor_inicial in valores_iniciales.items():
+        valor_base = valor_inicial + (valores_finales[col] - valor_inicial) * sigmoide
+
+        if col == 'temperatura_C':
+            valores = valor_base + PATRON_HORARIO_TEMPERATURA[hora] + factores[:, 0]
+        elif col == 'precipitacion_mm':
+            # Lluvia ocasional (20 % de los puntos) para mayor realismo; no puede ser negativa
+            lluvia = np.where(rng.random(n) < 0.2, rng.exponential(0.5, n), 0.0)
+            valores = np.fmax(0, valor_base * factores[:, 1] + lluvia)
+        elif col == 'humedad_relativa':
+            # Menor humedad durante el día (correlación inversa con temperatura); rango 30-100 %
+            ajuste_hora = np.where((hora >= 8) & (hora <= 17), -5, 5)
+            valores = np.clip(valor_base * factores[:, 2] + ajuste_hora, 30, 100)
+        elif col == 'cobertura_nubes_octas':
+            valores = np.clip(valor_base * factores[:, 3], 0, 8)
+        elif col == 'radiacion_solar_J_m2':
+            # Depende solo de la hora, atenuada por una nubosidad promedio
+            factor_nubosidad = max(0, 1 - (NUBOSIDAD_ESTIMADA / 10))
+            valores = RADIACION_MAXIMA_J_M2 * PATRON_HORARIO_RADIACION[hora] * factor_nubosidad
+        elif col == 'velocidad_viento_kmh':
+            # Mayor velocidad en horas de sol, con algo de variabilidad; no puede ser negativa
+            factor_hora = np.where((hora >= 10) & (hora <= 16), 1.2, 0.8)
+            valores = np.fmax(0, valor_base * factor_hora + rng.normal(0, 0.5, n))
+        else:
+            valores = valor_base
+
+        df_puente[col] = valores
+    return df_puente
+
+
+def puente_entre(df_anterior, df_posterior, columnas=None, frecuencia=FRECUENCIA_PUENTE, semilla=SEMILLA_PUENTE):
+    """Puente entre dos series con índice temporal, desde un día después del final de df_anterior
+    hasta un día antes del inicio de df_posterior. Devuelve un DataFrame vacío si no cabe ningún punto."""
+    columnas = list(columnas if columnas is not None else df_anterior.columns)
+    fechas = pd.date_range(start=df_anterior.index.max() + pd.Timedelta(days=1),
+                           end=df_posterior.index.min() - pd.Timedelta(days=1), freq=frecuencia)
+    iniciales = {col: df_anterior[col].iloc[-HORAS_REFERENCIA:].mean() for col in columnas}
+    finales = {col: df_posterior[col].iloc[:HORAS_REFERENCIA].mean() for col in columnas}
+    return generar_puente(fechas, iniciales, finales, semilla)
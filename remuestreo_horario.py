@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# Conversión de los registros de la estación (cada ~5 minutos) a datos horarios.
+# Para cada hora en punto se toma el registro más cercano del mismo día y la radiación solar
+# se recalcula como el promedio en W/m² de la hora anterior, convertido a J/m².
+
+UMBRAL_ADVERTENCIA_HORAS = 0.25  # Se avisa si el registro más cercano está a más de 15 minutos
+SEGUNDOS_HORA = 3600
+
+
+def horas_del_rango(fechas):
+    """Horas en punto desde el inicio del primer día hasta el final del último"""
+    return pd.date_range(start=fechas.min().floor('D'), end=fechas.max().ceil('D'), freq='1h')
+
+
+def registros_mas_cercanos(df, horas):
+    """Registro de df (ordenado por 'fecha') más cercano a cada hora, buscando solo en el mismo día.
+    Devuelve (registros con 'fecha' igual a la hora, fecha original de cada registro, diferencia en horas).
+    Las horas de días sin registros se omiten; en un empate gana el registro anterior."""
+    # Con fechas repetidas se usa la primera, como al buscar el mínimo sobre la serie ordenada
+    candidatos = df.drop_duplicates('fecha', keep='first').rename(columns={'fecha': '_origen'})
+    candidatos['_dia'] = candidatos['_origen'].dt.normalize()
+
+    horas = pd.Series(horas).astype(df['fecha'].dtype)
+    objetivo = pd.DataFrame({'fecha': horas, '_dia': horas.dt.normalize()})
+    objetivo = objetivo[objetivo['_dia'].isin(candidatos['_dia'])]
+
+    emparejados = pd.merge_asof(objetivo, candidatos, left_on='fecha', right_on='_origen',
+                                by='_dia', direction='nearest')
+    diferencias = (emparejados['_origen'] - emparejados['fecha']).abs().dt.total_seconds() / SEGUNDOS_HORA
+    return emparejados[list(df.columns)].copy(), emparejados['_origen'], diferencias
+
+
+def radiacion_hora_anterior(df, horas, columna='radiacion_solar_wm2'):
+    """Promedio de `columna` en [hora - 1 h, hora) para cada hora, y número de registros en ese intervalo"""
+    # Intervalos cerrados por la izquierda y etiquetados con su final: [h-1, h) -> h
+    agrupado = df.set_index('fecha')[columna].resample('1h', closed='left', label='right')
+    promedio = agrupado.mean().reindex(horas)
+    registros = agrupado.size().reindex(horas, fill_value=0)
+    return promedio.to_numpy(), registros.to_numpy()
+
+
+def convertir_a_horario(nuevo_df, verbose=True):
+    """Paso horario de preparar_datos_estacion sobre datos ordenados por fecha. Sin la columna
+    'radiacion_solar_wm2' se remuestrean las demás columnas y se omite el cálculo de radiación."""
+    horas = horas_del_rango(nuevo_df['fecha'])
+    df_procesado, origen, diferencias = registros_mas_cercanos(nuevo_df, horas)
+
+    if verbose:
+        for i in np.flatnonzero(diferencias.to_numpy() > UMBRAL_ADVERTENCIA_HORAS):
+            print(f"ADVERTENCIA: Para {df_procesado['fecha'].iat[i]}, registro más cercano: {origen.iat[i]}, "
+                  f"diferencia: {diferencias.iat[i]:.2f} horas")
+
+    # Cálculo específico para radiación solar en J/m²
+    if 'radiacion_solar_wm2' in nuevo_df.columns:
+        print("Calculando radiación solar horaria correctamente...")
+        promedio_wm2, registros = radiacion_hora_anterior(nuevo_df, pd.DatetimeIndex(df_procesado['fecha']))
+        # Sin registros en la hora anterior se asigna 0
+        df_procesado['radiacion_solar_J_m2'] = np.where(registros > 0, promedio_wm2 * SEGUNDOS_HORA, 0)
+
+        if verbose:
+            for idx in np.flatnonzero(registros[:5] > 0):  # Mostrar algunos ejemplos
+                print(f"Hora: {df_procesado['fecha'].iat[idx]}")
+                print(f"  Registros usados: {registros[idx]}")
+                print(f"  Promedio W/m²: {promedio_wm2[idx]:.2f}")
+                print(f"  Total J/m²: {promedio_wm2[idx] * SEGUNDOS_HORA:.2f}")
+        for idx in np.flatnonzero(registros == 0):
+            print(f"ADVERTENCIA: No hay registros para calcular radiación solar en {df_procesado['fecha'].iat[idx]}")
+
+    print(f"Datos convertidos a formato horario: {len(df_procesado)} registros")
+    return df_procesado.reset_index(drop=True)
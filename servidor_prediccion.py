@@ -0,0 +1,256 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, TimeoutError as TiempoAgotado
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from pronostico_compacto import Pronostico
+
+# Servicio local de predicción: mantiene cargados el modelo principal, el ensemble y los
+# normalizadores, y agrupa en un solo lote las solicitudes que llegan casi al mismo tiempo.
+# Uso: python servidor_prediccion.py [--host 127.0.0.1] [--puerto 8765]
+#   GET  /estado      -> información del modelo cargado y del servicio
+#   POST /prediccion  -> {"registros": [{"fecha": "2025-05-01 00:00", "temperatura_C": ..., ...}, ...]}
+# La respuesta tiene la misma estructura de 72 horas que predecir_proximo_periodo. Si el servicio no
+# está atendiendo responde 503; si la predicción no termina en TIEMPO_MAXIMO_S, 504.
+
+HOST_POR_DEFECTO = '127.0.0.1'
+PUERTO_POR_DEFECTO = 8765
+MAX_LOTE = 32  # Solicitudes máximas por pasada del modelo
+ESPERA_LOTE_S = 0.01  # Tiempo que se espera a que lleguen más solicitudes antes de inferir
+TIEMPO_MAXIMO_S = 60  # Espera máxima de una solicitud HTTP por su predicción
+
+
+class ServicioNoDisponible(Exception):
+    """El hilo que atiende las predicciones no está en marcha"""
+
+
+def registros_a_dataframe(registros):
+    """Convierte la lista de registros recibida en un DataFrame con índice temporal"""
+    df = pd.DataFrame(registros)
+    if 'fecha' not in df.columns:
+        raise ValueError("Cada registro debe incluir la columna 'fecha'")
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    return df.set_index('fecha').sort_index()
+
+
+def dataframe_a_registros(df):
+    """Convierte un DataFrame con índice temporal en registros serializables"""
+    registros = df.reset_index()
+    registros['fecha'] = registros['fecha'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return registros.to_dict(orient='records')
+
+
+def _a_json(valor):
+    """Conversión de tipos NumPy/pandas para json.dumps"""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Pronostico):
+        return valor.a_registros()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+class ServicioPrediccion:
+    """Mantiene un PrediccionMeteo cargado y atiende las solicitudes por lotes desde un único hilo"""
+
+    def __init__(self, predictor=None, max_lote=MAX_LOTE, espera_lote=ESPERA_LOTE_S, tiempo_maximo=TIEMPO_MAXIMO_S):
+        if predictor is None:
+            from entorno_tensorflow import inicializar_tensorflow
+            from predictor_model import PrediccionMeteo
+            # El servicio siempre usa el modelo: se configura TensorFlow antes de cargarlo
+            inicializar_tensorflow()
+            predictor = PrediccionMeteo()
+            predictor.cargar_modelo_guardado()
+        # Las ventanas recibidas son cortas y distintas en cada solicitud: no se guardan en el almacén
+        predictor.almacen_caracteristicas = None
+        self.predictor = predictor
+        self.max_lote = max_lote
+        self.espera_lote = espera_lote
+        self.tiempo_maximo = tiempo_maximo
+        self.solicitudes = 0
+        self.lotes = 0
+        # PrediccionMeteo no es seguro entre hilos: todo el trabajo del modelo ocurre en este hilo
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._atender, daemon=True)
+        self._hilo.start()
+
+    def predecir(self, dataset, timeout=None):
+        """Encola un histórico reciente y espera su predicción de 72 horas (como mucho `timeout`
+        segundos; lanza TiempoAgotado y la solicitud se descarta si aún no se había empezado)"""
+        if not self._hilo.is_alive():
+            raise ServicioNoDisponible("El servicio de predicción no está atendiendo solicitudes")
+        futuro = Future()
+        self._cola.put((dataset, futuro))
+        try:
+            return futuro.result(timeout)
+        except TiempoAgotado:
+            futuro.cancel()
+            raise
+
+    def estado(self):
+        """Resumen del modelo residente y de la actividad del servicio"""
+        predictor = self.predictor
+        return {
+            'modelo': getattr(predictor, 'modelo_path', None),
+            'num_categorias': predictor.num_categorias,
+            'modelos_ensemble': len(predictor.ensemble_models),
+            'usa_ensemble': bool(predictor.use_ensemble and len(predictor.ensemble_models) >= 2),
+            'solicitudes': self.solicitudes,
+            'lotes': self.lotes
+        }
+
+    def detener(self):
+        """Termina el hilo de atención después de procesar lo ya encolado"""
+        self._cola.put(None)
+        self._hilo.join()
+
+    def _atender(self):
+        terminar = False
+        while not terminar:
+            item = self._cola.get()
+            if item is None:
+                break
+            lote = [item]
+            limite = time.perf_counter() + self.espera_lote
+            while len(lote) < self.max_lote:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is None:
+                    terminar = True
+                    break
+                lote.append(item)
+            self._procesar(lote)
+
+    def _procesar(self, lote):
+        """Prepara cada solicitud, infiere todas en una pasada y construye sus predicciones"""
+        self.solicitudes += len(lote)
+        grupos = {}
+        for dataset, futuro in lote:
+            # Solicitudes cuyo cliente ya dejó de esperar
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                entrada = self.predictor.preparar_entrada_prediccion(dataset)
+                grupos.setdefault(entrada.shape[1:], []).append((dataset, futuro, entrada))
+            except Exception as e:
+                futuro.set_exception(e)
+
+        # Solo se apilan ventanas con la misma forma (mismas variables predictoras)
+        for solicitudes in grupos.values():
+            self.lotes += 1
+            try:
+                X = np.concatenate([entrada for _, _, entrada in solicitudes])
+                probabilidades, confianza = self.predictor.inferir_probabilidades(X)
+            except Exception as e:
+                for _, futuro, _ in solicitudes:
+                    futuro.set_exception(e)
+                continue
+            for k, (dataset, futuro, entrada) in enumerate(solicitudes):
+                try:
+                    futuro.set_result(self.predictor.construir_predicciones(
+                        probabilidades[k], confianza[k], dataset.index.max()))
+                except Exception as e:
+                    futuro.set_exception(e)
+
+
+class _ManejadorPrediccion(BaseHTTPRequestHandler):
+    """Rutas HTTP del servicio; cada conexión se atiende en su propio hilo"""
+
+    def do_GET(self):
+        if self.path == '/estado':
+            self._responder(200, self.server.servicio.estado())
+        else:
+            self._responder(404, {'error': f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/prediccion':
+            self._responder(404, {'error': f"Ruta no encontrada: {self.path}"})
+            return
+        try:
+            longitud = int(self.headers.get('Content-Length', 0))
+            cuerpo = json.loads(self.rfile.read(longitud))
+            dataset = registros_a_dataframe(cuerpo['registros'])
+        except Exception as e:
+            self._responder(400, {'error': f"Solicitud inválida: {e}"})
+            return
+        servicio = self.server.servicio
+        try:
+            predicciones = servicio.predecir(dataset, timeout=servicio.tiempo_maximo)
+            self._responder(200, {'predicciones': predicciones})
+        except ServicioNoDisponible as e:
+            self._responder(503, {'error': str(e)})
+        except TiempoAgotado:
+            self._responder(504, {'error': f"La predicción no terminó en {servicio.tiempo_maximo} s"})
+        except Exception as e:
+            self._responder(500, {'error': str(e)})
+
+    def _responder(self, codigo, contenido):
+        datos = json.dumps(contenido, default=_a_json, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        # Sin registro por solicitud: el servicio puede recibir muchas por segundo
+        pass
+
+
+def crear_servidor(servicio, host=HOST_POR_DEFECTO, puerto=PUERTO_POR_DEFECTO):
+    """Crea el servidor HTTP (puerto 0 = puerto libre) asociado al servicio"""
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorPrediccion)
+    servidor.daemon_threads = True
+    servidor.servicio = servicio
+    return servidor
+
+
+def solicitar_prediccion(datos, url=f'http://{HOST_POR_DEFECTO}:{PUERTO_POR_DEFECTO}', timeout=60):
+    """Cliente: envía un histórico reciente (DataFrame o registros) y devuelve las predicciones"""
+    registros = dataframe_a_registros(datos) if isinstance(datos, pd.DataFrame) else datos
+    cuerpo = json.dumps({'registros': registros}, default=_a_json).encode('utf-8')
+    solicitud = urllib.request.Request(
+        f'{url}/prediccion', data=cuerpo, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(solicitud, timeout=timeout) as respuesta:
+            return json.loads(respuesta.read())['predicciones']
+    except urllib.error.HTTPError as e:
+        raise Exception(f"Error del servidor de predicción ({e.code}): {json.loads(e.read()).get('error')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de predicción del microclima")
+    parser.add_argument('--host', default=HOST_POR_DEFECTO)
+    parser.add_argument('--puerto', type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE)
+    parser.add_argument('--tiempo-maximo', type=float, default=TIEMPO_MAXIMO_S,
+                        help="Segundos que una solicitud espera su predicción antes de responder 504")
+    args = parser.parse_args()
+
+    servicio = ServicioPrediccion(max_lote=args.max_lote, tiempo_maximo=args.tiempo_maximo)
+    servidor = crear_servidor(servicio, args.host, args.puerto)
+    print(f"Servidor de predicción escuchando en http://{args.host}:{servidor.server_address[1]}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("Deteniendo servidor de predicción...")
+    finally:
+        servidor.server_close()
+        servicio.detener()
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from almacen_caracteristicas import AlmacenCaracteristicas, rellenar_faltantes
+
+
+def _calcular(df):
+    """Características con la misma forma que enhance_features: solo miran hacia atrás"""
+    resultado = df.copy()
+    resultado['semana_año'] = resultado.index.isocalendar().week
+    resultado['periodo_dia'] = pd.cut(resultado.index.hour, bins=[0, 6, 12, 18, 24],
+                                      labels=['Madrugada', 'Mañana', 'Tarde', 'Noche']).astype(str)
+    resultado = pd.concat([resultado, pd.get_dummies(resultado['periodo_dia'], prefix='periodo')], axis=1)
+    resultado['temperatura_C_trend_3h'] = resultado['temperatura_C'].diff(3)
+    resultado['temperatura_C_rolling_6h'] = resultado['temperatura_C'].rolling(window=6, min_periods=1).mean()
+    return resultado
+
+
+def _serie(horas, semilla=0):
+    generador = np.random.default_rng(semilla)
+    indice = pd.date_range('2024-01-01', periods=horas, freq='h', name='fecha')
+    return pd.DataFrame({'temperatura_C': generador.integers(0, 30, horas).astype(float),
+                         'categoria_clima': generador.choice(['Frío', 'Templado', None], horas)},
+                        index=indice)
+
+
+def test_anexar_y_recargar_desde_disco(tmp_path):
+    df = _serie(300)
+    almacen = AlmacenCaracteristicas(_calcular, str(tmp_path))
+    almacen.obtener(df.iloc[:200])
+    for fin in (230, 260, 261, 300):
+        resultado = almacen.obtener(df.iloc[:fin])
+    pd.testing.assert_frame_equal(resultado, rellenar_faltantes(_calcular(df)))
+    assert len(almacen.segmentos) > 1
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == ['.json'] + ['.npz'] * len(almacen.segmentos)
+
+    # Los segmentos son arreglos simples: se cargan sin deserializar objetos
+    recargado = AlmacenCaracteristicas(_calcular, str(tmp_path))
+    recargado._cargar()
+    assert recargado.filas == 300
+    pd.testing.assert_frame_equal(recargado.entradas, almacen.entradas, check_freq=False)
+    pd.testing.assert_frame_equal(recargado.caracteristicas, almacen.caracteristicas, check_freq=False)
+    for segmento in recargado.segmentos:
+        with np.load(tmp_path / segmento['archivo'], allow_pickle=False) as arreglos:
+            assert all(arreglos[clave].dtype != object for clave in arreglos.files)
+
+
+def test_registro_antiguo_modificado_invalida_el_historico(tmp_path):
+    df = _serie(300)
+    almacen = AlmacenCaracteristicas(_calcular, str(tmp_path))
+    almacen.obtener(df.iloc[:250])
+
+    # Mismas fechas de inicio y fin, pero un registro antiguo corregido
+    corregido = df.copy()
+    corregido.iloc[20, 0] = 99.0
+    resultado = almacen.obtener(corregido)
+    pd.testing.assert_frame_equal(resultado, rellenar_faltantes(_calcular(corregido)))
+    assert resultado['temperatura_C_rolling_6h'].iloc[20] != almacen.obtener(df)['temperatura_C_rolling_6h'].iloc[20]
+
+
+def test_version_anterior_se_descarta(tmp_path):
+    (tmp_path / 'segmento_00000.pkl').write_bytes(b'no se deserializa')
+    (tmp_path / 'manifiesto.json').write_text(
+        '{"version": 1, "segmentos": [{"numero": 0, "archivo": "segmento_00000.pkl", "filas": 1}]}')
+    almacen = AlmacenCaracteristicas(_calcular, str(tmp_path))
+    df = _serie(50)
+    pd.testing.assert_frame_equal(almacen.obtener(df), rellenar_faltantes(_calcular(df)))
+    assert not (tmp_path / 'segmento_00000.pkl').exists()
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import almacen_columnar
+
+
+def test_texto_sin_pickle_y_cache_unica(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('datos')
+    ruta = os.path.join('datos', 'estacion.csv')
+    pd.DataFrame({
+        'fecha': pd.date_range('2024-01-01', periods=5, freq='h'),
+        'temperatura_C': [20.5, np.nan, 21.0, 22.25, 19.0],
+        'direccion_viento': ['N', 'SE', None, 'N', 'O'],
+    }).to_csv(ruta, index=False)
+
+    primera = almacen_columnar.cargar_tabla(ruta, dtype_flotante=np.float64)
+    segunda = almacen_columnar.cargar_tabla(ruta, dtype_flotante=np.float64)
+    referencia = pd.read_csv(ruta)
+    for df in (primera, segunda):
+        assert list(df['direccion_viento'].isna()) == list(referencia['direccion_viento'].isna())
+        assert list(df['direccion_viento'].dropna()) == list(referencia['direccion_viento'].dropna())
+        assert df['fecha'].equals(pd.to_datetime(referencia['fecha']).astype(df['fecha'].dtype))
+        np.testing.assert_array_equal(df['temperatura_C'], referencia['temperatura_C'])
+
+    # Una sola caché en el directorio de trabajo, nada junto al CSV
+    assert os.listdir('datos') == ['estacion.csv']
+    directorio = almacen_columnar.ruta_cache(ruta, np.float64)
+    assert os.path.dirname(directorio) == almacen_columnar.DIRECTORIO_CACHE
+    for archivo in os.listdir(directorio):
+        if archivo.endswith('.npy'):
+            np.load(os.path.join(directorio, archivo), allow_pickle=False)
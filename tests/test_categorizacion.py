@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from benchmark_rendimiento import RUTA_DATASET, cargar_dataset
+from predictor_model import PrediccionMeteo
+
+
+@pytest.fixture(scope='module')
+def datos():
+    df = cargar_dataset(RUTA_DATASET, 4000)
+    # Algunos valores faltantes y extremos para recorrer todas las reglas
+    generador = np.random.default_rng(0)
+    df = df.mask(generador.random(df.shape) < 0.02)
+    df.iloc[::97, df.columns.get_loc('precipitacion_mm')] = 12.0
+    return df
+
+
+def test_vectorizado_igual_fila_a_fila(datos):
+    predictor = PrediccionMeteo()
+    fila_a_fila = datos.apply(predictor.categorizar_clima, axis=1)
+    predictor._cache_variabilidad_dia = {}
+    vectorizado = predictor.categorizar_clima_vectorizado(datos)
+    assert vectorizado.index.equals(datos.index)
+    assert vectorizado.tolist() == fila_a_fila.tolist()
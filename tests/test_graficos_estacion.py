@@ -0,0 +1,62 @@
+import numpy as np
+
+import graficos_estacion as ge
+from lecturas_estacion import LecturasEstacion
+
+
+def test_tamano_bloque():
+    assert ge.tamano_bloque(100, 200) == 1
+    assert ge.tamano_bloque(1000, 200) == 8
+    assert ge.tamano_bloque(1600, 200) == 8
+
+
+def test_envolvente_conserva_minimo_y_maximo_de_cada_bloque():
+    generador = np.random.default_rng(0)
+    valores = generador.normal(size=1000)
+    valores[100:108] = np.nan  # Un bloque entero sin datos
+    valores[300] = np.nan
+    indices = ge.envolvente(valores, 8)
+    assert np.all(np.diff(indices) >= 0)
+    for bloque, (a, b) in enumerate(indices.reshape(-1, 2)):
+        datos = valores[bloque * 8:(bloque + 1) * 8]
+        if np.isnan(datos).all():
+            assert a == b == bloque * 8
+            continue
+        assert {valores[a], valores[b]} == {np.nanmin(datos), np.nanmax(datos)}
+    # Los extremos globales siempre se dibujan
+    assert np.nanargmax(valores) in indices and np.nanargmin(valores) in indices
+    assert ge.envolvente(valores, 1).tolist() == list(range(1000))
+
+
+def test_maximos_y_primeras_categorias():
+    valores = np.array([0.0, 2.0, 1.0, 5.0, np.nan, np.nan, 0.5, 0.0, 3.0])
+    assert ge.maximos(valores, 4).tolist() == [3, 6, 8]
+    codigos = np.array([1, 1, 0, -1, -1, -1, -1, -1, 2, 0, 2, 2])
+    assert ge.primeras_categorias(codigos, 4).tolist() == [0, 2, 8, 9]
+    assert ge.primeras_categorias(np.array([-1, -1]), 1).tolist() == []
+
+
+def _lecturas(inicio, registros):
+    tiempos = np.datetime64('2024-05-01T00:00:00') + np.arange(inicio, inicio + registros) * np.timedelta64(5, 'm')
+    temperatura = 15 + 5 * np.sin(np.arange(inicio, inicio + registros) / 50)
+    return {'fecha': [str(t).replace('T', ' ') for t in tiempos], 'temperatura_C': temperatura}
+
+
+def test_serie_diezmada_incremental_igual_que_completa():
+    lecturas = LecturasEstacion()
+    serie = ge.SerieDiezmada('temperatura_C')
+    lecturas.agregar(_lecturas(0, 1000))
+    assert serie.actualizar(lecturas, 200) == 'reemplazo'
+    assert serie.actualizar(lecturas, 200) is None
+    lecturas.agregar(_lecturas(1000, 13))
+    assert serie.actualizar(lecturas, 200) == 'agregados'
+
+    completa = ge.SerieDiezmada('temperatura_C')
+    completa.actualizar(lecturas, 200)
+    assert serie.tamano == completa.tamano == 8
+    assert serie.indices.tolist() == completa.indices.tolist()
+
+    # Registros anteriores a los guardados: las lecturas se reordenan y la serie se recalcula
+    lecturas.agregar({'fecha': ['2024-04-30 23:00:00'], 'temperatura_C': [99.0]})
+    assert serie.actualizar(lecturas, 200) == 'reemplazo'
+    assert 0 in serie.indices
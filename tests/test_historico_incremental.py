@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import historico_incremental as hi
+
+
+def _serie(inicio, horas, semilla, nulos=0.1):
+    """Registros horarios con huecos aleatorios en las columnas interpoladas"""
+    generador = np.random.default_rng(semilla)
+    indice = pd.date_range(inicio, periods=horas, freq='h', name='fecha')
+    df = pd.DataFrame({col: generador.normal(20, 5, horas) for col in hi.COLUMNAS_INTEGRACION[1:]},
+                      index=indice)
+    for col in hi.COLUMNAS_INTEGRACION[1:]:
+        df.loc[generador.random(horas) < nulos, col] = np.nan
+    return df
+
+
+def _completo(ruta, *partes):
+    """Integración completa de referencia: crudo combinado y rellenado desde cero"""
+    crudo = hi.combinar_con_prioridad(*partes)
+    historico = hi.HistoricoParticionado(str(ruta))
+    historico.reconstruir(crudo, hi.rellenar_integracion(crudo))
+    return historico
+
+
+@pytest.fixture
+def base():
+    return _serie('2024-01-01', 24 * 120, semilla=1)  # Enero a abril
+
+
+def test_registro_tardio_en_mes_anterior(tmp_path, base):
+    historico = _completo(tmp_path / 'inc.csv', base)
+    tardio = _serie('2024-02-10 05:00', 1, semilla=2, nulos=0)
+    assert historico.integrar(tardio).index[0] >= pd.Timestamp('2024-02-01')
+
+    referencia = _completo(tmp_path / 'ref.csv', base, tardio)
+    assert (tmp_path / 'inc.csv').read_bytes() == (tmp_path / 'ref.csv').read_bytes()
+    pd.testing.assert_frame_equal(historico.cargar(), referencia.cargar())
+    # Los meses anteriores al registro tardío conservan su posición en el CSV
+    assert historico.indice['particiones']['2024-01'] == referencia.indice['particiones']['2024-01']
+    assert hi.HistoricoParticionado(str(tmp_path / 'inc.csv')).disponible()
+
+
+def test_registros_nuevos_al_final(tmp_path, base):
+    historico = _completo(tmp_path / 'inc.csv', base)
+    nuevos = _serie('2024-04-29', 24 * 10, semilla=3)
+    historico.integrar(nuevos)
+    _completo(tmp_path / 'ref.csv', base, nuevos)
+    assert (tmp_path / 'inc.csv').read_bytes() == (tmp_path / 'ref.csv').read_bytes()
+
+
+def test_reintegrar_sin_datos_nuevos(tmp_path, base):
+    historico = _completo(tmp_path / 'inc.csv', base)
+    nuevos = _serie('2024-04-25', 24 * 5, semilla=4)
+    historico.integrar(nuevos)
+    contenido = (tmp_path / 'inc.csv').read_bytes()
+    indice = dict(historico.indice)
+
+    # La estación vuelve a entregar los mismos registros: nada cambia
+    historico.integrar(nuevos)
+    assert (tmp_path / 'inc.csv').read_bytes() == contenido
+    assert historico.indice == indice
+
+    # Sin registros no se toca nada
+    assert len(historico.integrar(nuevos.iloc[:0])) == 0
+    assert (tmp_path / 'inc.csv').read_bytes() == contenido
+    assert hi.HistoricoParticionado(str(tmp_path / 'inc.csv')).disponible()
+
+
+def test_escritura_interrumpida(tmp_path, base, monkeypatch):
+    ruta = tmp_path / 'inc.csv'
+    historico = _completo(ruta, base)
+    assert hi.HistoricoParticionado(str(ruta)).disponible()
+
+    escribir = hi.HistoricoParticionado._escribir_meses
+
+    def escribir_y_fallar(self, f, crudo, relleno):
+        # Se escribe solo el primer mes y el proceso "muere"
+        primero = relleno.index.strftime('%Y-%m') == relleno.index[0].strftime('%Y-%m')
+        escribir(self, f, crudo[primero], relleno[primero])
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(hi.HistoricoParticionado, '_escribir_meses', escribir_y_fallar)
+    with pytest.raises(KeyboardInterrupt):
+        historico.integrar(_serie('2024-03-15', 24 * 3, semilla=5))
+    monkeypatch.undo()
+
+    # El índice quedó marcado como incompleto: no se integra sobre un CSV a medias
+    assert not hi.HistoricoParticionado(str(ruta)).disponible()
+
+
+def test_historico_de_origen_distinto(tmp_path, base):
+    ruta = tmp_path / 'inc.csv'
+    crudo = hi.combinar_con_prioridad(base)
+    hi.HistoricoParticionado(str(ruta)).reconstruir(crudo, hi.rellenar_integracion(crudo), origen=[1, 2])
+    assert hi.HistoricoParticionado(str(ruta)).disponible(origen=[1, 2])
+    assert not hi.HistoricoParticionado(str(ruta)).disponible(origen=[1, 3])
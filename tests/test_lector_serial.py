@@ -0,0 +1,184 @@
+import threading
+import time
+
+import lector_serial
+from lector_serial import BufferCircular, EntramadorBloques, LectorSerial
+
+
+class PuertoFalso:
+    """Puerto serie simulado: entrega los bytes alimentados y, sin datos, bloquea `timeout` segundos"""
+
+    def __init__(self):
+        self.timeout = 2
+        self.escrito = []
+        self.abierto = True
+        self._pendiente = bytearray()
+        self._condicion = threading.Condition()
+
+    def alimentar(self, datos):
+        with self._condicion:
+            self._pendiente += datos
+            self._condicion.notify_all()
+
+    @property
+    def in_waiting(self):
+        return len(self._pendiente)
+
+    def read(self, n=1):
+        with self._condicion:
+            if not self._pendiente:
+                self._condicion.wait(timeout=self.timeout)
+            if not self.abierto:
+                raise OSError("puerto cerrado")
+            datos = bytes(self._pendiente[:n])
+            del self._pendiente[:n]
+            return datos
+
+    def write(self, datos):
+        self.escrito.append(bytes(datos))
+
+    def reset_input_buffer(self):
+        with self._condicion:
+            self._pendiente.clear()
+
+    def close(self):
+        self.abierto = False
+
+
+def _eventos_hasta(lector, tipo, limite=3.0):
+    """Eventos del lector hasta recibir uno de `tipo` (o agotar el límite)"""
+    eventos = []
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin and not any(e[0] == tipo for e in eventos):
+        eventos += lector.vaciar_eventos(0.05)
+        time.sleep(0.01)
+    return eventos
+
+
+def test_buffer_circular_da_la_vuelta():
+    buffer = BufferCircular(16)
+    buffer.escribir(b'abcdefghij')
+    assert buffer.leer(6) == b'abcdef'
+    # La escritura cruza el final del arreglo; la línea queda partida en los dos tramos
+    buffer.escribir(b'kl\nmnop\nqr')
+    assert len(buffer) == 14
+    assert buffer.extraer_lineas() == [b'ghijkl', b'mnop']
+    assert buffer.leer(10) == b'qr'
+    assert len(buffer) == 0 and buffer.descartados == 0
+
+
+def test_buffer_circular_desbordado_descarta_lo_mas_antiguo():
+    buffer = BufferCircular(8)
+    buffer.escribir(b'123456')
+    buffer.escribir(b'789')
+    assert buffer.descartados == 1
+    assert buffer.leer(8) == b'23456789'
+
+    # Una escritura mayor que la capacidad conserva solo sus últimos bytes
+    buffer.escribir(b'abcdefghijkl')
+    assert buffer.descartados == 5
+    assert buffer.leer(8) == b'efghijkl'
+
+
+def test_entramador_fin_datos_partido_entre_lecturas():
+    buffer = BufferCircular(64)
+    entramador = EntramadorBloques('DATOS')
+    eventos = []
+    for trozo in (b'INICIO_DA', b'TOS\r\n2024-01-01 00:00,18.5\r\nFIN_', b'DA', b'TOS\r\n'):
+        buffer.escribir(trozo)
+        eventos += entramador.procesar(buffer.extraer_lineas())
+    assert [e[0] for e in eventos] == ['inicio', 'registros', 'fin']
+    assert eventos[1][2] == ['2024-01-01 00:00,18.5']
+    assert eventos[2][2] == {'lineas': 1, 'forzado': False}
+    assert not entramador.en_bloque and entramador.bloques_terminados == 1
+
+
+def test_lector_bloque_completo_con_puerto_falso():
+    puerto = PuertoFalso()
+    lector = LectorSerial(puerto, capacidad=64)
+    lector.iniciar()
+    try:
+        assert puerto.timeout == lector_serial.TIMEOUT_LECTURA
+        lector.enviar('DATOS')
+        assert puerto.escrito == [b'DATOS\r\n']
+        for trozo in (b'OK\r\nINICIO_', b'DATOS\r\n2024-01-01 00:00,1\r\n2024-01-01 01:00,2\r\nFIN_D', b'ATOS\r\n'):
+            puerto.alimentar(trozo)
+            time.sleep(0.05)
+        assert lector.esperar_respuesta(tiempo_maximo=5, espera_minima=0) == 'bloque'
+        eventos = _eventos_hasta(lector, 'fin')
+        assert eventos[0] == ('linea', 'DATOS', 'OK')
+        registros = [r for tipo, _, datos in eventos if tipo == 'registros' for r in datos]
+        assert registros == ['2024-01-01 00:00,1', '2024-01-01 01:00,2']
+        assert eventos[-1] == ('fin', 'DATOS', {'lineas': 2, 'forzado': False})
+    finally:
+        lector.detener()
+    assert puerto.timeout == 2
+
+
+def test_lector_cierra_forzado_tras_inactividad():
+    puerto = PuertoFalso()
+    lector = LectorSerial(puerto)
+    lector.iniciar()
+    try:
+        lector.enviar('DATOS')
+        puerto.alimentar(b'INICIO_DATOS\r\n2024-01-01 00:00,1\r\n')
+        inicio = time.monotonic()
+        resultado = lector.esperar_respuesta(tiempo_maximo=10, espera_minima=0, inactividad_bloque=0.3)
+        assert resultado == 'inactividad'
+        assert time.monotonic() - inicio < 5
+        eventos = _eventos_hasta(lector, 'fin')
+        assert ('fin', 'DATOS', {'lineas': 1, 'forzado': True}) in eventos
+        assert not lector.entramador.en_bloque
+    finally:
+        lector.detener()
+
+
+def test_lector_detenido_antes_de_cerrar_el_puerto():
+    puerto = PuertoFalso()
+    lector = LectorSerial(puerto)
+    lector.iniciar()
+    lector.detener()
+    assert not lector.activo
+    puerto.close()
+    # El hilo ya no lee: no llega ningún error por el puerto cerrado
+    time.sleep(0.2)
+    assert [e for e in lector.vaciar_eventos() if e[0] == 'error'] == []
+
+
+class PuertoIntercalado(PuertoFalso):
+    """La primera lectura toma bytes de la respuesta anterior y no los entrega hasta que se libera"""
+
+    def __init__(self, restos):
+        super().__init__()
+        self.restos = restos
+        self.leyendo = threading.Event()
+        self.liberar = threading.Event()
+
+    def read(self, n=1):
+        if self.restos is not None:
+            restos, self.restos = self.restos, None
+            self.leyendo.set()
+            self.liberar.wait(timeout=2)
+            return restos
+        return super().read(n)
+
+
+def test_lectura_anterior_al_comando_se_descarta():
+    puerto = PuertoIntercalado(b'Respuesta anterior\r\n2023-12-31 23:00,9\r\n')
+    lector = LectorSerial(puerto)
+    lector.iniciar()
+    try:
+        assert puerto.leyendo.wait(timeout=2)
+        # La lectura en curso termina mientras enviar() ya está en marcha
+        threading.Timer(0.2, puerto.liberar.set).start()
+        lector.enviar('DATOS')
+        assert puerto.liberar.is_set()
+        puerto.alimentar(b'INICIO_DATOS\r\n2024-01-01 00:00,1\r\nFIN_DATOS\r\n')
+        assert lector.esperar_respuesta(tiempo_maximo=5, espera_minima=0) == 'bloque'
+        eventos = _eventos_hasta(lector, 'fin')
+        assert ('linea', 'DATOS', 'Respuesta anterior') not in eventos
+        registros = [r for tipo, _, datos in eventos if tipo == 'registros' for r in datos]
+        assert registros == ['2024-01-01 00:00,1']
+        assert eventos[-1] == ('fin', 'DATOS', {'lineas': 1, 'forzado': False})
+    finally:
+        lector.detener()
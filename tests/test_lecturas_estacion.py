@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lecturas_estacion import LecturasEstacion, ResumenLluvia, a_epoca, a_segundos
+
+
+def test_a_epoca_con_guiones_y_barras():
+    segundos, validas = a_epoca(['2024-05-01 10:00:00', '2024/05/01 10:00:00', ' 2024/05/02 00:00:01 ', 'error'])
+    esperado = int(pd.Timestamp('2024-05-01 10:00:00').timestamp())
+    assert validas.tolist() == [True, True, True, False]
+    assert segundos.tolist() == [esperado, esperado, esperado + 14 * 3600 + 1, 0]
+    # Objetos fecha mezclados con textos (cachés antiguas)
+    segundos, validas = a_epoca([datetime(2024, 5, 1, 10), '2024/05/01 10:00:00'])
+    assert validas.all() and segundos.tolist() == [esperado, esperado]
+
+
+def test_agregar_desordenado_y_rango():
+    lecturas = LecturasEstacion()
+    lecturas.agregar({'fecha': ['2024/05/01 12:00:00', '2024/05/01 10:00:00', 'sin fecha'],
+                      'temperatura_C': [20.0, '18.5', 19.0], 'direccion_viento': ['NE', 'SO', 'N']})
+    lecturas.agregar({'fecha': ['2024/05/01 11:00:00'], 'temperatura_C': [None]})
+    assert len(lecturas) == 3 and lecturas.descartados == 1
+    assert lecturas.reordenamientos == 2
+    assert [str(f) for f in lecturas.fechas()] == ['2024-05-01T10:00:00', '2024-05-01T11:00:00',
+                                                    '2024-05-01T12:00:00']
+    assert lecturas.valores('temperatura_C').tolist()[0::2] == [18.5, 20.0]
+    assert np.isnan(lecturas.valores('temperatura_C')[1])
+    assert lecturas.textos('direccion_viento').tolist() == ['SO', None, 'NE']
+    assert lecturas.rango('2024-05-01 10:30', '2024-05-01 12:00') == slice(1, 2)
+    assert lecturas.registro(1)['temperatura_C'] is None
+    assert lecturas.ultimo()['fecha'] == datetime(2024, 5, 1, 12)
+
+
+def _lluvia(registros):
+    fechas = [pd.Timestamp(f) for f, _ in registros]
+    tiempos = np.array([a_segundos(f) for f in fechas], dtype=np.int64)
+    return ResumenLluvia(tiempos, np.array([v for _, v in registros], dtype=np.float32))
+
+
+def test_resumen_lluvia_por_dia_y_por_hora():
+    resumen = _lluvia([
+        ('2024-05-01 08:10', 0.0), ('2024-05-01 08:50', 0.5),
+        ('2024-05-01 09:20', 1.5), ('2024-05-01 11:05', np.nan), ('2024-05-01 11:40', 2.0),
+        ('2024-05-03 00:30', 0.0), ('2024-05-03 23:59', 0.0),
+    ])
+    assert len(resumen) == 2
+    assert resumen.acumulada.tolist() == [2.0, 0.0]
+    horas = resumen.lluvia_hora
+    assert horas[0, 8] == 0.5 and horas[0, 9] == 1.0 and horas[0, 10] == 0 and horas[0, 11] == 0.5
+    assert horas[0].sum() == 2.0 and horas[1].sum() == 0
+
+    assert resumen.rango_dia('2024-05-01') == slice(0, 5)
+    assert resumen.rango_dia('2024-05-02') == slice(5, 5)  # Día sin registros
+    detalle = resumen.detalle('2024-05-01 15:00')
+    assert detalle['registros'] == 5 and detalle['indice_maximo'] == 4 and detalle['precipitacion_mm'] == 2.0
+    # Sin lluvia se toma la última lectura del día
+    assert resumen.detalle('2024-05-03')['indice_maximo'] == 1
+    assert resumen.detalle('2024-05-02') is None
+    assert resumen.volumen('2024-05-01', area=3) == 6.0
+
+
+def test_resumen_se_recalcula_al_agregar():
+    lecturas = LecturasEstacion()
+    lecturas.agregar({'fecha': ['2024-05-01 08:00:00'], 'precipitacion_mm': [1.0]})
+    assert lecturas.resumen_lluvia().acumulada.tolist() == [1.0]
+    lecturas.agregar({'fecha': ['2024-05-01 09:00:00'], 'precipitacion_mm': [3.0]})
+    assert lecturas.resumen_lluvia().acumulada.tolist() == [3.0]
+    assert lecturas.dia('2024-05-01') == slice(0, 2)
@@ -0,0 +1,62 @@
+import numpy as np
+
+import parser_estacion as pe
+from parser_estacion import ParserEstacion
+
+# Registro de 10 columnas: fecha, temp_dht_cal, hum_dht_raw, lluvia_mm, nubes, viento, dirección,
+# radiación J/m², radiación W/m², condición
+REGISTRO_10 = "2024-05-01 10:00:00,18.5,70,1.2,4,5.5,NE,1200,350.5,Nublado"
+# Registro de 15 columnas: fecha, temp_rtc, temp_dht_raw, temp_dht_cal, hum_dht_raw, hum_dht_cal,
+# viento, dirección, adc veleta, lluvia_mm, lluvia actual, radiación J/m², radiación W/m², nubes, condición
+REGISTRO_15 = "2024/05/01 10:00:00,21.0,19.0,18.5,70,72,5.5,NE,512,1.2,0.2,1200,350.5,4,Nublado"
+
+
+def _esperado(fecha):
+    return {'fecha': [fecha], 'temperatura_C': [18.5], 'humedad_relativa': [70.0], 'precipitacion_mm': [1.2],
+            'cobertura_nubes_octas': [4.0], 'velocidad_viento_kmh': [5.5], 'luminosidad_lux': [1200.0],
+            'radiacion_solar_wm2': [350.5], 'direccion_viento': ['NE'], 'condicion_climatica': ['Nublado']}
+
+
+def test_formato_de_10_columnas_sin_encabezados():
+    parser = ParserEstacion()
+    assert parser.alimentar(REGISTRO_10 + "\n") == 1
+    assert parser.predeterminados
+    assert parser.encabezados == pe.ENCABEZADOS_10
+    assert parser.a_listas() == _esperado("2024-05-01 10:00:00")
+
+
+def test_formato_de_15_columnas_sin_encabezados():
+    parser = ParserEstacion()
+    assert parser.alimentar(REGISTRO_15 + "\n") == 1
+    assert parser.encabezados == pe.ENCABEZADOS_15
+    # lluvia_mm (acumulada), no lluvia_actual_mm, es la precipitación
+    assert parser.a_listas() == _esperado("2024/05/01 10:00:00")
+
+
+def test_fila_de_encabezados_y_registros_por_fragmentos():
+    texto = (",".join(pe.ENCABEZADOS_15) + "\r\n" + REGISTRO_15 + "\r\n"
+             + "Comandos: ayuda, logout, reset\r\n"
+             + "2024/05/01 10:05:00,21.0,19.0,error,70,72,5.5,,512,1.4,0.2,1200,350.5,4,Soleado")
+    datos = texto.encode('utf-8')
+    parser = ParserEstacion()
+    # Fragmentos pequeños que cortan líneas y caracteres de varios bytes
+    for inicio in range(0, len(datos), 7):
+        parser.alimentar(datos[inicio:inicio + 7])
+    assert parser.registros == 1
+    assert parser.terminar() == 1
+    assert not parser.predeterminados
+    listas = parser.a_listas()
+    assert listas['fecha'] == ["2024/05/01 10:00:00", "2024/05/01 10:05:00"]
+    assert listas['temperatura_C'] == [18.5, None]
+    assert listas['precipitacion_mm'] == [1.2, 1.4]
+    assert listas['direccion_viento'] == ['NE', '']
+    arreglos = parser.arreglos()
+    assert arreglos['temperatura_C'].dtype == np.float64 and np.isnan(arreglos['temperatura_C'][1])
+
+
+def test_columnas_crecen_por_bloques():
+    columna = pe.ColumnaCreciente(np.int64, capacidad=2)
+    for inicio in range(0, 10, 3):
+        columna.agregar(np.arange(inicio, min(inicio + 3, 10)))
+    assert len(columna) == 10
+    assert columna.valores.tolist() == list(range(10))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import posprocesado_pronostico as pp
+from benchmark_rendimiento import metodo_original
+
+CATEGORIAS = ['Frio + Nublado', 'Templado + Parcialmente Nublado', 'Calido + Alta Radiacion + Soleado',
+              'Calido + Soleado', 'Templado + Alta Radiacion', 'Calido + Nublado + Llovizna']
+
+
+class _PredictorSinDetalles:
+    def generar_detalles_prediccion(self, *args):
+        return None
+
+
+def _pronosticos(cantidad, tipo, semilla=0):
+    generador = np.random.default_rng(semilla)
+    pronosticos = []
+    for _ in range(cantidad):
+        fechas = pd.date_range(pd.Timestamp('2025-01-01') + pd.Timedelta(hours=int(generador.integers(0, 8000))),
+                               periods=72, freq='h')
+        pronosticos.append([{
+            'fecha': fecha.strftime(pp.FORMATO_FECHA),
+            'categoria': CATEGORIAS[generador.integers(len(CATEGORIAS))],
+            'confianza': 0.6,
+            'temperatura': tipo(np.round(generador.normal(15.5, 3.5), 1)),
+            'detalles': None
+        } for fecha in fechas])
+    return pronosticos
+
+
+def test_redondeo_segun_el_tipo():
+    assert pp.redondear(np.array([12.35, 12.35]), np.array([False, True])).tolist() == [12.4, 12.3]
+
+
+@pytest.mark.parametrize('tipo', [np.float64, float])
+def test_consistencia_igual_al_codigo_original(tipo):
+    original = metodo_original('asegurar_consistencia_fisica')
+    for pronostico in _pronosticos(60, tipo):
+        referencia = original(_PredictorSinDetalles(), [dict(p) for p in pronostico])
+        fechas = pd.to_datetime([p['fecha'] for p in pronostico], format=pp.FORMATO_FECHA)
+        temperaturas, categorias, _ = pp.consistencia_fisica(
+            fechas, [p['temperatura'] for p in pronostico], [p['categoria'] for p in pronostico])
+        assert temperaturas.tolist() == [p['temperatura'] for p in referencia]
+        assert categorias == [p['categoria'] for p in referencia]
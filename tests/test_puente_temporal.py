@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+import puente_temporal
+from benchmark_rendimiento import _puente_por_bucle
+
+COLUMNAS = ['temperatura_C', 'humedad_relativa', 'precipitacion_mm', 'cobertura_nubes_octas',
+            'velocidad_viento_kmh', 'radiacion_solar_J_m2']
+INICIALES = dict(zip(COLUMNAS, [14.0, 80.0, 0.3, 5.0, 6.0, 250000.0]))
+FINALES = dict(zip(COLUMNAS, [16.0, 70.0, 0.1, 3.0, 8.0, 300000.0]))
+
+
+def test_puente_igual_al_bucle_original():
+    fechas = pd.date_range('2023-11-20 03:00', periods=4 * 400, freq=puente_temporal.FRECUENCIA_PUENTE)
+    puente = puente_temporal.generar_puente(fechas, INICIALES, FINALES)
+    referencia = _puente_por_bucle(fechas, INICIALES, FINALES)
+    assert puente.index.equals(fechas) and list(puente.columns) == COLUMNAS
+    # Las variables sin componente aleatoria coinciden; las aleatorias respetan sus límites
+    deterministas = ['temperatura_C', 'humedad_relativa', 'cobertura_nubes_octas', 'radiacion_solar_J_m2']
+    np.testing.assert_allclose(puente[deterministas], referencia[deterministas])
+    assert (puente['precipitacion_mm'] >= 0).all() and (puente['velocidad_viento_kmh'] >= 0).all()
+
+
+def test_puente_reproducible_y_de_un_punto():
+    fechas = pd.date_range('2024-01-01', periods=10, freq=puente_temporal.FRECUENCIA_PUENTE)
+    pd.testing.assert_frame_equal(puente_temporal.generar_puente(fechas, INICIALES, FINALES),
+                                  puente_temporal.generar_puente(fechas, INICIALES, FINALES))
+    unico = puente_temporal.generar_puente(fechas[:1], INICIALES, FINALES)
+    np.testing.assert_allclose(unico[['cobertura_nubes_octas']],
+                               _puente_por_bucle(fechas[:1], INICIALES, FINALES)[['cobertura_nubes_octas']])
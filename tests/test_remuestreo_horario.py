@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+import remuestreo_horario as rh
+
+
+def _registros(fechas, **columnas):
+    df = pd.DataFrame({'fecha': pd.to_datetime(fechas)})
+    for nombre, valores in columnas.items():
+        df[nombre] = valores
+    return df
+
+
+def test_registro_mas_cercano_del_mismo_dia():
+    df = _registros(['2024-01-01 00:20', '2024-01-01 00:40', '2024-01-01 01:10', '2024-01-03 12:00'],
+                    temperatura=[1.0, 2.0, 3.0, 4.0])
+    resultado = rh.convertir_a_horario(df, verbose=False)
+    # 24 horas del día 1 y 24 del día 3 (el día 2 no tiene registros)
+    assert len(resultado) == 48
+    fila = resultado.set_index('fecha')['temperatura']
+    assert fila[pd.Timestamp('2024-01-01 00:00')] == 1.0
+    # 01:00 está a 20 minutos de 00:40 y a 10 de 01:10
+    assert fila[pd.Timestamp('2024-01-01 01:00')] == 3.0
+    assert fila[pd.Timestamp('2024-01-03 00:00')] == 4.0
+
+
+def test_sin_radiacion_se_remuestrea_igual():
+    df = _registros(['2024-01-01 10:00', '2024-01-01 10:05', '2024-01-01 10:10'],
+                    temperatura=[20.0, 21.0, 22.0])
+    resultado = rh.convertir_a_horario(df, verbose=False)
+    assert len(resultado) == 24
+    assert list(resultado.columns) == ['fecha', 'temperatura']
+    assert (resultado['fecha'].dt.minute == 0).all()
+    assert resultado.set_index('fecha')['temperatura'][pd.Timestamp('2024-01-01 10:00')] == 20.0
+
+
+def test_radiacion_promedio_de_la_hora_anterior():
+    fechas = pd.date_range('2024-01-01 09:00', '2024-01-01 10:55', freq='5min')
+    radiacion = np.where(fechas.hour == 9, 100.0, 300.0)
+    df = _registros(fechas, radiacion_solar_wm2=radiacion)
+    resultado = rh.convertir_a_horario(df, verbose=False).set_index('fecha')
+    assert len(resultado) == 24
+    joules = resultado['radiacion_solar_J_m2']
+    assert joules[pd.Timestamp('2024-01-01 10:00')] == 100.0 * 3600
+    assert joules[pd.Timestamp('2024-01-01 11:00')] == 300.0 * 3600
+    # Sin registros en la hora anterior se asigna 0
+    assert joules[pd.Timestamp('2024-01-01 09:00')] == 0
+    assert joules[pd.Timestamp('2024-01-01 15:00')] == 0
@@ -0,0 +1,56 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Construcción de ventanas deslizantes (entrada de 12 horas, objetivo de 72 horas)
+# sobre una matriz contigua, sin bucles de Python ni copias intermedias.
+
+HORIZONTE_PREDICCION = 72
+
+
+def matriz_contigua(valores, dtype=np.float32):
+    """Convierte los valores a una matriz C-contigua del tipo indicado (sin copia si ya lo es)"""
+    return np.ascontiguousarray(valores, dtype=dtype)
+
+
+def numero_ventanas(longitud, ventana_tiempo, horizonte=HORIZONTE_PREDICCION):
+    """Número de pares (entrada, objetivo) completos que caben en una serie de la longitud dada"""
+    return max(longitud - ventana_tiempo - horizonte + 1, 0)
+
+
+def ventanas_entrada(matriz, ventana_tiempo, horizonte=HORIZONTE_PREDICCION):
+    """Devuelve una vista (N, ventana_tiempo, F) de todas las ventanas de entrada, sin copiar datos"""
+    n = numero_ventanas(len(matriz), ventana_tiempo, horizonte)
+    # sliding_window_view añade la dimensión de la ventana al final: (L - w + 1, F, w)
+    vista = sliding_window_view(matriz, ventana_tiempo, axis=0)
+    return vista[:n].transpose(0, 2, 1)
+
+
+def ventanas_objetivo(etiquetas, ventana_tiempo, horizonte=HORIZONTE_PREDICCION):
+    """Devuelve una vista (N, horizonte) con las etiquetas de las horas siguientes a cada ventana"""
+    n = numero_ventanas(len(etiquetas), ventana_tiempo, horizonte)
+    vista = sliding_window_view(np.asarray(etiquetas), horizonte)
+    return vista[ventana_tiempo:ventana_tiempo + n]
+
+
+def dividir_inicios(total_ventanas, fraccion_validacion=0.2):
+    """Divide los inicios de ventana en (entrenamiento, validación) respetando el orden temporal"""
+    inicios = np.arange(total_ventanas)
+    corte = total_ventanas - int(round(total_ventanas * fraccion_validacion))
+    if total_ventanas > 1:
+        corte = min(max(corte, 1), total_ventanas - 1) if fraccion_validacion > 0 else total_ventanas
+    return inicios[:corte], inicios[corte:]
+
+
+def extraer_ventanas(matriz, inicios, ventana_tiempo):
+    """Extrae en una sola indexación las ventanas que empiezan en las posiciones indicadas"""
+    inicios = np.asarray(inicios, dtype=np.intp)
+    return matriz[inicios[:, None] + np.arange(ventana_tiempo)]
+
+
+def one_hot(etiquetas, num_categorias, dtype=np.float32):
+    """Codificación one-hot con una sola indexación; las etiquetas fuera de rango quedan en cero"""
+    tabla = np.zeros((num_categorias + 1, num_categorias), dtype=dtype)
+    tabla[np.arange(num_categorias), np.arange(num_categorias)] = 1
+    etiquetas = np.asarray(etiquetas)
+    validas = (etiquetas >= 0) & (etiquetas < num_categorias)
+    return tabla[np.where(validas, etiquetas, num_categorias).astype(np.intp)]
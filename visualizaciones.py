@@ -9,6 +9,7 @@ import matplotlib.gridspec as gridspec
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
 import os
+from pronostico_compacto import como_dataframe
 
 
 # Configuración global de matplotlib
@@ -210,8 +211,7 @@ class VisualizacionMicroclima:
         ax1 = fig.add_subplot(111)
         
         # Convertir predicciones a DataFrame
-        df_pred = pd.DataFrame(predicciones)
-        df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+        df_pred = como_dataframe(predicciones)
         
         # Usar directamente las temperaturas predichas sin reescribirlas
         ax1.plot(df_pred['fecha'], df_pred['temperatura'], 
@@ -266,8 +266,7 @@ class VisualizacionMicroclima:
         ax = fig.add_subplot(111)
         
         # Convertir predicciones a DataFrame
-        df_pred = pd.DataFrame(predicciones)
-        df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+        df_pred = como_dataframe(predicciones)
         
         # Agrupar predicciones por día y período
         df_pred['periodo'] = pd.cut(df_pred['fecha'].dt.hour,
@@ -580,8 +579,7 @@ class VisualizacionMicroclima:
                 return
             
             # Convertir a DataFrame
-            df_pred = pd.DataFrame(predicciones)
-            df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+            df_pred = como_dataframe(predicciones)
             
             # Definir periodos
             periodos = ['Madrugada', 'Mañana', 'Tarde', 'Noche']
@@ -1447,8 +1445,7 @@ class VisualizacionMicroclima:
         gs = gridspec.GridSpec(3, 1, height_ratios=[1, 1, 1.5], figure=fig)
         
         # Convertir predicciones a DataFrame
-        df_pred = pd.DataFrame(predicciones)
-        df_pred['fecha'] = pd.to_datetime(df_pred['fecha'])
+        df_pred = como_dataframe(predicciones)
         
         # 1. Gráfico superior: Temperatura y confianza
         ax1 = fig.add_subplot(gs[0])
@@ -1493,7 +1490,7 @@ class VisualizacionMicroclima:
         
         # 2. Gráfico medio: Categorías predominantes
         ax2 = fig.add_subplot(gs[1])
-        categorias = df_pred['categoria'].values
+        categorias = df_pred['categoria'].astype(str).values
         ax2.plot(df_pred['fecha'], categorias, 
                 marker='o',
                 linestyle='',